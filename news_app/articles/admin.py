@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Article
+from .models import Article, ScheduledPost
 
 
 @admin.register(Article)
@@ -21,3 +21,22 @@ class ArticleAdmin(admin.ModelAdmin):
         "author__username",
     )
     ordering = ("-created_at",)
+
+
+@admin.register(ScheduledPost)
+class ScheduledPostAdmin(admin.ModelAdmin):
+    list_display = (
+        "article",
+        "account",
+        "status",
+        "posted_as",
+        "attempts",
+        "created_at",
+        "sent_at",
+    )
+    list_filter = (
+        "account",
+        "status",
+        "posted_as",
+    )
+    ordering = ("-created_at",)
@@ -0,0 +1,112 @@
+import hashlib
+
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from articles import list_version
+
+
+def make_etag(*parts):
+    ''' A strong ETag built from the given version parts. '''
+    digest = hashlib.md5(
+        '|'.join(str(part) for part in parts).encode()
+    ).hexdigest()
+    return quote_etag(digest)
+
+
+def article_etag(article_id, updated_at):
+    return make_etag('article', article_id, updated_at.isoformat())
+
+
+class ConditionalRequestMixin:
+    ''' Answers conditional requests for an API view from a version
+        lookup, before the full query and serialization run.
+
+        ``get_validators`` returns the ``(etag, last_modified)`` of the
+        resource, or None to skip the check. A GET whose ``If-None-Match``
+        or ``If-Modified-Since`` still matches gets ``304 Not Modified``,
+        and a PUT or PATCH whose ``If-Match`` no longer matches gets
+        ``412 Precondition Failed``. Full responses carry the same
+        validators so that clients can revalidate next time.
+    '''
+
+    def get_validators(self):
+        return None
+
+    def get(self, request, *args, **kwargs):
+        validators = self.get_validators()
+        if validators is None:
+            return super().get(request, *args, **kwargs)
+
+        etag, last_modified = validators
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=last_modified and int(last_modified.timestamp()),
+        )
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        return self.add_validators(response, etag, last_modified)
+
+    def add_validators(self, response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        # clients may keep the body but must revalidate before using it
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+class ArticleListConditionalMixin(ConditionalRequestMixin):
+    ''' Validators for a page of the approved article list.
+
+        The ETag is built from the page's query string and the article
+        list version, a database row moved in the same transaction as
+        every write that changes the list: an approved article saved,
+        approved, unapproved or deleted, a bulk review or import, or an
+        author or publisher shown in the list edited. Revalidating takes
+        one primary key lookup, the same in every server process, and
+        editing a draft leaves it alone. There is no
+        ``Last-Modified``: a version number cannot answer
+        ``If-Modified-Since``, so clients use ``If-None-Match``.
+    '''
+
+    def get_validators(self):
+        etag = make_etag(
+            'articles', self.request.get_full_path(), list_version.current()
+        )
+        return etag, None
+
+
+class ArticleDetailConditionalMixin(ConditionalRequestMixin):
+    ''' Validators for a single article, read with one primary key lookup
+        of its ``updated_at``. Updates are checked against ``If-Match``
+        with the row locked, so a client cannot overwrite a change it has
+        not seen. Views should return a ``select_for_update`` queryset
+        for PUT and PATCH.
+    '''
+
+    def get_validators(self):
+        updated_at = self.get_queryset().filter(
+            pk=self.kwargs['pk']
+        ).values_list('updated_at', flat=True).first()
+        if updated_at is None:
+            # let the normal path answer 404
+            return None
+        return article_etag(self.kwargs['pk'], updated_at), updated_at
+
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic():
+            article = self.get_object()
+            etag = article_etag(article.pk, article.updated_at)
+            response = get_conditional_response(
+                request,
+                etag=etag,
+                last_modified=int(article.updated_at.timestamp()),
+            )
+            if response is None:
+                response = super().update(request, *args, **kwargs)
+                article.refresh_from_db(fields=['updated_at'])
+                etag = article_etag(article.pk, article.updated_at)
+        return self.add_validators(response, etag, article.updated_at)
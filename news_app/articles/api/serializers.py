@@ -1,13 +1,15 @@
 from rest_framework import serializers
 from articles.models import Article
+from articles.services import editorial
 from users.api.serializers import UserSerializer
 from publishers.api.serializers import PublisherSerializer
 
 
 class ArticleSerializer(serializers.ModelSerializer):
     '''
-    Serializer for Article model to expose id, title, content, author,
-    publisher, approved and created_at fields.
+    Serializer for Article model to expose id, title, content, excerpt,
+    word_count, reading_time, author, publisher, approved and created_at
+    fields.
     '''
     author = UserSerializer(read_only=True)
     publisher = PublisherSerializer(read_only=True)
@@ -15,12 +17,36 @@ class ArticleSerializer(serializers.ModelSerializer):
     class Meta:
         model = Article
         fields = (
-            'id', 'title', 'content', 'author', 'publisher', 'approved',
-            'created_at'
+            'id', 'title', 'content', 'excerpt', 'word_count',
+            'reading_time', 'author', 'publisher', 'approved', 'created_at'
         )
         read_only_fields = ('approved',)
 
 
+class ArticleListSerializer(ArticleSerializer):
+    '''
+    Serializer for article lists, which show the excerpt instead of the
+    content so that list queries can defer the article bodies.
+    '''
+    class Meta(ArticleSerializer.Meta):
+        fields = tuple(
+            name for name in ArticleSerializer.Meta.fields
+            if name != 'content'
+        )
+
+
+class ArticleSearchSerializer(ArticleSerializer):
+    '''
+    Serializer for full-text search results, adding the BM25 rank and a
+    snippet of the content with the matching words highlighted.
+    '''
+    rank = serializers.FloatField(source='search_rank', read_only=True)
+    snippet = serializers.CharField(source='search_snippet', read_only=True)
+
+    class Meta(ArticleSerializer.Meta):
+        fields = ArticleSerializer.Meta.fields + ('rank', 'snippet')
+
+
 class ArticleWriteSerializer(serializers.ModelSerializer):
     '''
     Serializer for creating and updating Article instances.
@@ -28,3 +54,68 @@ class ArticleWriteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Article
         fields = ('title', 'content', 'publisher')
+
+
+class BulkReviewSerializer(serializers.Serializer):
+    '''
+    Serializer for a bulk review: the action and the ids of the articles.
+    '''
+    action = serializers.ChoiceField(choices=editorial.ACTIONS)
+    articles = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=editorial.MAX_BULK_REVIEW,
+    )
+
+
+# Read-only fast path producing the same JSON as ArticleListSerializer
+# from a single joined ``values()`` query, without model instances or
+# per-row field objects. Keep it in step with ArticleListSerializer,
+# UserSerializer and PublisherSerializer; the equivalence test compares
+# them.
+
+ARTICLE_VALUES = (
+    'id', 'title', 'excerpt', 'word_count', 'reading_time', 'approved',
+    'created_at',
+    'author__id', 'author__username', 'author__role',
+    'publisher__id', 'publisher__name', 'publisher__description',
+)
+
+_datetime_field = serializers.DateTimeField()
+
+
+def article_values(queryset):
+    ''' Narrow an Article queryset to the columns the list JSON needs. '''
+    return queryset.values(*ARTICLE_VALUES)
+
+
+def article_row_data(row):
+    ''' Build ArticleListSerializer's representation of one
+        ``article_values`` row.
+    '''
+    publisher = None
+    if row['publisher__id'] is not None:
+        publisher = {
+            'id': row['publisher__id'],
+            'name': row['publisher__name'],
+            'description': row['publisher__description'],
+        }
+    return {
+        'id': row['id'],
+        'title': row['title'],
+        'excerpt': row['excerpt'],
+        'word_count': row['word_count'],
+        'reading_time': row['reading_time'],
+        'author': {
+            'id': row['author__id'],
+            'username': row['author__username'],
+            'role': row['author__role'],
+        },
+        'publisher': publisher,
+        'approved': row['approved'],
+        'created_at': _datetime_field.to_representation(row['created_at']),
+    }
+
+
+def serialize_article_rows(rows):
+    return [article_row_data(row) for row in rows]
@@ -2,11 +2,19 @@ from django.urls import path
 from .views import (
     ArticleListCreateAPIView,
     ArticleDetailAPIView,
-    SubscribedArticleListAPIView
+    SubscribedArticleListAPIView,
+    ArticleSearchAPIView,
+    ArticleExportAPIView,
+    ArticleBulkReviewAPIView,
+    SocialQueueAPIView,
 )
 
 urlpatterns = [
     path('articles/', ArticleListCreateAPIView.as_view()),
+    path('articles/search/', ArticleSearchAPIView.as_view()),
+    path('articles/export/', ArticleExportAPIView.as_view()),
+    path('articles/review/', ArticleBulkReviewAPIView.as_view()),
     path('articles/<int:pk>/', ArticleDetailAPIView.as_view()),
     path('articles/subscribed/', SubscribedArticleListAPIView.as_view()),
+    path('social/queue/', SocialQueueAPIView.as_view()),
 ]
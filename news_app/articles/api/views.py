@@ -1,28 +1,66 @@
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import is_naive, make_aware
 from rest_framework import generics
-from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import (
+    IsAdminUser,
+    IsAuthenticated,
+    SAFE_METHODS,
+)
+from rest_framework.views import APIView
 from articles.models import Article
-from .serializers import ArticleSerializer, ArticleWriteSerializer
-from .permissions import IsAuthorOrEditor, IsJournalist
-from subscriptions.models import JournalistSubscription, NewsletterSubscription
-from django.db.models import Q
+from .conditional import (
+    ArticleDetailConditionalMixin,
+    ArticleListConditionalMixin,
+)
+from .serializers import (
+    ArticleListSerializer,
+    ArticleSearchSerializer,
+    ArticleSerializer,
+    ArticleWriteSerializer,
+    BulkReviewSerializer,
+    article_values,
+    serialize_article_rows,
+)
+from .permissions import IsAuthorOrEditor, IsEditor, IsJournalist
+from subscriptions.models import FeedItem
+from rest_framework.response import Response
+from articles import export, search
+from articles.services import editorial, post_scheduler
+from subscriptions.services.feed import FEED_ORDERING, FeedPaginator
 
 
-class ArticleListCreateAPIView(generics.ListCreateAPIView):
+class ArticleListCreateAPIView(
+    ArticleListConditionalMixin,
+    generics.ListCreateAPIView,
+):
     '''
     API view to list all articles and allow journalists to create new articles.
+    Pages carry an ETag, and unchanged pages are answered with 304 Not
+    Modified.
     '''
     queryset = Article.objects.filter(approved=True)
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
             return ArticleWriteSerializer
-        return ArticleSerializer
+        return ArticleListSerializer
 
     def get_permissions(self):
         if self.request.method == 'POST':
             return [IsAuthenticated(), IsJournalist()]
         return [IsAuthenticated()]
 
+    def list(self, request, *args, **kwargs):
+        # read the page as joined values() rows rather than model
+        # instances with per-row author and publisher queries
+        queryset = article_values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serialize_article_rows(page))
+        return Response(serialize_article_rows(queryset))
+
     def perform_create(self, serializer):
         serializer.save(
             author=self.request.user,
@@ -30,9 +68,13 @@ class ArticleListCreateAPIView(generics.ListCreateAPIView):
             )
 
 
-class ArticleDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+class ArticleDetailAPIView(
+    ArticleDetailConditionalMixin,
+    generics.RetrieveUpdateDestroyAPIView,
+):
     '''
-    API view to retrieve a specific article by its ID.
+    API view to retrieve a specific article by its ID. Unchanged articles
+    are answered with 304 Not Modified, and updates honour If-Match.
     '''
     queryset = Article.objects.filter(approved=True)
 
@@ -48,29 +90,118 @@ class ArticleDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
 
     def get_queryset(self):
         if self.request.method in SAFE_METHODS:
-            return Article.objects.filter(approved=True)
+            return Article.objects.filter(approved=True).select_related(
+                'author', 'publisher'
+            )
+        if self.request.method in ('PUT', 'PATCH'):
+            # locked while If-Match is checked and the update is written
+            return Article.objects.select_for_update()
         return Article.objects.all()
 
 
 class SubscribedArticleListAPIView(generics.ListAPIView):
     '''
     API view to list articles from journalists and newsletters the user is
-    subscribed to.
+    subscribed to, read from the reader's precomputed feed.
     '''
-    serializer_class = ArticleSerializer
+    serializer_class = ArticleListSerializer
+    pagination_ordering = FEED_ORDERING
 
     def get_queryset(self):
-        user = self.request.user
-        journalist_ids = JournalistSubscription.objects.filter(
-            reader=user
-        ).values_list('journalist_id', flat=True)
-
-        newsletter_articles = NewsletterSubscription.objects.filter(
-            reader=user
-        ).values_list('newsletter__articles__id', flat=True)
-
-        return Article.objects.filter(
-            Q(author_id__in=journalist_ids) |
-            Q(id__in=newsletter_articles),
-            approved=True
-        ).distinct()
+        return FeedItem.objects.filter(reader=self.request.user)
+
+    def get_keyset_paginator(self, queryset, page_size):
+        return FeedPaginator(
+            self.request.user, queryset, page_size=page_size
+        )
+
+
+class ArticleSearchAPIView(generics.GenericAPIView):
+    '''
+    API view to full-text search approved articles, ranked by relevance.
+    Takes the search text in ``q`` and an optional ``limit``.
+    '''
+    serializer_class = ArticleSearchSerializer
+
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        try:
+            limit = int(request.query_params.get('limit', search.MAX_RESULTS))
+        except ValueError:
+            limit = search.MAX_RESULTS
+
+        results = search.search_articles(query, limit=limit)
+        serializer = self.get_serializer(results, many=True)
+        return Response({'query': query, 'results': serializer.data})
+
+
+class ArticleBulkReviewAPIView(APIView):
+    '''
+    API view for editors to approve or reject many articles at once. Takes
+    ``action`` (approve or reject) and a list of article ids in
+    ``articles``, and returns the ids that changed. Articles outside the
+    editor's publishers, or already in the requested state, are left out.
+    '''
+    permission_classes = [IsAuthenticated, IsEditor]
+
+    def post(self, request):
+        serializer = BulkReviewSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        changed = editorial.bulk_review(
+            request.user,
+            serializer.validated_data['articles'],
+            serializer.validated_data['action'],
+        )
+        return Response({
+            'action': serializer.validated_data['action'],
+            'changed': changed,
+        })
+
+
+class SocialQueueAPIView(APIView):
+    '''
+    API view reporting the outbound social post queue for staff: queue
+    depth, waiting times and remaining budget per account.
+    '''
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        return Response(post_scheduler.queue_stats())
+
+
+class ArticleExportAPIView(APIView):
+    '''
+    API view streaming every approved article as JSON lines or CSV, for
+    partner dumps. Takes ``format`` (jsonl or csv), an optional ``since``
+    datetime for incremental exports and ``gzip=1`` to compress the stream.
+    '''
+    permission_classes = [IsAuthenticated]
+
+    def perform_content_negotiation(self, request, force=False):
+        # ``format`` names the export format here, not a renderer, so
+        # errors fall back to the default renderer instead of a 404
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request):
+        fmt = request.query_params.get('format', export.JSONL)
+        if fmt not in export.FORMATS:
+            raise ValidationError({'format': f'Use one of {export.FORMATS}.'})
+
+        since = request.query_params.get('since')
+        if since:
+            parsed = parse_datetime(since)
+            if parsed is None:
+                raise ValidationError({'since': 'Use an ISO 8601 datetime.'})
+            since = make_aware(parsed) if is_naive(parsed) else parsed
+
+        compress = request.query_params.get('gzip') in ('1', 'true')
+        response = StreamingHttpResponse(
+            export.export(fmt, since=since or None, compress=compress),
+            content_type=(
+                'application/gzip' if compress else export.CONTENT_TYPES[fmt]
+            ),
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{export.filename(fmt, compress)}"'
+        )
+        return response
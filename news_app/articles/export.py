@@ -0,0 +1,136 @@
+import csv
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+
+from .models import Article
+
+JSONL = 'jsonl'
+CSV = 'csv'
+FORMATS = (JSONL, CSV)
+
+CONTENT_TYPES = {
+    JSONL: 'application/x-ndjson',
+    CSV: 'text/csv',
+}
+
+# rows fetched per keyset chunk
+CHUNK_SIZE = 1000
+
+COLUMNS = (
+    'id', 'title', 'content', 'excerpt', 'word_count', 'reading_time',
+    'author_id', 'author_username', 'publisher_id', 'publisher_name',
+    'created_at', 'updated_at',
+)
+
+
+def approved_rows(since=None, chunk_size=CHUNK_SIZE):
+    ''' Yield every approved article as a flat dict of COLUMNS, oldest
+        change first.
+
+        Rows are read in ``(updated_at, id)`` keyset chunks, each streamed
+        from a server-side cursor, so memory stays flat however large the
+        table is and a long export never holds one query open throughout.
+
+        :since: Only articles changed at or after this datetime, for
+            incremental exports.
+    '''
+    articles = Article.objects.filter(approved=True)
+    if since is not None:
+        articles = articles.filter(updated_at__gte=since)
+    articles = articles.order_by('updated_at', 'id').values(
+        'id', 'title', 'content', 'excerpt', 'word_count', 'reading_time',
+        'author_id', 'publisher_id', 'created_at', 'updated_at',
+        author_username=F('author__username'),
+        publisher_name=F('publisher__name'),
+    )
+
+    last = None
+    while True:
+        chunk = articles
+        if last is not None:
+            chunk = chunk.filter(
+                Q(updated_at__gt=last['updated_at']) |
+                Q(updated_at=last['updated_at'], id__gt=last['id'])
+            )
+        count = 0
+        for row in chunk[:chunk_size].iterator(chunk_size=chunk_size):
+            yield row
+            last = row
+            count += 1
+        if count < chunk_size:
+            return
+
+
+def encode(rows, fmt=JSONL, batch_size=CHUNK_SIZE):
+    ''' Encode rows as JSON lines or CSV, yielding bytes a batch of rows at
+        a time.
+    '''
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown export format {fmt!r}.')
+
+    buffer = _LineBuffer()
+    writer = csv.writer(buffer)
+    if fmt == CSV:
+        writer.writerow(COLUMNS)
+
+    pending = 0
+    for row in rows:
+        if fmt == CSV:
+            writer.writerow(_csv_value(row[column]) for column in COLUMNS)
+        else:
+            buffer.write(json.dumps(
+                {column: row[column] for column in COLUMNS},
+                cls=DjangoJSONEncoder,
+            ) + '\n')
+        pending += 1
+        if pending >= batch_size:
+            yield buffer.flush()
+            pending = 0
+    if data := buffer.flush():
+        yield data
+
+
+def gzip_stream(chunks):
+    ''' Compress a stream of byte chunks into a gzip stream on the fly. '''
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for data in chunks:
+        if compressed := compressor.compress(data):
+            yield compressed
+    yield compressor.flush()
+
+
+def export(fmt=JSONL, since=None, compress=False, chunk_size=CHUNK_SIZE):
+    ''' The byte stream of an export of approved articles. '''
+    chunks = encode(
+        approved_rows(since=since, chunk_size=chunk_size),
+        fmt,
+        batch_size=chunk_size,
+    )
+    return gzip_stream(chunks) if compress else chunks
+
+
+def filename(fmt, compress=False):
+    return f'articles.{fmt}' + ('.gz' if compress else '')
+
+
+class _LineBuffer:
+    # file-like target for csv.writer that hands back what was written
+    def __init__(self):
+        self.parts = []
+
+    def write(self, text):
+        self.parts.append(text)
+
+    def flush(self):
+        data = ''.join(self.parts).encode()
+        self.parts = []
+        return data
+
+
+def _csv_value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return '' if value is None else value
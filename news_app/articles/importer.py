@@ -0,0 +1,175 @@
+import csv
+import gzip
+import json
+import os
+from dataclasses import dataclass, field
+
+from django.contrib.auth import get_user_model
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import is_naive, make_aware
+
+from publishers.models import Publisher
+
+from .models import Article
+from .export import CSV, FORMATS, JSONL
+
+User = get_user_model()
+
+TITLE_MAX_LENGTH = Article._meta.get_field('title').max_length
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+
+
+class ImportRowError(ValueError):
+    '''Raised when an input record cannot be imported as an article.'''
+
+
+def detect_format(path):
+    name = path[:-3] if path.endswith('.gz') else path
+    extension = os.path.splitext(name)[1].lstrip('.').lower()
+    if extension in ('json', 'ndjson'):
+        return JSONL
+    if extension in FORMATS:
+        return extension
+    raise ValueError(f'Cannot tell the format of {path}; pass --format.')
+
+
+def read_records(path, fmt):
+    ''' Yield the records of a JSON lines or CSV file (optionally
+        gzipped) one at a time, as dicts.
+    '''
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8', newline='') as source:
+        if fmt == CSV:
+            yield from csv.DictReader(source)
+            return
+        for number, line in enumerate(source, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            if not isinstance(record, dict):
+                # keep the position so that the checkpoint stays aligned
+                yield {'_error': f'line {number} is not a JSON object'}
+                continue
+            yield record
+
+
+@dataclass
+class Lookups:
+    ''' Journalists and publishers by id and name, loaded once so that
+        every record is validated without a query.
+    '''
+    authors_by_id: dict = field(default_factory=dict)
+    authors_by_username: dict = field(default_factory=dict)
+    publishers_by_id: dict = field(default_factory=dict)
+    publishers_by_name: dict = field(default_factory=dict)
+    memberships: set = field(default_factory=set)
+
+    @classmethod
+    def load(cls):
+        lookups = cls()
+        for pk, username in User.objects.filter(
+            role='journalist'
+        ).values_list('pk', 'username').iterator():
+            lookups.authors_by_id[pk] = pk
+            lookups.authors_by_username[username] = pk
+        for pk, name in Publisher.objects.values_list('pk', 'name'):
+            lookups.publishers_by_id[pk] = pk
+            lookups.publishers_by_name[name] = pk
+        lookups.memberships = set(
+            Publisher.journalists.through.objects.values_list(
+                'publisher_id', 'user_id'
+            ).iterator()
+        )
+        return lookups
+
+    def author(self, record):
+        return self._resolve(
+            record, 'author', self.authors_by_id, self.authors_by_username,
+            'author_username',
+        )
+
+    def publisher(self, record):
+        return self._resolve(
+            record, 'publisher', self.publishers_by_id,
+            self.publishers_by_name, 'publisher_name',
+        )
+
+    @staticmethod
+    def _resolve(record, label, by_id, by_name, name_key):
+        raw_id = record.get(f'{label}_id')
+        if raw_id not in (None, ''):
+            try:
+                return by_id[int(raw_id)]
+            except (KeyError, TypeError, ValueError):
+                raise ImportRowError(f'unknown {label} id {raw_id!r}')
+        name = record.get(name_key)
+        if name not in (None, ''):
+            try:
+                return by_name[name]
+            except KeyError:
+                raise ImportRowError(f'unknown {label} {name!r}')
+        return None
+
+
+def build_article(record, lookups, approved=False):
+    ''' Validate a record and return the unsaved Article it describes.
+
+        Records name their author and publisher by ``author_id`` or
+        ``author_username`` and ``publisher_id`` or ``publisher_name``, as
+        the export writes them. The author must be a journalist, and a
+        member of the publisher if one is given.
+
+        :approved: Whether records without an ``approved`` value are
+            imported as approved.
+    '''
+    if '_error' in record:
+        raise ImportRowError(record['_error'])
+    title = str(record.get('title') or '').strip()
+    content = str(record.get('content') or '')
+    if not title:
+        raise ImportRowError('missing title')
+    if len(title) > TITLE_MAX_LENGTH:
+        raise ImportRowError(f'title longer than {TITLE_MAX_LENGTH}')
+    if not content.strip():
+        raise ImportRowError('missing content')
+
+    author_id = lookups.author(record)
+    if author_id is None:
+        raise ImportRowError('missing author')
+    publisher_id = lookups.publisher(record)
+    if publisher_id is not None and (
+        (publisher_id, author_id) not in lookups.memberships
+    ):
+        raise ImportRowError('author is not a member of the publisher')
+
+    article = Article(
+        title=title,
+        content=content,
+        author_id=author_id,
+        publisher_id=publisher_id,
+        approved=_boolean(record.get('approved'), approved),
+    )
+    article.imported_created_at = _datetime(record.get('created_at'))
+    article.update_derived_fields()
+    return article
+
+
+def _boolean(value, default):
+    if value in (None, ''):
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def _datetime(value):
+    if value in (None, ''):
+        return None
+    parsed = parse_datetime(str(value))
+    if parsed is None:
+        raise ImportRowError(f'invalid created_at {value!r}')
+    return make_aware(parsed) if is_naive(parsed) else parsed
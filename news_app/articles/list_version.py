@@ -0,0 +1,30 @@
+from django.db.models import F
+
+from articles.models import ArticleListVersion
+
+# the primary key of the one row
+ROW = 1
+
+
+def current():
+    ''' The version of the approved article list, with one primary key
+        lookup.
+    '''
+    version = ArticleListVersion.objects.filter(
+        pk=ROW
+    ).values_list('version', flat=True).first()
+    return version or 0
+
+
+def bump():
+    ''' Move the article list to a new version. Call it inside the
+        transaction that changes the list, so the new version commits (or
+        rolls back) with the change.
+    '''
+    if not ArticleListVersion.objects.filter(pk=ROW).update(
+        version=F('version') + 1
+    ):
+        ArticleListVersion.objects.get_or_create(pk=ROW)
+        ArticleListVersion.objects.filter(pk=ROW).update(
+            version=F('version') + 1
+        )
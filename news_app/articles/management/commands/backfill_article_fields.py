@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from articles.models import Article
+
+
+class Command(BaseCommand):
+    ''' Fill in excerpt, word_count and reading_time for existing articles.
+
+        Articles are read in primary key order, ``--batch-size`` at a time
+        with only their content loaded, and each batch is written back with
+        one bulk UPDATE in its own transaction, so the command can be
+        stopped and rerun on a large table. By default only articles with
+        no word count yet are processed; ``--all`` recomputes every row.
+    '''
+    help = 'Backfill the fields derived from article content.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Articles read and updated per batch.',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recompute every article, not just those missing values.',
+        )
+
+    def handle(self, *args, **options):
+        articles = Article.objects.order_by('pk').only('pk', 'content')
+        if not options['all']:
+            articles = articles.filter(word_count=0)
+
+        last_pk = 0
+        updated = 0
+        while batch := list(
+            articles.filter(pk__gt=last_pk)[:options['batch_size']]
+        ):
+            for article in batch:
+                article.update_derived_fields()
+            with transaction.atomic():
+                Article.objects.bulk_update(batch, Article.DERIVED_FIELDS)
+            last_pk = batch[-1].pk
+            updated += len(batch)
+            self.stdout.write(f'{updated} articles updated...', ending='\r')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Backfilled {updated} articles.'
+        ))
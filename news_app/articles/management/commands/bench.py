@@ -0,0 +1,119 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from news_app import bench
+
+
+class Command(BaseCommand):
+    ''' Benchmark the hot paths: the feed query, the article list page,
+        serializer throughput, the approval fan-out to ``--subscribers``
+        readers, the article and newsletter form setup and JWT
+        authenticated API calls. Each reports its fastest and median time,
+        query count and peak allocations (tracemalloc).
+
+        The dataset is seeded with ``seed_scale`` into a throwaway test
+        database, created like the test runner's and dropped afterwards,
+        so the timings do not depend on what the configured database
+        holds. Every run of a benchmark is rolled back.
+
+        ``--save`` writes the report as a baseline; ``--baseline`` compares
+        with one and fails if a benchmark got slower or allocates more than
+        the thresholds allow, or runs more queries. Compare baselines taken
+        on the same machine and database only.
+    '''
+    help = 'Benchmark the hot paths and compare with a baseline.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            choices=bench.names(),
+            help='Benchmarks to run (default all).',
+        )
+        parser.add_argument(
+            '--scale',
+            type=int,
+            default=1,
+            help='Multiplier of the seeded dataset '
+                 '(500 readers and 2000 articles per step).',
+        )
+        parser.add_argument(
+            '--subscribers',
+            type=int,
+            default=1000,
+            help='Subscribers notified by the approval fan-out.',
+        )
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--warmup', type=int, default=1)
+        parser.add_argument('--baseline', help='Baseline JSON to compare to.')
+        parser.add_argument('--save', help='Write the report to this path.')
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.2,
+            help='Allowed relative slowdown of the fastest run.',
+        )
+        parser.add_argument(
+            '--memory-threshold',
+            type=float,
+            default=0.2,
+            help='Allowed relative growth of the peak allocations.',
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print the report as JSON.',
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1.')
+        baseline = None
+        if options['baseline']:
+            try:
+                baseline = bench.load_baseline(options['baseline'])
+            except (OSError, ValueError) as exc:
+                raise CommandError(f'Cannot read the baseline: {exc}')
+
+        report = bench.run(
+            selected=options['only'],
+            scale=options['scale'],
+            subscribers=options['subscribers'],
+            repeat=options['repeat'],
+            warmup=options['warmup'],
+            progress=None if options['json'] else self.progress,
+        )
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        if options['save']:
+            bench.save_baseline(report, options['save'])
+            if not options['json']:
+                self.stdout.write(f'Saved the report to {options["save"]}.')
+
+        if baseline is None:
+            return
+        regressions = bench.compare(
+            report,
+            baseline,
+            time_threshold=options['threshold'],
+            memory_threshold=options['memory_threshold'],
+        )
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(regression)
+            raise CommandError(
+                f'{len(regressions)} regressions against baseline '
+                f'{baseline.get("commit") or options["baseline"]}.'
+            )
+        if not options['json']:
+            self.stdout.write(self.style.SUCCESS(
+                'No regressions against the baseline.'
+            ))
+
+    def progress(self, name, result):
+        self.stdout.write(
+            f'{name:<24}{result["min_ms"]:>10.2f} ms (median '
+            f'{result["median_ms"]:.2f}){result["queries"]:>6} queries'
+            f'{result["peak_kb"]:>10.1f} KB'
+        )
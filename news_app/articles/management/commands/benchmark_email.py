@@ -0,0 +1,132 @@
+import time
+
+from django.core.mail import EmailMessage
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from articles.services import email_delivery
+from articles.services.smtp_stub import SMTPStubServer
+
+SUBJECT = 'New Article Published: Benchmark'
+BODY = 'Benchmark\n\nBy benchmark\n\n' + 'Lorem ipsum dolor sit amet. ' * 8
+
+
+class Command(BaseCommand):
+    ''' Measure notification email throughput against a local SMTP
+        stand-in (or a real server given with ``--host``/``--port``).
+
+        Compares the old single message to every subscriber, one message
+        per recipient on a new connection each, one message per recipient
+        over a reused connection, and Bcc chunks over a reused connection.
+    '''
+    help = 'Benchmark notification email delivery.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipients',
+            type=int,
+            default=1000,
+            help='Number of recipients per run.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=50,
+            help='Recipients per Bcc message.',
+        )
+        parser.add_argument(
+            '--latency-ms',
+            type=float,
+            default=0.0,
+            help='Delay the stand-in server adds to every SMTP command.',
+        )
+        parser.add_argument(
+            '--host',
+            help='Benchmark an existing SMTP server instead of the stand-in.',
+        )
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=25,
+        )
+
+    def handle(self, *args, **options):
+        recipients = [
+            f'reader{number}@example.com'
+            for number in range(options['recipients'])
+        ]
+
+        server = None
+        host, port = options['host'], options['port']
+        if host is None:
+            server = SMTPStubServer(
+                latency=options['latency_ms'] / 1000
+            ).start()
+            host, port = '127.0.0.1', server.port
+
+        scenarios = [
+            ('single message', lambda: self._single(recipients)),
+            ('individual, new connections',
+             lambda: self._unpooled(recipients)),
+            ('individual, reused connection', lambda: email_delivery.deliver(
+                SUBJECT, BODY, recipients, mode=email_delivery.INDIVIDUAL
+            )),
+            (f'bcc x{options["chunk_size"]}, reused connection',
+             lambda: email_delivery.deliver(
+                 SUBJECT, BODY, recipients,
+                 mode=email_delivery.BCC,
+                 chunk_size=options['chunk_size'],
+             )),
+        ]
+
+        self.stdout.write(
+            f'{"scenario":<34}{"messages":>10}{"conns":>7}'
+            f'{"seconds":>10}{"msg/s":>10}{"rcpt/s":>10}'
+        )
+        try:
+            with override_settings(
+                EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+                EMAIL_HOST=host,
+                EMAIL_PORT=port,
+                EMAIL_USE_TLS=False,
+                EMAIL_USE_SSL=False,
+                EMAIL_HOST_USER='',
+                EMAIL_HOST_PASSWORD='',
+            ):
+                for label, run in scenarios:
+                    self._measure(label, run, len(recipients), server)
+        finally:
+            email_delivery.close_worker_connection()
+            if server is not None:
+                server.stop()
+
+    def _measure(self, label, run, recipient_count, server):
+        email_delivery.close_worker_connection()
+        if server is not None:
+            server.reset()
+
+        started = time.perf_counter()
+        messages = run()
+        email_delivery.close_worker_connection()
+        elapsed = time.perf_counter() - started
+
+        if isinstance(messages, email_delivery.DeliveryResult):
+            messages = messages.messages
+        connections = server.stats['connections'] if server else '-'
+        self.stdout.write(
+            f'{label:<34}{messages:>10}{connections:>7}'
+            f'{elapsed:>10.2f}{messages / elapsed:>10.0f}'
+            f'{recipient_count / elapsed:>10.0f}'
+        )
+
+    @staticmethod
+    def _single(recipients):
+        # the previous behaviour: one message addressed to everyone
+        EmailMessage(SUBJECT, BODY, to=recipients).send()
+        return 1
+
+    @staticmethod
+    def _unpooled(recipients):
+        for recipient in recipients:
+            EmailMessage(SUBJECT, BODY, to=[recipient]).send()
+        return len(recipients)
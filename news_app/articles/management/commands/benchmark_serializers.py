@@ -0,0 +1,121 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from articles.api.serializers import (
+    ArticleListSerializer,
+    article_values,
+    serialize_article_rows,
+)
+from articles.models import Article
+from publishers.models import Publisher
+
+User = get_user_model()
+
+CONTENT = 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 20
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    ''' Measure article list serialization throughput.
+
+        Compares ArticleListSerializer over a plain queryset (one query per
+        author and publisher), over a ``select_related`` queryset with the
+        content deferred, and the ``values()`` fast path used by the list
+        API.
+        Sample articles are created in a transaction that is rolled back
+        afterwards, so the command is safe to run against any database.
+    '''
+    help = 'Benchmark article list serialization.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--articles',
+            type=int,
+            default=1000,
+            help='Number of articles serialized per run.',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Runs per scenario; the fastest is reported.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._seed(options['articles'])
+                self._run(options['articles'], options['repeat'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _seed(self, count):
+        authors = [
+            User.objects.create(
+                username=f'benchmark-serializer-{number}', role='journalist'
+            )
+            for number in range(10)
+        ]
+        publisher = Publisher.objects.create(
+            name='Benchmark serializer publisher', description='Benchmark.'
+        )
+        articles = [
+            Article(
+                title=f'Benchmark article {number}',
+                content=CONTENT,
+                author=authors[number % len(authors)],
+                publisher=publisher if number % 2 else None,
+                approved=True,
+            )
+            for number in range(count)
+        ]
+        for article in articles:
+            article.update_derived_fields()
+        Article.objects.bulk_create(articles)
+
+    def _run(self, count, repeat):
+        def articles():
+            return Article.objects.filter(
+                author__username__startswith='benchmark-serializer-'
+            )[:count]
+
+        scenarios = [
+            ('ArticleListSerializer', lambda: ArticleListSerializer(
+                articles(), many=True
+            ).data),
+            ('select_related, defer content',
+             lambda: ArticleListSerializer(
+                 articles().select_related(
+                     'author', 'publisher'
+                 ).defer('content'),
+                 many=True,
+             ).data),
+            ('values() fast path',
+             lambda: serialize_article_rows(article_values(articles()))),
+        ]
+
+        self.stdout.write(
+            f'{"scenario":<36}{"rows":>8}{"seconds":>10}'
+            f'{"rows/s":>10}{"speedup":>9}'
+        )
+        baseline = None
+        for label, run in scenarios:
+            elapsed = min(self._time(run) for _ in range(repeat))
+            baseline = baseline or elapsed
+            self.stdout.write(
+                f'{label:<36}{count:>8}{elapsed:>10.3f}'
+                f'{count / elapsed:>10.0f}{baseline / elapsed:>8.1f}x'
+            )
+
+    @staticmethod
+    def _time(run):
+        started = time.perf_counter()
+        run()
+        return time.perf_counter() - started
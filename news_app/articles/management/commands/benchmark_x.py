@@ -0,0 +1,94 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand
+
+from articles.services.x_publisher import CircuitBreaker, XClient
+from articles.services.x_stub import XStubServer
+
+TEXT = 'New Article Published\n\nBenchmark\n\nBy benchmark'
+
+
+class Command(BaseCommand):
+    ''' Measure X posting throughput against the local stand-in.
+
+        Compares a fresh ``requests.post`` per article (the previous
+        behaviour) with the pooled XClient, sequentially and from several
+        threads, and reports posts per second and connections opened.
+    '''
+    help = 'Benchmark the X publisher client against a local stand-in.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts',
+            type=int,
+            default=500,
+            help='Number of posts per run.',
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=8,
+            help='Threads used for the concurrent run.',
+        )
+        parser.add_argument(
+            '--latency-ms',
+            type=float,
+            default=0.0,
+            help='Delay the stand-in adds to every request.',
+        )
+
+    def handle(self, *args, **options):
+        posts = options['posts']
+        with XStubServer(latency=options['latency_ms'] / 1000) as server:
+            client = XClient(
+                base_url=server.base_url,
+                token='benchmark',
+                pool_size=options['threads'],
+                breaker=CircuitBreaker(threshold=posts + 1),
+            )
+            url = f'{server.base_url}tweets'
+
+            def unpooled():
+                requests.post(
+                    url,
+                    json={'text': TEXT},
+                    headers={'authorization': 'Bearer benchmark'},
+                    timeout=5,
+                ).raise_for_status()
+
+            def pooled():
+                client.post_tweet(TEXT)
+
+            self.stdout.write(
+                f'{"scenario":<28}{"posts":>8}{"conns":>8}'
+                f'{"seconds":>10}{"posts/s":>10}'
+            )
+            self._measure(server, 'requests.post', unpooled, posts, 1)
+            self._measure(server, 'pooled client', pooled, posts, 1)
+            self._measure(
+                server,
+                f'pooled client x{options["threads"]}',
+                pooled,
+                posts,
+                options['threads'],
+            )
+            client.close()
+
+    def _measure(self, server, label, post, count, threads):
+        server.reset()
+        started = time.perf_counter()
+        if threads == 1:
+            for _ in range(count):
+                post()
+        else:
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                for future in [executor.submit(post) for _ in range(count)]:
+                    future.result()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{label:<28}{server.stats["posts"]:>8}'
+            f'{server.stats["connections"]:>8}'
+            f'{elapsed:>10.2f}{count / elapsed:>10.0f}'
+        )
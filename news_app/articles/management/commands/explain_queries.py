@@ -0,0 +1,189 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.http import Http404
+from django.test import RequestFactory
+from django.utils import timezone
+
+from articles.api.views import (
+    ArticleDetailAPIView,
+    ArticleListCreateAPIView,
+    SubscribedArticleListAPIView,
+)
+from articles.models import Article
+from articles.services import editorial
+from articles.views import (
+    ApprovedArticleListView,
+    EditorArticleListView,
+    JournalistArticleListView,
+    ReaderArticleDetailView,
+)
+from news_app.pagination import DEFAULT_ORDERING, KeysetPaginator
+from news_app.plans import FULL_SCAN, TEMP_SORT, step_detail
+from newsletters.models import Newsletter
+from newsletters.views import (
+    EditorNewsletterListView,
+    JournalistNewsletterListView,
+    ReaderNewsletterListView,
+)
+from publishers.views import PublisherListView
+from subscriptions.models import JournalistSubscription, NewsletterSubscription
+from subscriptions.views import (
+    SubscribedJournalistArticleListView,
+    SubscribedNewsletterArticleListView,
+)
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    ''' Print the ``EXPLAIN QUERY PLAN`` of the query behind every list and
+        detail view, plus the subscriber lookups made on approval, and flag
+        any step that scans a whole table or sorts the rows in a temporary
+        B-tree rather than reading them in index order.
+
+        Paginated views are explained for the first page and for a page
+        after a cursor, exactly as the KeysetPaginator issues them.
+    '''
+    help = 'Explain the query plan of each view query and flag full scans.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sql',
+            action='store_true',
+            help='Also print the SQL of each query.',
+        )
+        parser.add_argument(
+            '--fail-on-scan',
+            action='store_true',
+            help='Exit with an error if any query does a full table scan.',
+        )
+        parser.add_argument(
+            '--fail-on-sort',
+            action='store_true',
+            help='Exit with an error if any query sorts in a temp B-tree.',
+        )
+
+    def handle(self, *args, **options):
+        full_scans = []
+        sorts = []
+
+        for label, queryset in self.queries():
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            if options['sql']:
+                self.stdout.write(f'  {queryset.query}')
+
+            for line in queryset.explain().splitlines():
+                detail = step_detail(line)
+                if FULL_SCAN.search(detail):
+                    full_scans.append(label)
+                    self.stdout.write(self.style.ERROR(f'  {detail}'))
+                elif TEMP_SORT.search(detail):
+                    sorts.append(label)
+                    self.stdout.write(self.style.ERROR(f'  {detail}'))
+                else:
+                    self.stdout.write(f'  {detail}')
+
+        failures = []
+        for found, message, fail in (
+            (full_scans, 'Full table scan in: ', options['fail_on_scan']),
+            (sorts, 'Temp B-tree sort in: ', options['fail_on_sort']),
+        ):
+            if not found:
+                continue
+            message += ', '.join(found)
+            if fail:
+                failures.append(message)
+            self.stdout.write(self.style.WARNING(message))
+        if failures:
+            raise CommandError(' '.join(failures))
+        if not full_scans:
+            self.stdout.write(self.style.SUCCESS('No full table scans.'))
+        if not sorts:
+            self.stdout.write(self.style.SUCCESS('No temp B-tree sorts.'))
+
+    def queries(self):
+        reader = self.sample_user('reader')
+        journalist = self.sample_user('journalist')
+        editor = self.sample_user('editor')
+        newsletter_id = (
+            Newsletter.objects.values_list('pk', flat=True).first() or 0
+        )
+        article = Article(pk=0, author=journalist)
+
+        views = [
+            (ApprovedArticleListView, reader, {}, True),
+            (ReaderArticleDetailView, reader, {'pk': 0}, False),
+            (JournalistArticleListView, journalist, {}, True),
+            (SubscribedJournalistArticleListView, reader,
+             {'journalist_id': journalist.pk}, True),
+            (SubscribedNewsletterArticleListView, reader,
+             {'newsletter_id': newsletter_id}, True),
+            (ReaderNewsletterListView, reader, {}, True),
+            (JournalistNewsletterListView, journalist, {}, True),
+            (EditorNewsletterListView, editor, {}, True),
+            (PublisherListView, editor, {}, True),
+            (ArticleListCreateAPIView, reader, {}, True),
+            (ArticleDetailAPIView, reader, {'pk': 0}, False),
+            (SubscribedArticleListAPIView, reader, {}, True),
+        ]
+
+        for view_class, user, kwargs, paginated in views:
+            name = view_class.__name__
+            try:
+                queryset = self.view_queryset(view_class, user, kwargs)
+            except Http404:
+                self.stdout.write(self.style.WARNING(
+                    f'{name}: skipped, no sample data for {kwargs}'
+                ))
+                continue
+
+            if not paginated:
+                # get() drops the ordering, so the detail lookup has none
+                yield name, queryset.filter(pk=kwargs['pk']).order_by()
+                continue
+
+            ordering = getattr(
+                view_class, 'pagination_ordering', DEFAULT_ORDERING
+            )
+            yield from self.pages(
+                name, KeysetPaginator(queryset, ordering=ordering)
+            )
+
+        # the editor list pages each publisher on its own and merges them
+        editor_pages = editorial.EditorArticlePaginator(
+            editor, Article.objects.defer('content')
+        )
+        for number, source in enumerate(editor_pages.sources):
+            label = 'independent' if number == 0 else f'publisher {number}'
+            yield from self.pages(
+                f'{EditorArticleListView.__name__} ({label})', source
+            )
+
+        # subscriber lookups made when an article is approved
+        yield 'Journalist subscribers', JournalistSubscription.objects.filter(
+            journalist=journalist
+        ).values_list('reader_id', flat=True)
+        yield 'Newsletter subscribers', NewsletterSubscription.objects.filter(
+            newsletter__articles=article
+        ).values_list('reader_id', flat=True)
+
+    def pages(self, name, paginator):
+        yield f'{name} (first page)', paginator.page_queryset()[0]
+        cursor = paginator.encode_cursor(dict.fromkeys(
+            paginator.fields, timezone.now()
+        ) | {paginator.fields[-1]: 0})
+        yield (f'{name} (page after cursor)',
+               paginator.page_queryset(cursor)[0])
+
+    def view_queryset(self, view_class, user, kwargs):
+        request = RequestFactory().get('/')
+        request.user = user
+        view = view_class()
+        view.setup(request, **kwargs)
+        return view.get_queryset()
+
+    def sample_user(self, role):
+        # explain against real rows when there are any, otherwise an
+        # unsaved placeholder is enough to build the query
+        user = User.objects.filter(role=role).first()
+        return user or User(pk=0, username=f'sample-{role}', role=role)
@@ -0,0 +1,74 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import is_naive, make_aware
+
+from articles import export
+
+
+class Command(BaseCommand):
+    ''' Write every approved article as JSON lines or CSV, the same stream
+        the ``/api/articles/export/`` endpoint serves.
+
+        Rows are read in keyset chunks and written as they arrive, so
+        memory stays flat however large the table is.
+    '''
+    help = 'Export approved articles as JSON lines or CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format',
+            choices=export.FORMATS,
+            default=export.JSONL,
+        )
+        parser.add_argument(
+            '--since',
+            help='Only articles changed at or after this ISO 8601 datetime.',
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Compress the output with gzip.',
+        )
+        parser.add_argument(
+            '--output',
+            help='File to write to (default: standard output).',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=export.CHUNK_SIZE,
+            help='Rows fetched per query.',
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_datetime(options['since'])
+            if since is None:
+                raise CommandError('--since must be an ISO 8601 datetime.')
+            if is_naive(since):
+                since = make_aware(since)
+
+        stream = export.export(
+            options['format'],
+            since=since,
+            compress=options['gzip'],
+            chunk_size=options['chunk_size'],
+        )
+        written = 0
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                for data in stream:
+                    output.write(data)
+                    written += len(data)
+        else:
+            for data in stream:
+                sys.stdout.buffer.write(data)
+                written += len(data)
+            sys.stdout.buffer.flush()
+
+        self.stderr.write(self.style.SUCCESS(
+            f'Wrote {written} bytes of {options["format"]}.'
+        ))
@@ -0,0 +1,166 @@
+import itertools
+import os
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from articles import importer, list_version, page_cache, search
+from articles.models import Article, ImportCheckpoint
+
+# rejected records reported individually before only counting them
+MAX_REPORTED_ERRORS = 20
+
+
+class Command(BaseCommand):
+    ''' Import articles from a JSON lines or CSV file, such as an archive
+        or a file written by ``export_articles``.
+
+        The file is read one record at a time and records are validated
+        against journalists and publishers loaded up front. Valid articles
+        are inserted with ``bulk_create``, one transaction per batch. Bulk
+        inserts send no model signals, so nothing is emailed, posted or
+        pushed to feeds; ``--reindex`` brings the search index and reader
+        feeds up to date afterwards. It also drops the cached pages, which
+        only reaches running servers when CACHES is a shared backend: with
+        the per-process default they keep their pages until they expire.
+        The API list ETag lives in the database and moves with each batch.
+
+        The position in the file is saved as an ImportCheckpoint in the
+        same transaction as each batch, and a rerun resumes from there, so
+        a crash at any point never imports a batch twice.
+    '''
+    help = 'Bulk import articles from a JSON lines or CSV file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='JSON lines or CSV file, or .gz.')
+        parser.add_argument(
+            '--format',
+            choices=importer.FORMATS,
+            help='Input format (default: from the file extension).',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Articles inserted per transaction.',
+        )
+        parser.add_argument(
+            '--approved',
+            action='store_true',
+            help='Import records without an approved value as approved.',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Checkpoint name (default: the absolute PATH).',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore an existing checkpoint and start from the top.',
+        )
+        parser.add_argument(
+            '--reindex',
+            action='store_true',
+            help='Rebuild the search index and reader feeds afterwards.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'{path} does not exist.')
+        try:
+            fmt = options['format'] or importer.detect_format(path)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        name = options['checkpoint'] or os.path.abspath(path)
+        if options['restart']:
+            ImportCheckpoint.objects.filter(name=name).delete()
+        checkpoint, created = ImportCheckpoint.objects.get_or_create(
+            name=name
+        )
+        state = {
+            'records': checkpoint.records,
+            'imported': checkpoint.imported,
+            'rejected': checkpoint.rejected,
+        }
+        if not created:
+            self.stdout.write(
+                f'Resuming after record {state["records"]}.'
+            )
+
+        lookups = importer.Lookups.load()
+        records = itertools.islice(
+            importer.read_records(path, fmt), state['records'], None
+        )
+        started = time.perf_counter()
+        processed = 0
+        while batch := list(
+            itertools.islice(records, options['batch_size'])
+        ):
+            articles = []
+            for offset, record in enumerate(batch, start=1):
+                try:
+                    articles.append(importer.build_article(
+                        record, lookups, approved=options['approved']
+                    ))
+                except importer.ImportRowError as exc:
+                    state['rejected'] += 1
+                    if state['rejected'] <= MAX_REPORTED_ERRORS:
+                        self.stderr.write(
+                            f'Record {state["records"] + offset}: {exc}'
+                        )
+
+            state['records'] += len(batch)
+            state['imported'] += len(articles)
+            self._insert(articles, name, state)
+
+            processed += len(batch)
+            rate = processed / (time.perf_counter() - started)
+            self.stdout.write(
+                f'{state["records"]} records, {state["imported"]} imported, '
+                f'{state["rejected"]} rejected, {rate:.0f} rows/s',
+                ending='\r',
+            )
+
+        ImportCheckpoint.objects.filter(name=name).delete()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {state["imported"]} articles from {state["records"]} '
+            f'records ({state["rejected"]} rejected) in {elapsed:.1f}s, '
+            f'{processed / elapsed if elapsed else 0:.0f} rows/s.'
+        ))
+
+        if options['reindex']:
+            self._reindex()
+
+    @staticmethod
+    def _insert(articles, checkpoint, state):
+        with transaction.atomic():
+            Article.objects.bulk_create(articles)
+            # created_at is set by auto_now_add on insert, so dates carried
+            # over from the archive are written afterwards
+            dated = [
+                article for article in articles
+                if article.imported_created_at is not None
+            ]
+            for article in dated:
+                article.created_at = article.imported_created_at
+            if dated:
+                Article.objects.bulk_update(dated, ['created_at'])
+            if any(article.approved for article in articles):
+                list_version.bump()
+            # commits with the batch, or rolls back with it
+            ImportCheckpoint.objects.update_or_create(
+                name=checkpoint, defaults=state
+            )
+
+    def _reindex(self):
+        self.stdout.write('Rebuilding the search index...')
+        search.rebuild_index()
+        call_command('rebuild_feeds', stdout=self.stdout)
+        page_cache.invalidate(page_cache.LIST_VERSION)
+        self.stdout.write(self.style.SUCCESS('Reindexed.'))
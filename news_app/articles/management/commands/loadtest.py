@@ -0,0 +1,98 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from news_app import loadtest
+
+
+class Command(BaseCommand):
+    ''' Drive scripted reader, journalist, editor and API journeys at a
+        given concurrency and report throughput and latency percentiles
+        per endpoint as JSON.
+
+        Requests go through the application in this process unless
+        ``--url`` names a running server, which must use the same database
+        since the accounts and articles are sampled from it. The journeys
+        log in as existing users with ``--password``; ``seed_scale``
+        creates suitable ones. They also write (articles, approvals and
+        subscriptions), so point them at a seeded database only.
+    '''
+    help = 'Load test the main user journeys.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            help='Base URL of a running server, e.g. http://127.0.0.1:8000.',
+        )
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument(
+            '--duration',
+            type=float,
+            help='Seconds to run for.',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            help='Journeys per worker; the default when no --duration '
+                 'is given is 10.',
+        )
+        parser.add_argument(
+            '--mix',
+            default=','.join(
+                f'{name}={weight}'
+                for name, weight in loadtest.DEFAULT_MIX.items()
+            ),
+            help='Journey weights, e.g. reader=70,api=30.',
+        )
+        parser.add_argument(
+            '--prefix',
+            default='seed-',
+            help='Only log in as users whose username starts with this.',
+        )
+        parser.add_argument('--password', default='password')
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Seed for the choice of journeys, users and articles.',
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the JSON report to this file instead of stdout.',
+        )
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency must be at least 1.')
+        try:
+            mix = loadtest.parse_mix(options['mix'])
+        except ValueError as error:
+            raise CommandError(error)
+
+        fixtures = loadtest.Fixtures.load(
+            options['password'], prefix=options['prefix']
+        )
+        try:
+            report = loadtest.run(
+                fixtures,
+                mix=mix,
+                concurrency=options['concurrency'],
+                duration=options['duration'],
+                iterations=options['iterations'],
+                base_url=options['url'],
+                seed=options['seed'],
+            )
+        except loadtest.LoadTestError as error:
+            raise CommandError(error)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as target:
+                target.write(output + '\n')
+            total = report['total']
+            self.stdout.write(
+                f'{total["requests"]} requests, {total["rps"]} req/s, '
+                f'p95 {total["p95_ms"]} ms; report written to '
+                f'{options["output"]}.'
+            )
+        else:
+            self.stdout.write(output)
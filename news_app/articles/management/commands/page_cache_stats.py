@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from articles import page_cache
+
+
+class Command(BaseCommand):
+    ''' Print the hit and miss counts of the reader page cache. '''
+    help = 'Show reader page cache hit rates.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Reset the counters after printing them.',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"view":<28}{"hits":>10}{"misses":>10}{"hit rate":>10}'
+        )
+        for view, counts in page_cache.stats().items():
+            total = counts['hits'] + counts['misses']
+            rate = counts['hits'] / total if total else 0
+            self.stdout.write(
+                f'{view:<28}{counts["hits"]:>10}{counts["misses"]:>10}'
+                f'{rate:>10.1%}'
+            )
+        if options['reset']:
+            page_cache.reset_stats()
@@ -0,0 +1,135 @@
+import io
+import os
+import pstats
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from news_app import profiling
+
+
+class Command(BaseCommand):
+    ''' List the request profiles captured by ProfilingMiddleware, or
+        summarize one of them: the top functions by cumulative time for a
+        cProfile capture, by samples for a sampled one.
+
+        Without a name the captures are listed newest first. ``--delete``
+        removes the named capture, or all of them with ``--all``.
+    '''
+    help = 'List and summarize captured request profiles.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'name',
+            nargs='?',
+            help='Capture to summarize (a unique prefix is enough).',
+        )
+        parser.add_argument(
+            '--dir',
+            help='Directory of the captures (default PROFILE_DIR).',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=20,
+            help='Captures listed, or functions shown in a summary.',
+        )
+        parser.add_argument(
+            '--sort',
+            default='cumulative',
+            help='pstats sort key for cProfile summaries, e.g. tottime.',
+        )
+        parser.add_argument('--delete', action='store_true')
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='With --delete, delete every capture.',
+        )
+
+    def handle(self, *args, **options):
+        self.directory = options['dir'] or settings.PROFILE_DIR
+        if not self.directory:
+            raise CommandError('Set PROFILE_DIR or pass --dir.')
+        captures = profiling.captures(self.directory)
+
+        if options['delete']:
+            if options['all']:
+                targets = captures
+            elif options['name']:
+                targets = [self.find(captures, options['name'])]
+            else:
+                raise CommandError('Name a capture to delete, or pass --all.')
+            for meta in targets:
+                self.delete(meta)
+            self.stdout.write(f'Deleted {len(targets)} captures.')
+        elif options['name']:
+            meta = self.find(captures, options['name'])
+            self.summarize(meta, options['limit'], options['sort'])
+        else:
+            self.list_captures(captures[:options['limit']], len(captures))
+
+    def find(self, captures, name):
+        matches = [meta for meta in captures if meta['name'].startswith(name)]
+        if not matches:
+            raise CommandError(f'No capture named {name!r}.')
+        if len(matches) > 1:
+            raise CommandError(
+                f'{name!r} matches {len(matches)} captures; be more specific.'
+            )
+        return matches[0]
+
+    def list_captures(self, captures, total):
+        if not captures:
+            self.stdout.write('No captures.')
+            return
+        self.stdout.write(
+            f'{"captured":<20}{"mode":<10}{"ms":>9}{"status":>8}  '
+            f'{"user":<12}{"request"}'
+        )
+        for meta in captures:
+            self.stdout.write(
+                f'{meta["captured_at"][:19]:<20}{meta["mode"]:<10}'
+                f'{meta["duration_ms"]:>9.1f}{meta["status"]:>8}  '
+                f'{meta["user"][:11]:<12}{meta["method"]} {meta["path"]}'
+            )
+            self.stdout.write(f'    {meta["name"]}')
+        if total > len(captures):
+            self.stdout.write(f'... {total - len(captures)} more.')
+
+    def summarize(self, meta, limit, sort):
+        path = os.path.join(self.directory, meta['file'])
+        self.stdout.write(
+            f'{meta["method"]} {meta["path"]} ({meta["view"]}) by '
+            f'{meta["user"]}: {meta["status"]} in {meta["duration_ms"]} ms, '
+            f'{meta["mode"]}'
+        )
+        self.stdout.write(f'File: {path}')
+        if meta['mode'] == profiling.CPROFILE:
+            output = io.StringIO()
+            stats = pstats.Stats(path, stream=output)
+            try:
+                stats.strip_dirs().sort_stats(sort).print_stats(limit)
+            except KeyError:
+                raise CommandError(f'Unknown sort key {sort!r}.')
+            self.stdout.write(output.getvalue())
+            return
+
+        samples = meta.get('samples') or 0
+        self.stdout.write(f'{samples} samples')
+        self.stdout.write(f'{"own":>7}{"total":>8}  function')
+        for own, total, frame in profiling.summarize_folded(path, limit):
+            self.stdout.write(
+                f'{_share(own, samples):>7}{_share(total, samples):>8}  '
+                f'{frame}'
+            )
+
+    def delete(self, meta):
+        for filename in (meta['file'], meta['name'] + profiling.META):
+            try:
+                os.remove(os.path.join(self.directory, filename))
+            except FileNotFoundError:
+                pass
+
+
+def _share(count, samples):
+    return f'{count / samples:.0%}' if samples else str(count)
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from articles import search
+
+
+class Command(BaseCommand):
+    ''' Rebuild the full-text search index from the approved articles.
+
+        Articles are copied into the index in primary key chunks, each in
+        its own transaction, so readers and writers are only blocked for
+        the length of one chunk rather than the whole rebuild.
+    '''
+    help = 'Rebuild the article full-text search index.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Number of articles indexed per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            raise CommandError(
+                'Full-text search requires the SQLite database backend.'
+            )
+
+        started = time.perf_counter()
+        total = search.rebuild_index(
+            chunk_size=options['chunk_size'],
+            progress=lambda count: self.stdout.write(
+                f'Indexed {count} articles...'
+            ),
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {total} articles in {elapsed:.1f}s.'
+        ))
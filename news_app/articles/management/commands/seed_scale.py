@@ -0,0 +1,469 @@
+import bisect
+import itertools
+import math
+import random
+import time
+from argparse import ArgumentTypeError
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from articles import search
+from articles.models import Article
+from newsletters.models import Newsletter
+from publishers.models import Publisher
+from subscriptions.models import JournalistSubscription, NewsletterSubscription
+
+User = get_user_model()
+
+WORDS = (
+    'the council market report city government election economy school '
+    'health water energy police court budget housing transport climate '
+    'festival team season record history local national union workers '
+    'company growth inflation study research hospital community village '
+    'minister policy plan public private service crisis debate change '
+    'support project future region trade border rain storm harvest island '
+    'river bridge station museum library ground player coach final match '
+    'vote result survey price rates bank tax investment jobs families'
+).split()
+
+# articles per journalist, newsletters per author and subscribers per
+# journalist or newsletter follow Zipf's law with this exponent
+ZIPF_EXPONENT = 1.1
+
+# generated dates count back from here rather than from the day of the
+# run, so a seed gives the same data whenever it is run
+DEFAULT_NOW = '2026-01-01'
+
+
+def parse_now(value):
+    ''' Parse ``--now`` into an aware datetime at midnight UTC. '''
+    date = parse_date(value)
+    if date is None:
+        raise ArgumentTypeError(f'{value!r} is not a YYYY-MM-DD date.')
+    return datetime(date.year, date.month, date.day, tzinfo=dt_timezone.utc)
+
+
+class Command(BaseCommand):
+    ''' Generate a production-sized dataset for performance work.
+
+        Creates editors, journalists and readers sharing one precomputed
+        password hash, publishers with editor and journalist members,
+        articles with log-normally distributed lengths spread over
+        the ``--days`` before ``--now``, newsletters, and journalist and
+        newsletter subscriptions whose popularity follows a power law.
+        Everything is written with ``bulk_create`` in ``--batch-size``
+        transactions and is fully determined by ``--seed`` and ``--now``
+        on an empty database.
+
+        Bulk inserts send no signals: pass ``--index`` to build the search
+        index and ``--feeds`` to build the reader feeds afterwards.
+    '''
+    help = 'Seed a large synthetic dataset.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=10000)
+        parser.add_argument('--journalists', type=int, default=500)
+        parser.add_argument('--editors', type=int, default=20)
+        parser.add_argument('--publishers', type=int, default=20)
+        parser.add_argument('--articles', type=int, default=100000)
+        parser.add_argument('--newsletters', type=int, default=200)
+        parser.add_argument(
+            '--subscriptions',
+            type=float,
+            default=5,
+            help='Average journalists each reader follows.',
+        )
+        parser.add_argument(
+            '--newsletter-subscriptions',
+            type=float,
+            default=2,
+            help='Average newsletters each reader follows.',
+        )
+        parser.add_argument(
+            '--newsletter-articles',
+            type=int,
+            default=50,
+            help='Average articles in each newsletter.',
+        )
+        parser.add_argument(
+            '--median-words',
+            type=int,
+            default=600,
+            help='Median article length in words.',
+        )
+        parser.add_argument(
+            '--approved',
+            type=float,
+            default=0.9,
+            help='Share of articles that are approved.',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='Spread article dates over this many past days.',
+        )
+        parser.add_argument(
+            '--now',
+            type=parse_now,
+            default=DEFAULT_NOW,
+            help='Date the generated history ends at (YYYY-MM-DD).',
+        )
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--prefix',
+            default='seed',
+            help='Prefix of generated usernames and publisher names.',
+        )
+        parser.add_argument(
+            '--password',
+            default='password',
+            help='Password of every generated user.',
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Delete data from an earlier run with the same prefix.',
+        )
+        parser.add_argument(
+            '--index',
+            action='store_true',
+            help='Rebuild the search index afterwards.',
+        )
+        parser.add_argument(
+            '--feeds',
+            action='store_true',
+            help='Rebuild the reader feeds afterwards.',
+        )
+
+    def handle(self, *args, **options):
+        if not options['journalists'] and (
+            options['articles'] or options['newsletters']
+        ):
+            raise CommandError('Articles and newsletters need journalists.')
+        self.options = options
+        self.memberships = {}
+        self.prefix = options['prefix']
+        self.batch_size = options['batch_size']
+        self.rng = random.Random(options['seed'])
+        self.now = options['now']
+
+        existing = User.objects.filter(username__startswith=f'{self.prefix}-')
+        if options['clear']:
+            self.clear()
+        elif existing.exists():
+            raise CommandError(
+                f'Users prefixed {self.prefix!r} exist; pass --clear or '
+                f'another --prefix.'
+            )
+
+        started = time.perf_counter()
+        with preserved_timestamps():
+            editors = self.users('editor', options['editors'])
+            journalists = self.users('journalist', options['journalists'])
+            readers = self.users('reader', options['readers'])
+            self.publishers(editors, journalists)
+            articles = self.articles(journalists)
+            newsletters = self.newsletters(journalists, articles)
+            self.subscriptions(readers, journalists, newsletters)
+
+        if options['index']:
+            self.phase('search index', search.rebuild_index)
+        if options['feeds']:
+            self.phase('reader feeds', lambda: call_command(
+                'rebuild_feeds', stdout=self.stdout
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded in {time.perf_counter() - started:.1f}s.'
+        ))
+
+    # generators
+
+    def users(self, role, count):
+        password = self.password_hash()
+        joined = self.now - timedelta(days=self.options['days'])
+        rows = (
+            User(
+                username=f'{self.prefix}-{role}-{number}',
+                email=f'{self.prefix}-{role}-{number}@example.com',
+                password=password,
+                role=role,
+                date_joined=joined,
+            )
+            for number in range(count)
+        )
+        return [user.pk for user in self.insert(User, rows, f'{role}s')]
+
+    def publishers(self, editors, journalists):
+        count = self.options['publishers']
+        if not count:
+            return
+        publishers = [
+            publisher.pk for publisher in self.insert(Publisher, (
+                Publisher(
+                    name=f'{self.prefix} publisher {number}',
+                    description=self.sentence(12),
+                )
+                for number in range(count)
+            ), 'publishers')
+        ]
+
+        # every editor edits one or two publishers; most journalists write
+        # for one, some for two and some are independent
+        Editors = Publisher.editors.through
+        Journalists = Publisher.journalists.through
+        self.insert(Editors, (
+            Editors(publisher_id=publisher_id, user_id=editor_id)
+            for editor_id in editors
+            for publisher_id in self.rng.sample(
+                publishers, min(len(publishers), self.rng.choice((1, 2)))
+            )
+        ), 'publisher editors')
+        for journalist_id in journalists:
+            picks = self.rng.choices((0, 1, 2), weights=(3, 6, 1))[0]
+            self.memberships[journalist_id] = self.rng.sample(
+                publishers, min(len(publishers), picks)
+            )
+        self.insert(Journalists, (
+            Journalists(publisher_id=publisher_id, user_id=journalist_id)
+            for journalist_id, publisher_ids in self.memberships.items()
+            for publisher_id in publisher_ids
+        ), 'publisher journalists')
+
+    def articles(self, journalists):
+        ''' Insert the articles and return the approved ids by author. '''
+        count = self.options['articles']
+        memberships = self.memberships
+        pick_author = self.zipf_picker(journalists)
+        sigma = 0.6
+        mu = math.log(self.options['median_words'])
+        span = max(1, self.options['days'] * 86400)
+
+        # oldest first, so that ids grow with created_at as in production.
+        # Only the dates are drawn up front: the articles themselves are
+        # generated batch by batch to keep memory flat.
+        offsets = sorted(
+            (self.rng.randrange(span) for _ in range(count)), reverse=True
+        )
+
+        def rows():
+            for offset in offsets:
+                author_id = pick_author()
+                words = min(20000, max(
+                    40, int(self.rng.lognormvariate(mu, sigma))
+                ))
+                publishers = memberships.get(author_id)
+                created_at = self.now - timedelta(seconds=offset)
+                article = Article(
+                    title=self.sentence(self.rng.randint(4, 12)).rstrip('.'),
+                    content=self.body(words),
+                    author_id=author_id,
+                    publisher_id=(
+                        self.rng.choice(publishers)
+                        if publishers and self.rng.random() < 0.7 else None
+                    ),
+                    approved=self.rng.random() < self.options['approved'],
+                    created_at=created_at,
+                    updated_at=created_at,
+                )
+                article.update_derived_fields()
+                yield article
+
+        approved = {}
+
+        def keep(article):
+            if article.approved:
+                approved.setdefault(article.author_id, []).append(article.pk)
+
+        self.insert(Article, rows(), 'articles', keep=keep)
+        return approved
+
+    def newsletters(self, journalists, approved):
+        count = self.options['newsletters']
+        if not count:
+            return []
+        pick_author = self.zipf_picker(journalists)
+        authors = [pick_author() for _ in range(count)]
+        newsletters = self.insert(Newsletter, (
+            Newsletter(
+                title=f'{self.sentence(3).rstrip(".")} weekly',
+                description=self.sentence(15),
+                author_id=author_id,
+                created_at=self.now - timedelta(
+                    days=self.rng.randrange(self.options['days'] or 1)
+                ),
+            )
+            for author_id in authors
+        ), 'newsletters')
+
+        # newsletters collect approved articles, mostly their author's
+        everything = list(itertools.chain.from_iterable(approved.values()))
+        Articles = Newsletter.articles.through
+
+        def entries():
+            for newsletter in newsletters:
+                size = max(1, int(self.rng.expovariate(
+                    1 / self.options['newsletter_articles']
+                )))
+                own = approved.get(newsletter.author_id, [])
+                pool = own if len(own) >= size else everything
+                for article_id in self.rng.sample(pool, min(size, len(pool))):
+                    yield Articles(
+                        newsletter_id=newsletter.pk, article_id=article_id
+                    )
+
+        self.insert(Articles, entries(), 'newsletter articles')
+        return [newsletter.pk for newsletter in newsletters]
+
+    def subscriptions(self, readers, journalists, newsletters):
+        created_at = self.now
+        for model, field, targets, average in (
+            (JournalistSubscription, 'journalist_id', journalists,
+             self.options['subscriptions']),
+            (NewsletterSubscription, 'newsletter_id', newsletters,
+             self.options['newsletter_subscriptions']),
+        ):
+            if not targets or not average:
+                continue
+            pick = self.zipf_picker(targets)
+
+            def rows():
+                for reader_id in readers:
+                    # a few readers follow many sources, most follow few
+                    wanted = min(len(targets), int(
+                        self.rng.expovariate(1 / average) + 0.5
+                    ))
+                    chosen = set()
+                    for _ in range(wanted * 3):
+                        if len(chosen) >= wanted:
+                            break
+                        chosen.add(pick())
+                    for target_id in sorted(chosen):
+                        yield model(
+                            reader_id=reader_id,
+                            created_at=created_at,
+                            **{field: target_id},
+                        )
+
+            self.insert(model, rows(), model._meta.verbose_name_plural)
+
+    # helpers
+
+    def password_hash(self):
+        # one hash for everyone: hashing is by far the slowest part of
+        # creating users one at a time
+        if not hasattr(self, 'hashed_password'):
+            self.hashed_password = make_password(
+                self.options['password'],
+                salt=f'{self.prefix}{self.options["seed"]}',
+            )
+        return self.hashed_password
+
+    def zipf_picker(self, ids):
+        ''' Return a function picking from ``ids`` with Zipf weights, the
+            most popular id being a random one rather than the first.
+        '''
+        order = list(ids)
+        self.rng.shuffle(order)
+        cumulative = list(itertools.accumulate(
+            1 / (rank ** ZIPF_EXPONENT) for rank in range(1, len(order) + 1)
+        ))
+        total = cumulative[-1]
+
+        def pick():
+            return order[bisect.bisect(cumulative, self.rng.random() * total)]
+        return pick
+
+    def sentence(self, words):
+        text = ' '.join(self.rng.choices(WORDS, k=words))
+        return text[0].upper() + text[1:] + '.'
+
+    def body(self, words):
+        # articles are assembled from a pool of paragraphs, which keeps
+        # generation fast enough for millions of them
+        if not hasattr(self, 'paragraphs'):
+            self.paragraphs = [
+                ' '.join(
+                    self.sentence(self.rng.randint(8, 20))
+                    for _ in range(self.rng.randint(2, 6))
+                )
+                for _ in range(1000)
+            ]
+            self.paragraph_words = sum(
+                paragraph.count(' ') + 1 for paragraph in self.paragraphs
+            ) / len(self.paragraphs)
+        count = max(1, round(words / self.paragraph_words))
+        return '\n\n'.join(self.rng.choices(self.paragraphs, k=count))
+
+    def insert(self, model, rows, label, keep=None):
+        ''' bulk_create ``rows`` in batches, one transaction each, and
+            return the created objects, or pass each one to ``keep``
+            instead when holding them all would take too much memory.
+        '''
+        started = time.perf_counter()
+        created = []
+        total = 0
+        rows = iter(rows)
+        while batch := list(itertools.islice(rows, self.batch_size)):
+            with transaction.atomic():
+                batch = model.objects.bulk_create(batch)
+            total += len(batch)
+            if keep is None:
+                created.extend(batch)
+            else:
+                for obj in batch:
+                    keep(obj)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{label}: {total} in {elapsed:.1f}s '
+            f'({total / elapsed if elapsed else 0:.0f} rows/s)'
+        )
+        return created
+
+    def phase(self, label, run):
+        started = time.perf_counter()
+        run()
+        self.stdout.write(
+            f'{label}: {time.perf_counter() - started:.1f}s'
+        )
+
+    def clear(self):
+        users = User.objects.filter(username__startswith=f'{self.prefix}-')
+        # articles, newsletters and subscriptions go with their users
+        Article.objects.filter(author__in=users).delete()
+        users.delete()
+        Publisher.objects.filter(name__startswith=f'{self.prefix} ').delete()
+        self.stdout.write(f'Cleared earlier {self.prefix!r} data.')
+
+
+@contextmanager
+def preserved_timestamps():
+    ''' Let the generated created_at and updated_at values through instead
+        of auto_now and auto_now_add replacing them on insert.
+    '''
+    fields = [
+        field
+        for model in (
+            Article, Newsletter, JournalistSubscription,
+            NewsletterSubscription,
+        )
+        for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or
+        getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
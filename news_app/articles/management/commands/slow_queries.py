@@ -0,0 +1,133 @@
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from news_app import slow_queries
+from news_app.stats import percentile
+
+
+class Command(BaseCommand):
+    ''' Summarize the slow query log: queries are grouped by fingerprint
+        and ranked by the total time they took, with their count, mean,
+        p95 and worst duration, the views that ran them and, for the
+        slowest run, the SQL and query plan. Groups whose plan scans a
+        whole table are flagged.
+    '''
+    help = 'Report the slowest queries in the slow query log.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file',
+            help='Log to read (default SLOW_QUERY_LOG and its backups).',
+        )
+        parser.add_argument(
+            '--hours',
+            type=float,
+            help='Only entries from the last this many hours.',
+        )
+        parser.add_argument('--view', help='Only queries run by this view.')
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=10,
+            help='Number of fingerprints reported.',
+        )
+        parser.add_argument(
+            '--plans',
+            action='store_true',
+            help='Print the SQL and query plan of each fingerprint.',
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print the report as JSON.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['file'] or settings.SLOW_QUERY_LOG
+        if not path:
+            raise CommandError('Set SLOW_QUERY_LOG or pass --file.')
+        since = None
+        if options['hours'] is not None:
+            since = timezone.now() - timedelta(hours=options['hours'])
+
+        groups = {}
+        for entry in slow_queries.read_log(path):
+            if options['view'] and entry.get('view') != options['view']:
+                continue
+            if since is not None:
+                logged = parse_datetime(entry.get('time') or '')
+                if logged is None or logged < since:
+                    continue
+            group = groups.setdefault(entry['fingerprint'], {
+                'fingerprint': entry['fingerprint'],
+                'normalized': entry['normalized'],
+                'durations': [],
+                'views': {},
+                'slowest': entry,
+            })
+            group['durations'].append(entry['duration_ms'])
+            view = entry.get('view') or '-'
+            group['views'][view] = group['views'].get(view, 0) + 1
+            if entry['duration_ms'] > group['slowest']['duration_ms']:
+                group['slowest'] = entry
+
+        report = sorted(
+            (self.summarize(group) for group in groups.values()),
+            key=lambda row: row['total_ms'],
+            reverse=True,
+        )[:options['limit']]
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        if not report:
+            self.stdout.write('No slow queries logged.')
+            return
+        self.stdout.write(
+            f'{"total ms":>10}{"count":>7}{"mean":>9}{"p95":>9}{"max":>9}'
+            f'  fingerprint'
+        )
+        for row in report:
+            line = (
+                f'{row["total_ms"]:>10.1f}{row["count"]:>7}'
+                f'{row["mean_ms"]:>9.1f}{row["p95_ms"]:>9.1f}'
+                f'{row["max_ms"]:>9.1f}  {row["fingerprint"]}'
+            )
+            if row['full_scan']:
+                line = self.style.ERROR(line + '  FULL SCAN')
+            self.stdout.write(line)
+            self.stdout.write(f'    {row["normalized"][:160]}')
+            self.stdout.write('    views: ' + ', '.join(
+                f'{view} ({count})' for view, count in row['views'].items()
+            ))
+            if options['plans']:
+                self.stdout.write(f'    sql: {row["sql"]}')
+                self.stdout.write(f'    params: {row["params"]}')
+                for step in row['plan'] or []:
+                    self.stdout.write(f'    plan: {step}')
+
+    @staticmethod
+    def summarize(group):
+        durations = sorted(group['durations'])
+        slowest = group['slowest']
+        return {
+            'fingerprint': group['fingerprint'],
+            'normalized': group['normalized'],
+            'count': len(durations),
+            'total_ms': round(sum(durations), 2),
+            'mean_ms': round(sum(durations) / len(durations), 2),
+            'p95_ms': percentile(durations, 95),
+            'max_ms': durations[-1],
+            'views': dict(sorted(
+                group['views'].items(), key=lambda item: -item[1]
+            )),
+            'sql': slowest['sql'],
+            'params': slowest.get('params'),
+            'plan': slowest.get('plan'),
+            'full_scan': slowest.get('full_scan', False),
+        }
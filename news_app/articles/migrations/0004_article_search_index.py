@@ -0,0 +1,39 @@
+# Generated by Django 6.0.1 on 2026-10-17 10:03
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    '''Create the FTS5 search table and index existing approved articles.'''
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE articles_article_fts USING fts5("
+        "title, content, tokenize = 'porter unicode61 remove_diacritics 2')"
+    )
+    # weight title matches ten times higher than content matches
+    schema_editor.execute(
+        "INSERT INTO articles_article_fts(articles_article_fts, rank) "
+        "VALUES ('rank', 'bm25(10.0, 1.0)')"
+    )
+    schema_editor.execute(
+        "INSERT INTO articles_article_fts(rowid, title, content) "
+        "SELECT id, title, content FROM articles_article WHERE approved"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS articles_article_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0003_alter_article_options_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0004_article_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostBudget',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('account', models.CharField(max_length=50, unique=True)),
+                ('tokens', models.FloatField()),
+                ('updated_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ScheduledPost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('account', models.CharField(default='default', max_length=50)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent')], default='pending', max_length=10)),
+                ('posted_as', models.CharField(blank=True, choices=[('single', 'Single post'), ('digest', 'Digest'), ('thread', 'Thread')], max_length=10)),
+                ('external_id', models.CharField(blank=True, max_length=50)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scheduled_posts', to='articles.article')),
+            ],
+            options={
+                'ordering': ('created_at', 'id'),
+                'indexes': [models.Index(fields=['account', 'status', 'created_at', 'id'], name='scheduled_post_queue_idx')],
+            },
+        ),
+    ]
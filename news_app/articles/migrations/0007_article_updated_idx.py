@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0006_article_updated_at'),
+        ('publishers', '0004_publisher_publisher_created_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['updated_at'], name='article_updated_idx'),
+        ),
+    ]
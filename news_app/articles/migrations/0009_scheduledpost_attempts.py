@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0008_article_derived_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scheduledpost',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='scheduledpost',
+            name='last_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AlterField(
+            model_name='scheduledpost',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+    ]
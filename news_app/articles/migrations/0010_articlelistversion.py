@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0009_scheduledpost_attempts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleListVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+    ]
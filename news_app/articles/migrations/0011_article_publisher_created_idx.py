@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0010_articlelistversion'),
+        ('publishers', '0004_publisher_publisher_created_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='article',
+            name='article_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['publisher', '-created_at', '-id'], name='article_publisher_created_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0011_article_publisher_created_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('records', models.PositiveBigIntegerField(default=0)),
+                ('imported', models.PositiveBigIntegerField(default=0)),
+                ('rejected', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
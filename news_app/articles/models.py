@@ -1,5 +1,14 @@
-from django.db import models
+import math
+
+from django.db import models, router, transaction
 from django.conf import settings
+from django.utils.text import Truncator
+
+# words kept in the stored excerpt: the longest card shows 40
+EXCERPT_WORDS = 40
+
+# average adult reading speed, for the estimated reading time
+WORDS_PER_MINUTE = 200
 
 
 class Article(models.Model):
@@ -14,6 +23,14 @@ class Article(models.Model):
         - approved: Boolean indicating whether the article has been approved
             for publication.
         - created_at: DateTime indicating when the article was created.
+        - updated_at: DateTime indicating when the article was last saved.
+            Cached renderings of the article are keyed on it.
+        - excerpt: The first EXCERPT_WORDS words of the content, so that
+            lists can show it without loading the content.
+        - word_count: The number of words in the content.
+        - reading_time: Estimated minutes to read the content.
+        The last three are derived from the content on every save that
+        writes it.
     '''
     title = models.CharField(max_length=200)
     content = models.TextField()
@@ -30,6 +47,231 @@ class Article(models.Model):
     )
     approved = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    excerpt = models.TextField(blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    reading_time = models.PositiveIntegerField(default=0, editable=False)
+
+    DERIVED_FIELDS = ('excerpt', 'word_count', 'reading_time')
+
+    class Meta:
+        # newest first, with the primary key as a tie-breaker so that the
+        # order is stable and usable as a keyset pagination cursor
+        ordering = ('-created_at', '-id')
+        indexes = [
+            # reader lists and the approved article API. Django renders
+            # ``approved=True`` as a bare ``WHERE approved`` on SQLite, which
+            # cannot seek a leading boolean column, so approval is expressed
+            # as a partial index condition instead.
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(approved=True),
+                name='article_approved_created_idx',
+            ),
+            # journalist's own articles and approved articles by a
+            # subscribed journalist
+            models.Index(
+                fields=['author', '-created_at', '-id'],
+                name='article_author_created_idx',
+            ),
+            # editor lists, paged per publisher and for independent
+            # articles (publisher IS NULL) and merged
+            models.Index(
+                fields=['publisher', '-created_at', '-id'],
+                name='article_publisher_created_idx',
+            ),
+            # newest change, for the API's Last-Modified and ETags
+            models.Index(
+                fields=['updated_at'],
+                name='article_updated_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.title
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_approved = instance.__dict__.get('approved')
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._loaded_approved = self.__dict__.get('approved')
+
+    def update_derived_fields(self):
+        ''' Recompute excerpt, word_count and reading_time from content. '''
+        self.excerpt = Truncator(self.content).words(
+            EXCERPT_WORDS, truncate=' …'
+        )
+        self.word_count = len(self.content.split())
+        self.reading_time = math.ceil(self.word_count / WORDS_PER_MINUTE)
+
+    def save(self, *args, **kwargs):
+        ''' Save the article, recording in ``previous_approved`` whether it
+            was approved in the database before this save.
+
+            A change of approval is made with a conditional UPDATE (approve
+            only ``WHERE approved = false`` and the reverse), so when two
+            editors approve the same article at once exactly one of them
+            sees ``previous_approved=False`` and triggers the notifications.
+            Saves that leave ``approved`` as it was loaded issue no extra
+            query. Saves that write the content also refresh the fields
+            derived from it.
+        '''
+        using = kwargs.get('using') or router.db_for_write(
+            Article, instance=self
+        )
+        update_fields = kwargs.get('update_fields')
+        writes_approval = update_fields is None or 'approved' in update_fields
+        # an instance loaded with defer('content') keeps its derived fields
+        if 'content' not in self.get_deferred_fields() and (
+            update_fields is None or 'content' in update_fields
+        ):
+            self.update_derived_fields()
+            if update_fields is not None:
+                kwargs['update_fields'] = {
+                    *update_fields, *self.DERIVED_FIELDS
+                }
+        with transaction.atomic(using=using):
+            if self._state.adding:
+                self.previous_approved = False
+            elif not writes_approval or (
+                self.approved == getattr(self, '_loaded_approved', None)
+            ):
+                self.previous_approved = self.approved
+            else:
+                changed = Article.objects.using(using).filter(
+                    pk=self.pk, approved=not self.approved
+                ).update(approved=self.approved)
+                self.previous_approved = (
+                    not self.approved if changed else self.approved
+                )
+            super().save(*args, **kwargs)
+        if writes_approval:
+            self._loaded_approved = self.approved
+
+
+class ScheduledPost(models.Model):
+    ''' Model representing an outbound social post waiting for budget.
+        fields:
+        - account: The social account the post is published from.
+        - article: ForeignKey to the approved Article being announced.
+        - status: ``pending`` until a dispatcher claims it, ``sending``
+            while it is being published and ``sent`` afterwards, or
+            ``failed`` once X rejected it or it ran out of attempts.
+        - posted_as: How the article went out: on its own, in a digest or
+            in a thread.
+        - external_id: The id of the post the article appeared in.
+        - attempts: Number of times publishing it failed.
+        - last_error: The error of the last failed attempt.
+        - created_at: DateTime indicating when the post was queued.
+        - claimed_at: DateTime indicating when a dispatcher claimed it.
+        - sent_at: DateTime indicating when it was published.
+    '''
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (SENDING, 'Sending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    )
+
+    SINGLE = 'single'
+    DIGEST = 'digest'
+    THREAD = 'thread'
+    POSTED_AS_CHOICES = (
+        (SINGLE, 'Single post'),
+        (DIGEST, 'Digest'),
+        (THREAD, 'Thread'),
+    )
+
+    account = models.CharField(max_length=50, default='default')
+    article = models.ForeignKey(
+        Article,
+        on_delete=models.CASCADE,
+        related_name='scheduled_posts',
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+    )
+    posted_as = models.CharField(
+        max_length=10,
+        choices=POSTED_AS_CHOICES,
+        blank=True,
+    )
+    external_id = models.CharField(max_length=50, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ('created_at', 'id')
+        indexes = [
+            models.Index(
+                fields=['account', 'status', 'created_at', 'id'],
+                name='scheduled_post_queue_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.article} via {self.account} ({self.status})'
+
+
+class PostBudget(models.Model):
+    ''' Model representing the token bucket of a social account, stored so
+        that a restart does not hand out a fresh burst.
+        fields:
+        - account: The social account the budget belongs to.
+        - tokens: Posts that can be published right now.
+        - updated_at: DateTime indicating when tokens was last refilled.
+    '''
+    account = models.CharField(max_length=50, unique=True)
+    tokens = models.FloatField()
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f'{self.account}: {self.tokens:.1f} posts'
+
+
+class ArticleListVersion(models.Model):
+    ''' Model representing the version of the approved article list, a
+        single row moved by every write that changes what the list shows.
+        It lives in the database rather than the cache so that every
+        server process and management command sees the same version.
+        fields:
+        - version: Moves by one on each change to the list.
+    '''
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f'article list v{self.version}'
+
+
+class ImportCheckpoint(models.Model):
+    ''' Model representing how far an ``import_articles`` run has got,
+        saved in the same transaction as each batch it imports so that a
+        resumed run never imports a batch twice.
+        fields:
+        - name: The import it belongs to, by default the file's path.
+        - records: Records read so far.
+        - imported: Articles imported so far.
+        - rejected: Records rejected so far.
+        - updated_at: DateTime indicating when the last batch committed.
+    '''
+    name = models.CharField(max_length=255, unique=True)
+    records = models.PositiveBigIntegerField(default=0)
+    imported = models.PositiveBigIntegerField(default=0)
+    rejected = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.name} after record {self.records}'
@@ -0,0 +1,224 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+from articles.models import Article
+from news_app import metrics
+
+# per-request parts of a cached page, filled in on every response
+PLACEHOLDERS = {
+    b'<!--page-cache:navbar-->': 'includes/navbar.html',
+    b'<!--page-cache:messages-->': 'includes/messages.html',
+}
+CSRF_PLACEHOLDER = 'page-cache-csrf-token'
+
+LIST_VERSION = 'article-list'
+STATS_KEY = 'page-cache:stats:{view}:{outcome}'
+VERSION_KEY = 'page-cache:version:{name}'
+AUTHOR_KEY = 'page-cache:author:{article_id}'
+
+
+def article_version(article_id):
+    return f'article:{article_id}'
+
+
+def _first_version():
+    # not 1: a version evicted from the cache must not restart at a number
+    # that pages (or client ETags) were already stored under
+    return time.time_ns() // 1000
+
+
+def versions(*names):
+    ''' Return the current version of each named page group. '''
+    keys = [VERSION_KEY.format(name=name) for name in names]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            first = _first_version()
+            cache.add(key, first, None)
+            found[key] = cache.get(key, first)
+    return [found[key] for key in keys]
+
+
+def invalidate(*names):
+    ''' Move the named page groups to a new version, so every page cached
+        under the old one is missed from now on and left to expire.
+    '''
+    for name in names:
+        key = VERSION_KEY.format(name=name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _first_version(), None)
+
+
+def invalidate_on_commit(*names):
+    ''' ``invalidate`` the page groups once the current transaction
+        commits. Invalidating earlier lets a concurrent request miss the
+        new version, render the rows not yet committed and store the old
+        page under the new version.
+    '''
+    transaction.on_commit(lambda: invalidate(*names))
+
+
+def article_author(article_id):
+    ''' The author id of an article, or None if it does not exist. Cached
+        until the article is saved or deleted, so pages can be keyed on
+        the reader's subscription to the author without a query.
+    '''
+    key = AUTHOR_KEY.format(article_id=article_id)
+    author_id = cache.get(key)
+    if author_id is None:
+        author_id = Article.objects.filter(
+            pk=article_id
+        ).values_list('author_id', flat=True).first()
+        if author_id is not None:
+            cache.set(key, author_id, None)
+    return author_id
+
+
+def forget_author(article_id):
+    cache.delete(AUTHOR_KEY.format(article_id=article_id))
+
+
+def record(view, outcome):
+    key = STATS_KEY.format(view=view, outcome=outcome)
+    if not cache.add(key, 1, None):
+        cache.incr(key)
+
+
+def stats(views=None):
+    ''' Return ``{view: {'hits': n, 'misses': n}}`` for the cached views. '''
+    views = views or [view.__name__ for view in PageCacheMixin.registry]
+    keys = {
+        (view, outcome): STATS_KEY.format(view=view, outcome=outcome)
+        for view in views for outcome in ('hits', 'misses')
+    }
+    counts = cache.get_many(keys.values())
+    return {
+        view: {
+            outcome: counts.get(keys[view, outcome], 0)
+            for outcome in ('hits', 'misses')
+        }
+        for view in views
+    }
+
+
+def reset_stats():
+    cache.delete_many([
+        STATS_KEY.format(view=view.__name__, outcome=outcome)
+        for view in PageCacheMixin.registry
+        for outcome in ('hits', 'misses')
+    ])
+
+
+class PageCacheMixin:
+    ''' Caches the rendered page of a reader view.
+
+        Pages are stored once per role and cache variant rather than per
+        user: the navbar, the messages and CSRF tokens are left as
+        placeholders in the stored copy and filled in for each response.
+        Keys include the versions returned by ``get_cache_versions`` so a
+        save or delete invalidates exactly the pages that showed the
+        article.
+
+        :page_cache_timeout: Seconds a page stays in the cache (defaults to
+            PAGE_CACHE_SECONDS).
+    '''
+    page_cache_timeout = None
+    registry = []
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        PageCacheMixin.registry.append(cls)
+
+    def get_cache_versions(self):
+        ''' Names of the page groups this page belongs to. '''
+        return [LIST_VERSION]
+
+    def get_cache_variant(self):
+        ''' Anything besides the role and URL that changes the page. '''
+        return ''
+
+    def get(self, request, *args, **kwargs):
+        view = type(self).__name__
+        key = self.get_page_cache_key()
+        content = cache.get(key)
+        if content is not None:
+            record(view, 'hits')
+            metrics.record_cache('page', hits=1)
+            response = HttpResponse(content)
+            response['X-Page-Cache'] = 'HIT'
+        else:
+            record(view, 'misses')
+            metrics.record_cache('page', misses=1)
+            response = super().get(request, *args, **kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+            if response.status_code != 200:
+                return response
+            cache.set(
+                key,
+                response.content,
+                self.page_cache_timeout or settings.PAGE_CACHE_SECONDS,
+            )
+            response['X-Page-Cache'] = 'MISS'
+
+        response.content = self.fill_placeholders(response.content)
+        self.patch_headers(response)
+        return response
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # rendered into the shared copy in place of per-user content
+        context['page_cache'] = True
+        context['csrf_token'] = CSRF_PLACEHOLDER
+        return context
+
+    def get_page_cache_key(self):
+        user = self.request.user
+        role = user.role if user.is_authenticated else 'anonymous'
+        url = hashlib.md5(
+            self.request.get_full_path().encode()
+        ).hexdigest()
+        version = '.'.join(
+            str(number) for number in versions(*self.get_cache_versions())
+        )
+        return (
+            f'page-cache:{type(self).__name__}:{version}:{role}:'
+            f'{self.get_cache_variant()}:{url}'
+        )
+
+    def fill_placeholders(self, content):
+        for placeholder, template_name in PLACEHOLDERS.items():
+            if placeholder in content:
+                content = content.replace(
+                    placeholder,
+                    render_to_string(template_name, request=self.request)
+                    .encode(),
+                )
+        csrf = CSRF_PLACEHOLDER.encode()
+        if csrf in content:
+            content = content.replace(csrf, get_token(self.request).encode())
+        return content
+
+    def patch_headers(self, response):
+        if self.request.user.is_authenticated:
+            # the filled-in page names the user, so only their browser may
+            # keep it, and it must check back before reusing it
+            patch_cache_control(
+                response, private=True, max_age=0, must_revalidate=True
+            )
+        else:
+            patch_cache_control(
+                response, public=True,
+                max_age=settings.PAGE_CACHE_BROWSER_SECONDS,
+            )
+        patch_vary_headers(response, ('Cookie',))
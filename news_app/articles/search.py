@@ -0,0 +1,193 @@
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Article
+
+SEARCH_TABLE = 'articles_article_fts'
+
+# the most results a single search returns
+MAX_RESULTS = 50
+
+# control characters stand in for the highlight tags inside SQLite so that
+# the article text can be HTML-escaped before the real tags are added
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def is_supported():
+    '''Full-text search needs SQLite's FTS5 extension.'''
+    return connection.vendor == 'sqlite'
+
+
+def index_article(article):
+    ''' Bring the index entry for an article up to date. Only approved
+        articles are searchable, so anything else is removed.
+    '''
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [article.pk]
+        )
+        if article.approved:
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE}(rowid, title, content) '
+                f'VALUES (%s, %s, %s)',
+                [article.pk, article.title, article.content],
+            )
+
+
+def remove_article(article_id):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [article_id]
+        )
+
+
+def index_articles(article_ids):
+    ''' Bring the index entries of several articles up to date with one
+        DELETE and one INSERT ... SELECT, for bulk approvals.
+    '''
+    if not is_supported() or not article_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(article_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})',
+            list(article_ids),
+        )
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE}(rowid, title, content) '
+            f'SELECT id, title, content FROM articles_article '
+            f'WHERE approved AND id IN ({placeholders})',
+            list(article_ids),
+        )
+
+
+def rebuild_index(chunk_size=5000, progress=None):
+    ''' Re-index every approved article in primary key chunks, committing
+        after each chunk so the write lock is released between them.
+
+        :chunk_size: Number of articles copied per transaction.
+        :progress: Optional callable receiving the running total.
+        :return: The number of articles indexed.
+    '''
+    if not is_supported():
+        return 0
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+
+    total = 0
+    last_id = 0
+    while True:
+        ids = list(
+            Article.objects.filter(approved=True, pk__gt=last_id)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:chunk_size]
+        )
+        if not ids:
+            break
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE}(rowid, title, content) '
+                f'SELECT id, title, content FROM articles_article '
+                f'WHERE approved AND id BETWEEN %s AND %s',
+                [ids[0], ids[-1]],
+            )
+
+        total += len(ids)
+        last_id = ids[-1]
+        if progress:
+            progress(total)
+
+    # merge the b-tree segments written by each chunk
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')"
+        )
+    return total
+
+
+def build_match_query(text):
+    ''' Turn free text from a reader into a safe FTS5 MATCH expression.
+
+        Every word becomes a quoted term (so operators and stray quotes in
+        the input cannot cause syntax errors), all terms must match, and the
+        last word is treated as a prefix so partially typed words match.
+    '''
+    tokens = _TOKEN.findall(text or '')
+    if not tokens:
+        return ''
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += ' *'
+    return ' '.join(terms)
+
+
+def search_articles(text, limit=MAX_RESULTS):
+    ''' Return approved articles matching ``text``, best matches first.
+
+        Each article carries ``search_rank`` (BM25, lower is better) and a
+        ``search_snippet`` with the matching words wrapped in ``<mark>``.
+    '''
+    limit = max(1, min(limit, MAX_RESULTS))
+    match = build_match_query(text)
+    if not match:
+        return []
+
+    if not is_supported():
+        return _search_fallback(text, limit)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid, rank, '
+            f"snippet({SEARCH_TABLE}, 1, %s, %s, '…', 24) "
+            f'FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s '
+            f'ORDER BY rank LIMIT %s',
+            [_MARK_START, _MARK_END, match, limit],
+        )
+        hits = cursor.fetchall()
+
+    articles = Article.objects.filter(
+        pk__in=[pk for pk, _, _ in hits], approved=True
+    ).select_related('author', 'publisher').in_bulk()
+
+    results = []
+    for pk, rank, snippet in hits:
+        article = articles.get(pk)
+        if article is None:
+            continue
+        article.search_rank = rank
+        article.search_snippet = _highlight(snippet)
+        results.append(article)
+    return results
+
+
+def _highlight(snippet):
+    return mark_safe(
+        escape(snippet)
+        .replace(_MARK_START, '<mark>')
+        .replace(_MARK_END, '</mark>')
+    )
+
+
+def _search_fallback(text, limit):
+    # databases without FTS5 get an unranked substring search
+    articles = list(
+        Article.objects.filter(approved=True)
+        .filter(Q(title__icontains=text) | Q(content__icontains=text))
+        .select_related('author', 'publisher')[:limit]
+    )
+    for article in articles:
+        article.search_rank = None
+        article.search_snippet = escape(article.content[:200])
+    return articles
@@ -0,0 +1,136 @@
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from articles import list_version, page_cache, search, tasks
+from articles.models import Article
+from articles.services import post_scheduler
+from jobs.queue import enqueue
+from news_app.pagination import KeysetPaginator
+from publishers.models import Publisher
+from subscriptions import tasks as subscription_tasks
+from subscriptions.services import feed
+
+APPROVE = 'approve'
+REJECT = 'reject'
+ACTIONS = (APPROVE, REJECT)
+
+# the most articles one bulk review may change
+MAX_BULK_REVIEW = 500
+
+
+def editor_articles(editor):
+    ''' The articles an editor may review: independent articles and those
+        of the publishers they edit, as a single query. Page through them
+        with EditorArticlePaginator rather than ordering this one.
+    '''
+    return Article.objects.filter(
+        Q(publisher__in=Publisher.objects.filter(editors=editor)) |
+        Q(publisher__isnull=True)
+    )
+
+
+class EditorArticlePaginator:
+    ''' Keyset paginator over the articles an editor may review.
+
+        Ordered as one query, the OR of ``editor_articles`` makes the
+        database sort every matching row for each page. Instead the
+        independent articles and those of each publisher are paged on their
+        own, each a short seek along ``article_publisher_created_idx``, and
+        merged, so a page costs the same however deep it is.
+
+        :editor: The editor whose articles are paginated.
+        :articles: The Article queryset to page, before it is narrowed to
+            the editor (e.g. with fields deferred).
+        :page_size: The number of articles per page.
+    '''
+
+    def __init__(self, editor, articles=None, page_size=None):
+        articles = Article.objects.all() if articles is None else articles
+        publisher_ids = Publisher.objects.filter(
+            editors=editor
+        ).values_list('pk', flat=True)
+        self.sources = [
+            KeysetPaginator(
+                articles.filter(publisher__isnull=True), page_size=page_size
+            ),
+        ] + [
+            KeysetPaginator(
+                articles.filter(publisher_id=publisher_id),
+                page_size=page_size,
+            )
+            for publisher_id in publisher_ids
+        ]
+        self.page_size = self.sources[0].page_size
+
+    def paginate(self, cursor=None):
+        rows = []
+        for source in self.sources:
+            queryset, reverse = source.page_queryset(cursor)
+            rows.extend(queryset)
+        rows.sort(
+            key=lambda article: (article.created_at, article.pk),
+            reverse=not reverse,
+        )
+        return self.sources[0].build_page(
+            rows[:self.page_size + 1], cursor, reverse
+        )
+
+
+def bulk_review(editor, article_ids, action):
+    ''' Approve or reject many articles with one UPDATE.
+
+        Only articles in the editor's scope that are not already in the
+        target state change; the UPDATE stamps them with one
+        ``updated_at`` so the changed rows can be read back even when
+        another editor reviews some of the same articles at once.
+        ``QuerySet.update`` sends no signals, so the side effects of the
+        signal receivers are applied here for the whole batch, in the same
+        transaction: approvals queue one combined notification job, one
+        feed fan-out job and the social posts; rejections (which return
+        approved articles to pending review) take the articles out of
+        feeds. Both update the search index, and the cached pages once
+        the transaction commits.
+
+        :return: The ids of the articles that changed.
+    '''
+    if action not in ACTIONS:
+        raise ValueError(f'Unknown review action {action!r}.')
+    approve = action == APPROVE
+
+    with transaction.atomic():
+        now = timezone.now()
+        changed = editor_articles(editor).filter(
+            pk__in=article_ids, approved=not approve
+        ).update(approved=approve, updated_at=now)
+        if not changed:
+            return []
+        changed_ids = list(
+            Article.objects.filter(
+                pk__in=article_ids, approved=approve, updated_at=now
+            ).order_by('pk').values_list('pk', flat=True)
+        )
+
+        if approve:
+            enqueue(
+                tasks.notify_subscribers_of_articles,
+                article_ids=changed_ids,
+            )
+            enqueue(
+                subscription_tasks.fan_out_articles,
+                article_ids=changed_ids,
+            )
+            post_scheduler.schedule_many(
+                Article.objects.filter(pk__in=changed_ids).only('pk')
+            )
+        else:
+            feed.remove_articles(changed_ids)
+        search.index_articles(changed_ids)
+        list_version.bump()
+        # the feed and search index rows roll back with the review; the
+        # cached pages are only dropped once it commits
+        page_cache.invalidate_on_commit(page_cache.LIST_VERSION, *(
+            page_cache.article_version(article_id)
+            for article_id in changed_ids
+        ))
+    return changed_ids
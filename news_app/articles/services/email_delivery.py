@@ -0,0 +1,152 @@
+import logging
+import smtplib
+import threading
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.mail.message import sanitize_address
+
+from news_app import metrics
+
+logger = logging.getLogger('news.email')
+
+BCC = 'bcc'
+INDIVIDUAL = 'individual'
+
+_local = threading.local()
+
+
+@dataclass
+class DeliveryResult:
+    ''' Outcome of a delivery.
+
+        :messages: The number of messages accepted by the mail server.
+        :delivered: The recipients whose message was accepted.
+        :failed: The recipients whose message was not.
+    '''
+    messages: int = 0
+    delivered: list = field(default_factory=list)
+    failed: list = field(default_factory=list)
+
+
+def get_worker_connection():
+    ''' Return this thread's mail connection, opening it on first use.
+
+        Each worker thread (or process) keeps one connection open across
+        deliveries instead of paying for a new SMTP session per message.
+    '''
+    connection = getattr(_local, 'connection', None)
+    if connection is None:
+        connection = get_connection(fail_silently=False)
+        connection.open()
+        _local.connection = connection
+    return connection
+
+
+def close_worker_connection():
+    connection = getattr(_local, 'connection', None)
+    _local.connection = None
+    if connection is not None:
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+def deliver(subject, body, recipients, from_email=None, mode=None,
+            chunk_size=None):
+    ''' Send one rendered message to many recipients.
+
+        The subject and body are rendered once by the caller. In ``bcc``
+        mode recipients are split into chunks of ``chunk_size`` addresses,
+        each sent as one message with the addresses in Bcc so readers never
+        see each other. In ``individual`` mode every recipient gets their
+        own message. A chunk that fails is recorded and skipped; the rest
+        are still sent. Over SMTP, addresses the server refuses within an
+        accepted chunk are recorded as failed too.
+
+        :mode: ``bcc`` or ``individual`` (default EMAIL_DELIVERY_MODE).
+        :chunk_size: Recipients per Bcc message (default EMAIL_CHUNK_SIZE).
+        :return: A DeliveryResult.
+    '''
+    from_email = from_email or settings.DEFAULT_FROM_EMAIL
+    mode = mode or settings.EMAIL_DELIVERY_MODE
+    if mode == INDIVIDUAL:
+        chunk_size = 1
+    else:
+        chunk_size = chunk_size or settings.EMAIL_CHUNK_SIZE
+
+    recipients = sorted(set(recipients))
+    result = DeliveryResult()
+    for start in range(0, len(recipients), chunk_size):
+        chunk = recipients[start:start + chunk_size]
+        if mode == INDIVIDUAL:
+            message = EmailMessage(subject, body, from_email, to=chunk)
+        else:
+            message = EmailMessage(subject, body, from_email, bcc=chunk)
+
+        try:
+            refused = _send(message)
+        except smtplib.SMTPRecipientsRefused as exc:
+            # the session is still usable, only these addresses were refused
+            _record_failure(result, chunk, exc)
+        except Exception as exc:
+            # anything else may have left the session in an unknown state
+            close_worker_connection()
+            _record_failure(result, chunk, exc)
+        else:
+            result.messages += 1
+            if refused:
+                _record_failure(result, refused, 'refused by the server')
+            result.delivered.extend(
+                address for address in chunk if address not in refused
+            )
+    return result
+
+
+def _send(message):
+    with metrics.MAIL_DURATION.time():
+        return _send_once(message)
+
+
+def _send_once(message):
+    try:
+        return _send_with(get_worker_connection(), message)
+    except smtplib.SMTPServerDisconnected:
+        # the server dropped the idle session; reconnect and try once more
+        close_worker_connection()
+        return _send_with(get_worker_connection(), message)
+
+
+def _send_with(connection, message):
+    ''' Send ``message`` and return the recipients the server refused.
+
+        Django's SMTP backend drops the refusals ``sendmail`` returns when
+        it accepts some of the recipients, so the message is handed to the
+        backend's open SMTP session directly, as the backend itself does.
+        Other backends report no refusals.
+    '''
+    smtp = getattr(connection, 'connection', None)
+    if not isinstance(smtp, smtplib.SMTP):
+        connection.send_messages([message])
+        return []
+    encoding = message.encoding or settings.DEFAULT_CHARSET
+    addresses = {
+        sanitize_address(address, encoding): address
+        for address in message.recipients()
+    }
+    refused = smtp.sendmail(
+        sanitize_address(message.from_email, encoding),
+        list(addresses),
+        message.message().as_bytes(linesep='\r\n'),
+    )
+    return [addresses.get(address, address) for address in refused]
+
+
+def _record_failure(result, chunk, exc):
+    logger.error(
+        'Email delivery failed for %s recipients: %r', len(chunk), exc
+    )
+    metrics.MAIL_FAILURES.inc()
+    result.failed.extend(chunk)
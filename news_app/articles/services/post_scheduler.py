@@ -0,0 +1,426 @@
+import logging
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, F, Min
+from django.utils import timezone
+
+from articles.models import PostBudget, ScheduledPost
+from articles.services import x_publisher
+from jobs.models import Job
+from jobs.queue import backoff, enqueue
+
+logger = logging.getLogger('news.twitter')
+
+DEFAULT_ACCOUNT = 'default'
+
+DISPATCH_TASK = 'articles.tasks.dispatch_social_posts'
+
+# X counts characters per post
+MAX_POST_LENGTH = 280
+
+# titles are shortened in digests so that several articles fit in a post
+MAX_DIGEST_TITLE = 100
+
+
+@dataclass
+class Budget:
+    ''' Token bucket settings of a social account.
+
+        :capacity: The largest burst of posts allowed.
+        :refill_seconds: Seconds for one post's worth of budget to return.
+    '''
+    capacity: float
+    refill_seconds: float
+
+    @classmethod
+    def for_account(cls, account):
+        config = settings.SOCIAL_ACCOUNTS.get(account, {})
+        return cls(
+            capacity=config.get('capacity', settings.SOCIAL_POST_CAPACITY),
+            refill_seconds=config.get(
+                'refill_seconds', settings.SOCIAL_POST_REFILL_SECONDS
+            ),
+        )
+
+    def refill(self, tokens, elapsed):
+        refilled = elapsed.total_seconds() / self.refill_seconds
+        return min(self.capacity, tokens + refilled)
+
+    def seconds_until(self, tokens, wanted=1):
+        return max(0.0, (wanted - tokens) * self.refill_seconds)
+
+
+def schedule(article, account=DEFAULT_ACCOUNT):
+    ''' Queue an approved article to be posted from ``account``.
+
+        The post is stored on the current connection, so it commits with
+        the approval, and a dispatch job is queued after the
+        SOCIAL_COALESCE_WINDOW so that a burst of approvals is gathered
+        before anything is published.
+    '''
+    post = ScheduledPost.objects.create(account=account, article=article)
+    _ensure_dispatch(
+        account, timezone.now() + timedelta(
+            seconds=settings.SOCIAL_COALESCE_WINDOW
+        )
+    )
+    return post
+
+
+def schedule_many(articles, account=DEFAULT_ACCOUNT):
+    ''' Queue several approved articles at once, with one insert and one
+        dispatch job, e.g. after a bulk approval.
+    '''
+    posts = ScheduledPost.objects.bulk_create(
+        ScheduledPost(account=account, article=article)
+        for article in articles
+    )
+    if posts:
+        _ensure_dispatch(
+            account, timezone.now() + timedelta(
+                seconds=settings.SOCIAL_COALESCE_WINDOW
+            )
+        )
+    return posts
+
+
+def dispatch(account=DEFAULT_ACCOUNT):
+    ''' Publish pending posts for ``account`` within its budget.
+
+        While the budget covers every pending post, each article is posted
+        on its own. When it does not, the backlog is coalesced into a
+        digest (one post listing several articles) or a thread (a header
+        post with the articles in replies), per SOCIAL_COALESCE_MODE.
+        Whatever the budget cannot cover yet stays queued and another
+        dispatch is scheduled for when the next post is affordable.
+
+        The budget is reserved before anything is published and what was
+        not used is refunded, so concurrent dispatchers cannot both spend
+        it. Posts that fail are retried with a growing backoff, and marked
+        failed once X rejects them outright or after
+        SOCIAL_POST_MAX_ATTEMPTS, so they do not hold up the posts behind.
+        Without a bearer token for the account nothing is published.
+
+        :return: The number of posts published.
+    '''
+    if not x_publisher.account_token(account):
+        logger.error(
+            'Scheduled posts for %s held back: no bearer token configured.',
+            account,
+        )
+        return 0
+
+    budget = Budget.for_account(account)
+    _release_stale(account)
+    _drop_unapproved(account)
+
+    pending = list(
+        ScheduledPost.objects.filter(
+            account=account, status=ScheduledPost.PENDING
+        )
+        .select_related('article__author')
+        .order_by('created_at', 'id')
+    )
+    if not pending:
+        return 0
+
+    needed = _tokens_needed(len(pending))
+    affordable, tokens = _reserve(account, budget, len(pending), needed)
+    if not affordable:
+        _ensure_dispatch(account, _next_token_at(budget, tokens, needed))
+        return 0
+
+    if len(pending) <= affordable:
+        batches = [(ScheduledPost.SINGLE, [post]) for post in pending]
+    elif settings.SOCIAL_COALESCE_MODE == ScheduledPost.THREAD:
+        batches = [(ScheduledPost.THREAD, pending)]
+    else:
+        batches = [(ScheduledPost.DIGEST, pending)]
+
+    published = 0
+    failed = False
+    try:
+        for posted_as, posts in batches:
+            published += _publish(
+                account, posted_as, posts, affordable - published
+            )
+    except x_publisher.XPublishError as exc:
+        logger.error('Scheduled posts for %s failed: %s', account, exc)
+        failed = True
+    finally:
+        _refund(account, budget, affordable - published)
+
+    remaining = ScheduledPost.objects.filter(
+        account=account, status=ScheduledPost.PENDING
+    )
+    if remaining.exists():
+        # back off by the attempts of the post that would be sent first
+        attempts = remaining.values_list('attempts', flat=True).first()
+        retry_at = timezone.now() + timedelta(
+            seconds=backoff(attempts) if failed and attempts else 0
+        )
+        _ensure_dispatch(account, max(retry_at, _next_token_at(
+            budget,
+            _available_tokens(account, budget),
+            _tokens_needed(remaining.count()),
+        )))
+    return published
+
+
+def _tokens_needed(pending):
+    # a thread cannot go out without its header and at least one reply
+    if pending > 1 and settings.SOCIAL_COALESCE_MODE == ScheduledPost.THREAD:
+        return 2
+    return 1
+
+
+def _publish(account, posted_as, posts, allowance):
+    # claim the rows first so a concurrent dispatcher cannot post them too
+    claimed_ids = set(_claim(posts))
+    posts = [post for post in posts if post.pk in claimed_ids]
+    if not posts or allowance < 1:
+        _unclaim([post.pk for post in posts])
+        return 0
+
+    if posted_as == ScheduledPost.SINGLE:
+        texts = [(x_publisher.announcement_text(posts[0].article), posts)]
+    else:
+        texts = _coalesce(posted_as, posts, allowance)
+
+    client = x_publisher.get_client(account)
+    published = 0
+    reply_to = None
+    try:
+        # a failure stops the batch: the rest of a thread cannot be
+        # attached to a post that was never published
+        for text, included in texts:
+            response = client.post_tweet(text, in_reply_to=reply_to)
+            published += 1
+            post_id = str(response.get('data', {}).get('id', ''))
+            if posted_as == ScheduledPost.THREAD:
+                reply_to = post_id
+            if included:
+                ScheduledPost.objects.filter(
+                    pk__in=[post.pk for post in included]
+                ).update(
+                    status=ScheduledPost.SENT,
+                    posted_as=posted_as,
+                    external_id=post_id,
+                    sent_at=timezone.now(),
+                )
+    except x_publisher.XPublishError as exc:
+        _record_failure([post.pk for post in posts], exc)
+        raise
+    finally:
+        # anything not published goes back in the queue
+        _unclaim([post.pk for post in posts])
+    return published
+
+
+def _record_failure(ids, error):
+    ''' Count a failed attempt against the posts of ``ids`` not yet sent,
+        and fail those X rejected or that have used all their attempts.
+    '''
+    failing = ScheduledPost.objects.filter(
+        pk__in=ids, status=ScheduledPost.SENDING
+    )
+    failing.update(attempts=F('attempts') + 1, last_error=str(error))
+    if error.retryable:
+        failing = failing.filter(
+            attempts__gte=settings.SOCIAL_POST_MAX_ATTEMPTS
+        )
+    failing.update(status=ScheduledPost.FAILED, claimed_at=None)
+
+
+def _coalesce(posted_as, posts, allowance):
+    ''' Return ``(text, posts)`` pairs to publish for a digest or thread,
+        using at most ``allowance`` posts. Articles that do not fit are
+        left out and stay queued.
+    '''
+    lines = [_article_line(post.article) for post in posts]
+    if posted_as == ScheduledPost.DIGEST:
+        header = f'{len(posts)} new articles on News Board:'
+        text, count = _pack(header, lines)
+        return [(text, posts[:count])]
+
+    # a thread spends one post on the header and the rest on replies
+    texts = [(f'{len(posts)} new articles on News Board, in this thread:', [])]
+    start = 0
+    while start < len(posts) and len(texts) < allowance:
+        text, count = _pack('', lines[start:])
+        texts.append((text, posts[start:start + count]))
+        start += count
+    if len(texts) == 1:
+        return []
+    return texts
+
+
+def _pack(header, lines):
+    text = header
+    count = 0
+    for line in lines:
+        candidate = f'{text}\n{line}' if text else line
+        if len(candidate) > MAX_POST_LENGTH:
+            break
+        text = candidate
+        count += 1
+    return text, count
+
+
+def _article_line(article):
+    title = article.title
+    if len(title) > MAX_DIGEST_TITLE:
+        title = title[:MAX_DIGEST_TITLE - 1] + '…'
+    return f'• {title} {x_publisher.article_url(article)}'
+
+
+def _claim(posts):
+    now = timezone.now()
+    ids = [post.pk for post in posts]
+    ScheduledPost.objects.filter(
+        pk__in=ids, status=ScheduledPost.PENDING
+    ).update(status=ScheduledPost.SENDING, claimed_at=now)
+    return ScheduledPost.objects.filter(
+        pk__in=ids, status=ScheduledPost.SENDING, claimed_at=now
+    ).values_list('pk', flat=True)
+
+
+def _unclaim(ids):
+    ScheduledPost.objects.filter(
+        pk__in=ids, status=ScheduledPost.SENDING
+    ).update(status=ScheduledPost.PENDING, claimed_at=None)
+
+
+def _release_stale(account):
+    # posts claimed by a dispatcher that died before finishing
+    ScheduledPost.objects.filter(
+        account=account,
+        status=ScheduledPost.SENDING,
+        claimed_at__lt=timezone.now() - timedelta(
+            seconds=settings.JOB_LEASE_SECONDS
+        ),
+    ).update(status=ScheduledPost.PENDING, claimed_at=None)
+
+
+def _drop_unapproved(account):
+    ScheduledPost.objects.filter(
+        account=account,
+        status=ScheduledPost.PENDING,
+        article__approved=False,
+    ).delete()
+
+
+def _available_tokens(account, budget):
+    budget_row = PostBudget.objects.filter(account=account).first()
+    if budget_row is None:
+        return budget.capacity
+    return budget.refill(
+        budget_row.tokens, timezone.now() - budget_row.updated_at
+    )
+
+
+def _reserve(account, budget, most, least=1):
+    ''' Refill the stored bucket up to now and take up to ``most`` posts
+        from it, or none while fewer than ``least`` are affordable. The row
+        is locked meanwhile, so no two dispatchers reserve the same posts.
+
+        :return: The posts reserved and the tokens left in the bucket.
+    '''
+    now = timezone.now()
+    with transaction.atomic():
+        budget_row = _locked_budget(account, budget, now)
+        tokens = budget.refill(budget_row.tokens, now - budget_row.updated_at)
+        reserved = min(most, int(tokens)) if tokens >= least else 0
+        budget_row.tokens = tokens - reserved
+        budget_row.updated_at = now
+        budget_row.save(update_fields=['tokens', 'updated_at'])
+    return reserved, tokens - reserved
+
+
+def _refund(account, budget, posts):
+    ''' Return ``posts`` reserved but not published to the bucket. '''
+    if posts <= 0:
+        return
+    now = timezone.now()
+    with transaction.atomic():
+        budget_row = _locked_budget(account, budget, now)
+        budget_row.tokens = min(
+            budget.capacity,
+            budget.refill(budget_row.tokens, now - budget_row.updated_at)
+            + posts,
+        )
+        budget_row.updated_at = now
+        budget_row.save(update_fields=['tokens', 'updated_at'])
+
+
+def _locked_budget(account, budget, now):
+    budget_row, _ = PostBudget.objects.select_for_update().get_or_create(
+        account=account,
+        defaults={'tokens': budget.capacity, 'updated_at': now},
+    )
+    return budget_row
+
+
+def _next_token_at(budget, tokens, wanted=1):
+    return timezone.now() + timedelta(
+        seconds=budget.seconds_until(tokens, wanted)
+    )
+
+
+def _ensure_dispatch(account, run_after):
+    ''' Queue a dispatch job for ``account`` unless one is already waiting
+        to run by ``run_after``.
+    '''
+    waiting = Job.objects.filter(
+        name=DISPATCH_TASK,
+        status=Job.PENDING,
+        payload__account=account,
+    )
+    if waiting.filter(run_after__lte=run_after).exists():
+        return
+    if waiting.exists():
+        waiting.update(run_after=run_after)
+        return
+    enqueue(DISPATCH_TASK, run_after=run_after, account=account)
+
+
+def queue_stats():
+    ''' Per-account queue depth, waiting times and remaining budget, for
+        tuning the budget and coalescing settings.
+    '''
+    now = timezone.now()
+    accounts = set(settings.SOCIAL_ACCOUNTS) | set(
+        ScheduledPost.objects.order_by().values_list('account', flat=True)
+        .distinct()
+    )
+    stats = {}
+    for account in sorted(accounts):
+        budget = Budget.for_account(account)
+        queued = ScheduledPost.objects.filter(account=account)
+        oldest = queued.filter(status=ScheduledPost.PENDING).aggregate(
+            oldest=Min('created_at')
+        )['oldest']
+        recent_wait = queued.filter(
+            status=ScheduledPost.SENT,
+            sent_at__gte=now - timedelta(hours=1),
+        ).aggregate(wait=Avg(F('sent_at') - F('created_at')))['wait']
+        tokens = _available_tokens(account, budget)
+        stats[account] = {
+            'pending': queued.filter(status=ScheduledPost.PENDING).count(),
+            'sending': queued.filter(status=ScheduledPost.SENDING).count(),
+            'failed': queued.filter(status=ScheduledPost.FAILED).count(),
+            'oldest_wait_seconds': (
+                (now - oldest).total_seconds() if oldest else 0
+            ),
+            'average_wait_seconds_last_hour': (
+                recent_wait.total_seconds() if recent_wait else 0
+            ),
+            'tokens': round(tokens, 2),
+            'capacity': budget.capacity,
+            'refill_seconds': budget.refill_seconds,
+            'next_post_in_seconds': budget.seconds_until(tokens),
+        }
+    return stats
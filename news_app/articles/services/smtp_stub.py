@@ -0,0 +1,115 @@
+import socketserver
+import threading
+import time
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    ''' Speaks just enough SMTP for Django's SMTP backend: EHLO/HELO, MAIL,
+        RCPT, DATA, RSET, NOOP and QUIT. Messages are counted, not stored.
+    '''
+
+    def handle(self):
+        server = self.server
+        server.count('connections')
+        self._reply('220 localhost SMTP stand-in ready')
+        recipients = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('ascii', 'replace').strip()
+            verb = command[:4].upper()
+            server.delay()
+
+            if verb == 'EHLO':
+                self._reply('250-localhost', '250 8BITMIME')
+            elif verb == 'HELO':
+                self._reply('250 localhost')
+            elif verb == 'MAIL':
+                recipients = []
+                self._reply('250 OK')
+            elif verb == 'RCPT':
+                address = command.partition(':')[2].strip().strip('<>')
+                if server.refuses(address):
+                    self._reply('550 No such user')
+                else:
+                    recipients.append(address)
+                    self._reply('250 OK')
+            elif verb == 'DATA':
+                if not recipients:
+                    self._reply('503 No valid recipients')
+                    continue
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+                for data in iter(self.rfile.readline, b''):
+                    if data == b'.\r\n':
+                        break
+                server.count('messages')
+                server.count('recipients', len(recipients))
+                recipients = []
+                self._reply('250 OK')
+            elif verb == 'RSET':
+                recipients = []
+                self._reply('250 OK')
+            elif verb == 'NOOP':
+                self._reply('250 OK')
+            elif verb == 'QUIT':
+                self._reply('221 Bye')
+                return
+            else:
+                self._reply('502 Command not implemented')
+
+    def _reply(self, *lines):
+        self.wfile.write(''.join(f'{line}\r\n' for line in lines).encode())
+
+
+class SMTPStubServer(socketserver.ThreadingTCPServer):
+    ''' Local stand-in SMTP server for measuring delivery throughput.
+
+        :latency: Seconds to wait before answering each command, to model
+            a remote server's round trip.
+        :refuse: Recipients containing this text are refused with a 550.
+    '''
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, refuse=None):
+        super().__init__((host, port), _SMTPHandler)
+        self.latency = latency
+        self.refuse = refuse
+        self.stats = {'connections': 0, 'messages': 0, 'recipients': 0}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def reset(self):
+        with self._lock:
+            self.stats = dict.fromkeys(self.stats, 0)
+
+    def delay(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def refuses(self, address):
+        return bool(self.refuse) and self.refuse in address
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -1,53 +1,294 @@
+import email.utils
+import logging
+import os
+import random
+import threading
+import time
+
 import requests
 from django.conf import settings
-import logging
+from requests.adapters import HTTPAdapter
+
+from news_app import metrics
+from news_app.timing import X, timed
 
 logger = logging.getLogger('news.twitter')
 
+# responses that mean the request was not processed and may be resent
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
 
-def post_to_x(article):
-    '''
-    Publish an article announcement to X (formerly Twitter).
-    Logs failure but does not block the approval workflow.
+
+class XPublishError(Exception):
+    ''' Raised when an article could not be posted to X.
+
+        :status: The HTTP status X answered with, if it answered.
     '''
 
-    if not settings.X_BEARER_TOKEN:
-        logger.error(
-            'X Post aborted: No bearer token configured.'
-            '(article id=%s)', article.pk
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+    @property
+    def retryable(self):
+        ''' False when X rejected the post itself (a 4xx other than 429),
+            e.g. as a duplicate or as too long: sending it again will not
+            help.
+        '''
+        return (
+            self.status is None
+            or self.status in RETRY_STATUSES
+            or self.status >= 500
         )
-        return
 
-    url = f'{settings.X_API_BASE_URL}tweets'
 
-    headers = {
-        'authorization': f'Bearer {settings.X_BEARER_TOKEN}',
-        'Content-Type': 'application/json',
-    }
+class CircuitOpenError(XPublishError):
+    '''Raised without contacting X while the circuit breaker is open.'''
+
+
+class CircuitBreaker:
+    ''' Stops calling a failing service for a while.
+
+        After ``threshold`` consecutive failures the breaker opens and every
+        call is refused at once. Once ``reset_timeout`` seconds have passed
+        a single trial call is let through (half-open): success closes the
+        breaker, failure opens it again.
+    '''
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, threshold=5, reset_timeout=60, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.threshold:
+                self.opened_at = self.clock()
+            self._trial_running = False
+
+
+class XClient:
+    ''' Long-lived client for the X API.
+
+        One ``requests.Session`` with a pooled adapter is shared by every
+        call, so connections (and their TLS sessions) are reused instead of
+        being set up for each post.
+
+        Requests that X did not process (connection failures and 429/5xx
+        responses) are retried up to ``max_retries`` times with jittered
+        exponential backoff, waiting for ``Retry-After`` when X sends it.
+        Read timeouts are not retried, since the post may have been
+        published. Repeated failures open the circuit breaker so that
+        callers fail fast while X is down.
+    '''
+
+    def __init__(self, base_url=None, token=None, pool_size=None,
+                 max_retries=None, backoff_base=None, backoff_max=None,
+                 retry_after_max=None, timeout=None, breaker=None,
+                 sleep=time.sleep):
+        self.base_url = base_url or settings.X_API_BASE_URL
+        self.max_retries = (
+            settings.X_MAX_RETRIES if max_retries is None else max_retries
+        )
+        self.backoff_base = backoff_base or settings.X_BACKOFF_BASE
+        self.backoff_max = backoff_max or settings.X_BACKOFF_MAX
+        self.retry_after_max = retry_after_max or settings.X_RETRY_AFTER_MAX
+        self.timeout = timeout or settings.X_TIMEOUT
+        self.breaker = breaker or CircuitBreaker(
+            threshold=settings.X_BREAKER_THRESHOLD,
+            reset_timeout=settings.X_BREAKER_RESET_SECONDS,
+        )
+        self.sleep = sleep
 
-    payload = {
-        'text': (
-            f"New Article Published\n\n"
-            f"{article.title}\n\n"
-            f"By {article.author.username}\n\n"
-            f'Read more at: http://example.com/articles/{article.pk}'
+        pool_size = pool_size or settings.X_POOL_SIZE
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, max_retries=0
         )
-    }
-
-    try:
-        response = requests.post(
-            url,
-            headers=headers,
-            json=payload,
-            timeout=5,
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'authorization': f'Bearer {token or settings.X_BEARER_TOKEN}',
+            'Content-Type': 'application/json',
+        })
+
+    @timed(X)
+    def post_tweet(self, text, in_reply_to=None):
+        ''' Publish a post, optionally as a reply to the post with id
+            ``in_reply_to``, and return the decoded response body.
+        '''
+        payload = {'text': text}
+        if in_reply_to:
+            payload['reply'] = {'in_reply_to_tweet_id': in_reply_to}
+        with metrics.X_POST_DURATION.time():
+            try:
+                return self.request('POST', 'tweets', json=payload)
+            except XPublishError:
+                metrics.X_POST_FAILURES.inc()
+                raise
+
+    def request(self, method, path, **kwargs):
+        url = f'{self.base_url}{path}'
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                raise CircuitOpenError('X circuit breaker is open.')
+
+            try:
+                response = self.session.request(
+                    method, url, timeout=self.timeout, **kwargs
+                )
+            except requests.ConnectionError as exc:
+                self.breaker.record_failure()
+                error, status = exc, None
+                delay = self._backoff(attempt)
+            except requests.Timeout as exc:
+                self.breaker.record_failure()
+                raise XPublishError(f'X did not answer in time: {exc}')
+            except requests.RequestException as exc:
+                # ends a half-open trial too, or no other would be allowed
+                self.breaker.record_failure()
+                raise XPublishError(f'X request could not be sent: {exc}')
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    if response.ok:
+                        self.breaker.record_success()
+                        return self._json(response)
+                    # a client error will not go away by retrying, and
+                    # says nothing about X's health
+                    self.breaker.record_success()
+                    raise XPublishError(
+                        f'X rejected the post ({response.status_code}): '
+                        f'{response.text}',
+                        status=response.status_code,
+                    )
+                self.breaker.record_failure()
+                error = f'{response.status_code} {response.text}'
+                status = response.status_code
+                delay = self._retry_after(response)
+                if delay is None:
+                    delay = self._backoff(attempt)
+                elif delay > self.retry_after_max:
+                    raise XPublishError(
+                        f'X asked to retry after {delay:.0f}s: {error}',
+                        status=status,
+                    )
+
+            if attempt < self.max_retries:
+                logger.warning(
+                    'X request failed (%s), retrying in %.2fs', error, delay
+                )
+                self.sleep(delay)
+        raise XPublishError(
+            f'X request failed after {self.max_retries + 1} attempts: {error}',
+            status=status,
         )
-        response.raise_for_status()
-    except requests.RequestException as exc:
-        logger.error(
-            "Failed to post article to X "
-            "(article_id=%s, status_code=%s, response=%s)",
-            article.pk,
-            getattr(exc.response, 'status_code', 'N/A'),
-            getattr(exc.response, 'text', 'N/A'),
-            exc_info=True,  # prints stack trace
+
+    def close(self):
+        self.session.close()
+
+    def _backoff(self, attempt):
+        # "full jitter": anywhere up to the exponential delay, so clients
+        # that failed together spread their retries out
+        return random.uniform(
+            0, min(self.backoff_max, self.backoff_base * 2 ** attempt)
         )
+
+    @staticmethod
+    def _json(response):
+        try:
+            return response.json()
+        except ValueError:
+            return {}
+
+    @staticmethod
+    def _retry_after(response):
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            when = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, when.timestamp() - time.time())
+
+
+_clients = {}
+_clients_pid = None
+_clients_lock = threading.Lock()
+
+
+def get_client(account='default'):
+    ''' Return the process-wide XClient for a social account, creating it
+        on first use. Accounts listed in SOCIAL_ACCOUNTS may carry their own
+        ``token``; the rest use X_BEARER_TOKEN. A forked worker process
+        builds its own clients rather than sharing the parent's sockets.
+    '''
+    global _clients_pid
+    with _clients_lock:
+        if _clients_pid != os.getpid():
+            _clients.clear()
+            _clients_pid = os.getpid()
+        if account not in _clients:
+            _clients[account] = XClient(token=account_token(account))
+        return _clients[account]
+
+
+def account_token(account='default'):
+    ''' The bearer token of a social account, or '' if none is set. '''
+    config = settings.SOCIAL_ACCOUNTS.get(account, {})
+    return config.get('token') or settings.X_BEARER_TOKEN or ''
+
+
+def reset_clients():
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
+
+def announcement_text(article):
+    return (
+        f"New Article Published\n\n"
+        f"{article.title}\n\n"
+        f"By {article.author.username}\n\n"
+        f'Read more at: {article_url(article)}'
+    )
+
+
+def article_url(article):
+    return f'http://example.com/articles/{article.pk}'
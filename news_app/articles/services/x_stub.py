@@ -0,0 +1,118 @@
+import json
+import socket
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _XHandler(BaseHTTPRequestHandler):
+    ''' Answers ``POST .../tweets`` like the X API, keeping connections
+        alive between requests as the real API does.
+    '''
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        # headers and body are written separately; without this Nagle's
+        # algorithm holds the body back until the client's delayed ACK
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.server.count('connections')
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+        server = self.server
+        server.count('requests')
+        server.delay()
+
+        status, headers = server.next_failure() or (201, {})
+        if status == 201:
+            text = json.loads(body or b'{}').get('text', '')
+            server.record_post(text)
+            post_id = str(server.stats['posts'])
+            payload = {'data': {'id': post_id, 'text': text}}
+        else:
+            payload = {'title': 'Stand-in failure', 'status': status}
+        self._send(status, payload, headers)
+
+    def _send(self, status, payload, headers):
+        content = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class XStubServer(ThreadingHTTPServer):
+    ''' Local stand-in for the X API, for tests and benchmarks.
+
+        :latency: Seconds to wait before answering each request.
+        :failures: Responses to return before succeeding again, as
+            ``(status, headers)`` pairs, e.g. ``(429, {'Retry-After': '1'})``.
+            More can be queued with ``fail``.
+    '''
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, failures=()):
+        super().__init__((host, port), _XHandler)
+        self.latency = latency
+        self.failures = deque(failures)
+        self.posts = []
+        self.stats = {'connections': 0, 'requests': 0, 'posts': 0}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/2/'
+
+    def fail(self, status, times=1, headers=None):
+        with self._lock:
+            self.failures.extend([(status, headers or {})] * times)
+
+    def next_failure(self):
+        with self._lock:
+            return self.failures.popleft() if self.failures else None
+
+    def count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def record_post(self, text):
+        with self._lock:
+            self.posts.append(text)
+            self.stats['posts'] += 1
+
+    def reset(self):
+        with self._lock:
+            self.failures.clear()
+            self.posts.clear()
+            self.stats = dict.fromkeys(self.stats, 0)
+
+    def delay(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -1,37 +1,28 @@
-from django.db.models.signals import post_save, pre_save
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from django.core.mail import send_mail
-from django.conf import settings
 from .models import Article
-from subscriptions.models import (
-    JournalistSubscription,
-    NewsletterSubscription
-)
-import requests
-from articles.services.x_publisher import post_to_x
-
-
-@receiver(pre_save, sender=Article)
-def article_pre_save(sender, instance, **kwargs):
-    '''
-    Store the previous approved status before saving.
-    '''
-    if not instance.pk:
-        instance.previous_approved = False
-        return
-
-    try:
-        previous = Article.objects.get(pk=instance.pk)
-        instance.previous_approved = previous.approved
-    except Article.DoesNotExist:
-        instance.previous_approved = False
+from articles import list_version, page_cache, search, tasks
+from articles.services import post_scheduler
+from jobs.queue import enqueue
+from news_app.timing import SIGNALS, timed
+from publishers.models import Publisher
+from subscriptions import tasks as subscription_tasks
+from subscriptions.services import feed
 
 
 @receiver(post_save, sender=Article)
+@timed(SIGNALS)
 def notify_subscribers_on_approval(sender, instance, created, **kwargs):
     '''
-    Send notification emails to subscribers only when an article 
+    Queue the subscriber emails and schedule the X post when an article
     goes from unapproved to approved status for the first time.
+
+    ``previous_approved`` comes from the conditional UPDATE in
+    ``Article.save``, so concurrent approvals queue the jobs only once.
+    The jobs are written in the same transaction as the approval and run
+    by ``manage.py run_workers``, so approving never waits on SMTP or X.
     '''
     # only proceed if the article is being updated, not created
     if created:
@@ -43,46 +34,96 @@ def notify_subscribers_on_approval(sender, instance, created, **kwargs):
     if getattr(instance, 'previous_approved', True):
         return
 
-    # fetch journalist and newsletter subscribers
-    journalist_subscribers = JournalistSubscription.objects.filter(
-        journalist=instance.author
-    ).select_related('reader')
+    enqueue(tasks.notify_subscribers, article_id=instance.pk)
+    post_scheduler.schedule(instance)
 
-    newsletter_subscribers = NewsletterSubscription.objects.filter(
-        newsletter__articles=instance
-    ).select_related('reader')
 
-    # compile unique recipient emails
-    recipients = set()
+@receiver(post_save, sender=Article)
+@timed(SIGNALS)
+def update_search_index(sender, instance, **kwargs):
+    '''
+    Keep the full-text search index in step with the saved article.
+    '''
+    search.index_article(instance)
 
-    for sub in journalist_subscribers:
-        recipients.add(sub.reader.email)
 
-    for sub in newsletter_subscribers:
-        recipients.add(sub.reader.email)
+@receiver(post_delete, sender=Article)
+@timed(SIGNALS)
+def remove_from_search_index(sender, instance, **kwargs):
+    '''
+    Remove a deleted article from the full-text search index.
+    '''
+    search.remove_article(instance.pk)
 
-    # Remove any 'None' emails if present
-    recipients.discard(None)
 
-    if not recipients:
-        return
+@receiver(post_save, sender=Article)
+@timed(SIGNALS)
+def update_reader_feeds(sender, instance, **kwargs):
+    '''
+    Queue the fan-out of an article into its subscribers' feeds when it
+    becomes approved and take it out again at once if it is unapproved.
+    '''
+    previous_approved = getattr(instance, 'previous_approved', False)
+    if instance.approved and not previous_approved:
+        enqueue(subscription_tasks.fan_out_article, article_id=instance.pk)
+    elif previous_approved and not instance.approved:
+        feed.remove_article(instance.pk)
+
 
-    # send notification emails
-    subject = f'New Article Published: {instance.title}'
-    message = (
-        f"{instance.title}\n\n"
-        f"By {instance.author.username}\n\n"
-        f'{instance.content[:200]}...\n\n'
-        f'Read more at: http://example.com/articles/{instance.pk}'
-    )
-
-    send_mail(
-        subject=subject,
-        message=message,
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        recipient_list=list(recipients),
-        fail_silently=False,
-    )
-
-    # Post to X (Twitter)
-    post_to_x(instance)
+@receiver(post_save, sender=Article)
+@timed(SIGNALS)
+def invalidate_cached_pages(sender, instance, **kwargs):
+    '''
+    Drop the cached pages that show the article once the save commits.
+    The article list only changes when an approved article is edited,
+    approved or unapproved.
+    '''
+    groups = [page_cache.article_version(instance.pk)]
+    if instance.approved or getattr(instance, 'previous_approved', False):
+        groups.append(page_cache.LIST_VERSION)
+        list_version.bump()
+    _invalidate_pages(instance.pk, groups)
+
+
+@receiver(post_delete, sender=Article)
+@timed(SIGNALS)
+def invalidate_cached_pages_on_delete(sender, instance, **kwargs):
+    '''
+    Drop the cached pages of a deleted article once the delete commits.
+    '''
+    groups = [page_cache.article_version(instance.pk)]
+    if instance.approved:
+        groups.append(page_cache.LIST_VERSION)
+        list_version.bump()
+    _invalidate_pages(instance.pk, groups)
+
+
+def _invalidate_pages(article_id, groups):
+    # after the commit, or a concurrent request could cache the old rows
+    # under the new version
+    page_cache.invalidate_on_commit(*groups)
+    transaction.on_commit(lambda: page_cache.forget_author(article_id))
+
+
+@receiver(post_save, sender=get_user_model())
+@timed(SIGNALS)
+def bump_list_version_on_author_change(sender, instance, update_fields,
+                                       **kwargs):
+    '''
+    Move the article list version when a user's username or role may have
+    changed, since the list shows them for each author. Saves of other
+    fields only, such as ``last_login``, leave it alone.
+    '''
+    if update_fields is None or {'username', 'role'} & set(update_fields):
+        list_version.bump()
+
+
+@receiver(post_save, sender=Publisher)
+@receiver(post_delete, sender=Publisher)
+@timed(SIGNALS)
+def bump_list_version_on_publisher_change(sender, **kwargs):
+    '''
+    Move the article list version when a publisher shown in the list is
+    renamed, described anew or deleted.
+    '''
+    list_version.bump()
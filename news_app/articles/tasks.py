@@ -0,0 +1,192 @@
+from datetime import timedelta
+from django.utils import timezone
+from jobs.queue import backoff, enqueue, task
+from subscriptions.models import (
+    JournalistSubscription,
+    NewsletterSubscription
+)
+from articles.services import email_delivery, post_scheduler
+from news_app import metrics
+from .models import Article
+
+
+def _approved_article(article_id):
+    # the article may have been unapproved or deleted since the job was
+    # enqueued, in which case there is nothing left to announce
+    return Article.objects.filter(
+        pk=article_id, approved=True
+    ).select_related('author').defer('content').first()
+
+
+class DeliveryError(Exception):
+    '''Raised when no notification email could be delivered.'''
+
+
+@task()
+def notify_subscribers(article_id, recipients=None):
+    '''
+    Email the readers subscribed to an approved article's author or to a
+    newsletter that includes it.
+
+    The message is rendered once and delivered in Bcc chunks over the
+    worker's open mail connection. If only some chunks fail, a follow-up
+    job retries just those recipients; if every chunk fails the job is
+    retried as a whole.
+    '''
+    article = _approved_article(article_id)
+    if article is None:
+        return
+
+    if recipients is None:
+        recipients = subscriber_emails(article)
+        metrics.NOTIFICATION_RECIPIENTS.observe(
+            len(recipients), task='notify_subscribers'
+        )
+    if not recipients:
+        return
+
+    subject = f'New Article Published: {article.title}'
+    result = email_delivery.deliver(
+        subject, _article_summary(article), recipients
+    )
+    if result.failed and not result.delivered:
+        raise DeliveryError(
+            f'Could not deliver to any of {len(result.failed)} recipients.'
+        )
+    if result.failed:
+        enqueue(
+            notify_subscribers,
+            run_after=timezone.now() + timedelta(seconds=backoff(1)),
+            article_id=article_id,
+            recipients=result.failed,
+        )
+
+
+@task()
+def notify_subscribers_of_articles(article_ids, recipients=None):
+    '''
+    Email the subscribers of a batch of approved articles, e.g. after a
+    bulk approval, so that each reader gets one email listing every
+    article of the batch they follow instead of one email per article.
+
+    Recipients are resolved for the whole batch with two queries. Readers
+    who follow the same articles share a message, delivered in Bcc chunks.
+    Failed recipients are retried as with ``notify_subscribers``.
+
+    :recipients: Only email these addresses (used for retries).
+    '''
+    articles = Article.objects.filter(
+        pk__in=article_ids, approved=True
+    ).select_related('author').defer('content').in_bulk()
+    if not articles:
+        return
+
+    followed = batch_subscriber_emails(articles.values())
+    if recipients is None:
+        metrics.NOTIFICATION_RECIPIENTS.observe(
+            len(followed), task='notify_subscribers_of_articles'
+        )
+    else:
+        wanted = set(recipients)
+        followed = {
+            email: ids for email, ids in followed.items() if email in wanted
+        }
+
+    # readers following the same articles get the same message
+    groups = {}
+    for email, ids in followed.items():
+        groups.setdefault(frozenset(ids), []).append(email)
+
+    delivered = []
+    failed = []
+    for ids, emails in groups.items():
+        batch = sorted(
+            (articles[article_id] for article_id in ids),
+            key=lambda article: article.pk,
+        )
+        if len(batch) == 1:
+            subject = f'New Article Published: {batch[0].title}'
+        else:
+            subject = f'{len(batch)} New Articles Published'
+        message = '\n\n---\n\n'.join(
+            _article_summary(article) for article in batch
+        )
+        result = email_delivery.deliver(subject, message, sorted(emails))
+        delivered.extend(result.delivered)
+        failed.extend(result.failed)
+
+    if failed and not delivered:
+        raise DeliveryError(
+            f'Could not deliver to any of {len(failed)} recipients.'
+        )
+    if failed:
+        enqueue(
+            notify_subscribers_of_articles,
+            run_after=timezone.now() + timedelta(seconds=backoff(1)),
+            article_ids=sorted(articles),
+            recipients=sorted(failed),
+        )
+
+
+def _article_summary(article):
+    return (
+        f"{article.title}\n\n"
+        f"By {article.author.username}\n\n"
+        f'{article.excerpt}\n\n'
+        f'Read more at: http://example.com/articles/{article.pk}'
+    )
+
+
+def subscriber_emails(article):
+    '''
+    Return the unique addresses of the readers subscribed to the article's
+    author or to a newsletter that includes it.
+    '''
+    recipients = set(
+        JournalistSubscription.objects.filter(
+            journalist=article.author
+        ).values_list('reader__email', flat=True)
+    )
+    recipients.update(
+        NewsletterSubscription.objects.filter(
+            newsletter__articles=article
+        ).values_list('reader__email', flat=True)
+    )
+    # readers without an email address cannot be notified
+    recipients.discard(None)
+    recipients.discard('')
+    return sorted(recipients)
+
+
+def batch_subscriber_emails(articles):
+    '''
+    Return ``{email: {article ids}}`` for the readers subscribed to the
+    author of, or a newsletter including, any of the given articles.
+    '''
+    article_ids = {article.pk for article in articles}
+    by_author = {}
+    for article in articles:
+        by_author.setdefault(article.author_id, set()).add(article.pk)
+
+    followed = {}
+    for email, journalist_id in JournalistSubscription.objects.filter(
+        journalist_id__in=by_author
+    ).values_list('reader__email', 'journalist_id'):
+        followed.setdefault(email, set()).update(by_author[journalist_id])
+    for email, article_id in NewsletterSubscription.objects.filter(
+        newsletter__articles__in=article_ids
+    ).values_list('reader__email', 'newsletter__articles'):
+        followed.setdefault(email, set()).add(article_id)
+
+    # readers without an email address cannot be notified
+    followed.pop(None, None)
+    followed.pop('', None)
+    return followed
+
+
+@task()
+def dispatch_social_posts(account):
+    '''
+    Publish the scheduled social posts of an account within its budget.
+    '''
+    post_scheduler.dispatch(account)
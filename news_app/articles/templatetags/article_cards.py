@@ -0,0 +1,65 @@
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from news_app import metrics
+
+register = template.Library()
+
+CARD_TEMPLATE = 'articles/includes/article_card.html'
+
+
+def card_key(article, options):
+    ''' Cache key of an article card. It changes whenever the article is
+        saved (``updated_at``) or the card is rendered with other options,
+        so stale cards are never read and simply expire.
+    '''
+    options_hash = hashlib.md5(
+        repr(sorted(options.items())).encode()
+    ).hexdigest()[:8]
+    return (
+        f'article-card:{article.pk}:'
+        f'{article.updated_at.timestamp():.6f}:{options_hash}'
+    )
+
+
+@register.simple_tag
+def article_cards(articles, words=30, show_author=True,
+                  link_text='Read Article'):
+    ''' Render the reader cards of ``articles``.
+
+        All cards of the page are looked up with one ``get_many`` and the
+        missing ones are rendered and stored with one ``set_many``, so
+        truncating article bodies only happens when an article changes.
+
+        Usage::
+
+            {% article_cards articles words=40 link_text="Read Full Article" %}
+    '''
+    options = {
+        'words': words,
+        'show_author': show_author,
+        'link_text': link_text,
+    }
+    articles = list(articles)
+    keys = [card_key(article, options) for article in articles]
+    cards = cache.get_many(keys)
+
+    missing = {}
+    for key, article in zip(keys, articles):
+        if key not in cards:
+            missing[key] = render_to_string(
+                CARD_TEMPLATE, dict(options, article=article)
+            )
+    metrics.record_cache(
+        'article_card', hits=len(cards), misses=len(missing)
+    )
+    if missing:
+        cache.set_many(missing, settings.ARTICLE_CARD_CACHE_SECONDS)
+        cards.update(missing)
+
+    return mark_safe(''.join(cards[key] for key in keys))
@@ -1,7 +1,56 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from io import StringIO
+import requests
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.template import Context, Template
+from django.template.loader import render_to_string
+from django.core import mail
+from django.db import OperationalError, connection, transaction
+from django.test import (
+    Client,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from unittest.mock import patch
-from articles.models import Article
-from subscriptions.models import JournalistSubscription
+from datetime import timedelta
+from articles.api.serializers import (
+    ArticleListSerializer,
+    article_values,
+    serialize_article_rows,
+)
+from articles.models import (
+    Article, ImportCheckpoint, PostBudget, ScheduledPost,
+)
+from articles import export, list_version, page_cache, search, tasks
+from articles.templatetags import article_cards
+from articles.services import editorial, email_delivery
+from articles.services import post_scheduler, x_publisher
+from articles.services.smtp_stub import SMTPStubServer
+from articles.services.x_stub import XStubServer
+from jobs import queue
+from news_app import (
+    bench, loadtest, metrics, profiling, slow_queries, stats, timing,
+)
+from jobs.models import Job
+from publishers.models import Publisher
+from newsletters.models import Newsletter
+from subscriptions.models import (
+    FeedItem,
+    JournalistSubscription,
+    NewsletterSubscription,
+)
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.test import APITestCase
@@ -35,15 +84,10 @@ class ArticleSignalTests(TestCase):
     """
     Testing the article signals
     """
-    @patch("articles.signals.post_to_x")
-    @patch("articles.signals.send_mail")
-    def test_signal_fires_on_approval(
-        self,
-        mock_send_mail,
-        mock_post_to_x
-    ):
+    def test_signal_fires_on_approval(self):
         reader = User.objects.create_user(
             username="reader",
+            email="reader@example.com",
             password="pass",
             role="reader"
         )
@@ -69,8 +113,1480 @@ class ArticleSignalTests(TestCase):
         article.approved = True
         article.save()
 
-        mock_send_mail.assert_called_once()
-        mock_post_to_x.assert_called_once()
+        # the approval only queues the side effects
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(
+            set(Job.objects.values_list("name", flat=True)),
+            {"articles.tasks.notify_subscribers",
+             "articles.tasks.dispatch_social_posts",
+             "subscriptions.tasks.fan_out_article"},
+        )
+
+        queue.drain()
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].bcc, ["reader@example.com"])
+        self.assertTrue(
+            ScheduledPost.objects.filter(article=article).exists()
+        )
+
+
+class ArticleApprovalTests(TestCase):
+    """
+    Testing the compare-and-set approval transition
+    """
+    def setUp(self):
+        journalist = User.objects.create_user(
+            username="journalist", password="pass", role="journalist"
+        )
+        self.article = Article.objects.create(
+            title="Draft", content="...", author=journalist
+        )
+        Job.objects.all().delete()
+
+    def notification_jobs(self):
+        return Job.objects.filter(
+            name="articles.tasks.notify_subscribers"
+        ).count()
+
+    def test_editing_does_not_reload_the_article(self):
+        article = Article.objects.get(pk=self.article.pk)
+        article.title = "Edited"
+
+        with CaptureQueriesContext(connection) as queries:
+            article.save()
+
+        self.assertFalse([
+            query for query in queries
+            if query["sql"].startswith('SELECT') and
+            '"articles_article"' in query["sql"]
+        ])
+        self.assertFalse(article.previous_approved)
+
+    def test_stale_copies_notify_once(self):
+        first = Article.objects.get(pk=self.article.pk)
+        second = Article.objects.get(pk=self.article.pk)
+
+        first.approved = True
+        first.save()
+        second.approved = True
+        second.save()
+
+        self.assertFalse(first.previous_approved)
+        self.assertTrue(second.previous_approved)
+        self.assertEqual(self.notification_jobs(), 1)
+
+    def test_unapproving_is_detected(self):
+        self.article.approved = True
+        self.article.save()
+        self.article.approved = False
+        self.article.save()
+
+        self.assertTrue(self.article.previous_approved)
+        self.assertFalse(Article.objects.get(pk=self.article.pk).approved)
+
+
+class ConcurrentApprovalTests(TransactionTestCase):
+    """
+    Stress test: many editors approving the same article at once
+    """
+    editors = 8
+
+    def test_concurrent_approvals_notify_exactly_once(self):
+        journalist = User.objects.create_user(
+            username="journalist", password="pass", role="journalist"
+        )
+        for round in range(5):
+            article = Article.objects.create(
+                title=f"Draft {round}", content="...", author=journalist
+            )
+            self.approve_concurrently(article.pk)
+
+            self.assertEqual(
+                Job.objects.filter(
+                    name="articles.tasks.notify_subscribers",
+                    payload__article_id=article.pk,
+                ).count(),
+                1,
+            )
+
+    def approve_concurrently(self, article_id):
+        # every editor loads the unapproved article before any approves it
+        barrier = threading.Barrier(self.editors)
+        errors = []
+
+        def approve():
+            try:
+                article = Article.objects.get(pk=article_id)
+                barrier.wait()
+                for _ in range(200):
+                    article.approved = True
+                    try:
+                        article.save()
+                        return
+                    except OperationalError:
+                        # the in-memory test database reports lock
+                        # contention instead of waiting; the save was
+                        # rolled back, so try again
+                        time.sleep(0.001)
+                errors.append("gave up")
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=approve) for _ in range(self.editors)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+
+class EmailDeliveryTests(TestCase):
+    """
+    Testing chunked delivery against the local SMTP stand-in
+    """
+    def setUp(self):
+        self.server = SMTPStubServer(refuse="bounce").start()
+        self.addCleanup(self.server.stop)
+        self.addCleanup(email_delivery.close_worker_connection)
+        email_delivery.close_worker_connection()
+        settings = override_settings(
+            EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+            EMAIL_HOST="127.0.0.1",
+            EMAIL_PORT=self.server.port,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.recipients = [f"reader{n}@example.com" for n in range(25)]
+
+    def test_bcc_chunks_share_one_connection(self):
+        result = email_delivery.deliver(
+            "Subject", "Body", self.recipients, chunk_size=10
+        )
+
+        self.assertEqual(result.messages, 3)
+        self.assertEqual(result.failed, [])
+        self.assertEqual(self.server.stats["recipients"], 25)
+        self.assertEqual(self.server.stats["connections"], 1)
+
+    def test_recipients_refused_within_a_chunk_are_failed(self):
+        recipients = self.recipients + ["bounce@example.com"]
+        result = email_delivery.deliver(
+            "Subject", "Body", recipients, chunk_size=10
+        )
+
+        self.assertEqual(result.messages, 3)
+        self.assertEqual(result.failed, ["bounce@example.com"])
+        self.assertCountEqual(result.delivered, self.recipients)
+
+    def test_failed_recipient_does_not_stop_the_rest(self):
+        recipients = self.recipients + ["bounce@example.com"]
+        result = email_delivery.deliver(
+            "Subject", "Body", recipients, mode=email_delivery.INDIVIDUAL
+        )
+
+        self.assertEqual(result.failed, ["bounce@example.com"])
+        self.assertEqual(len(result.delivered), 25)
+        self.assertEqual(self.server.stats["messages"], 25)
+
+    def test_only_failed_recipients_are_retried(self):
+        journalist = User.objects.create_user(
+            username="journalist", password="pass", role="journalist"
+        )
+        article = Article.objects.create(
+            title="Approved", content="...", author=journalist, approved=True
+        )
+        Job.objects.all().delete()
+
+        with override_settings(EMAIL_DELIVERY_MODE=email_delivery.INDIVIDUAL):
+            tasks.notify_subscribers(
+                article.pk, recipients=["ok@example.com", "bounce@example.com"]
+            )
+
+        job = Job.objects.get()
+        self.assertEqual(job.payload["recipients"], ["bounce@example.com"])
+        self.assertGreater(job.run_after, timezone.now())
+
+
+class XPublisherTests(TestCase):
+    """
+    Testing the X client against the local stand-in
+    """
+    def setUp(self):
+        self.server = XStubServer().start()
+        self.addCleanup(self.server.stop)
+        self.sleeps = []
+        self.now = 0.0
+        self.breaker = x_publisher.CircuitBreaker(
+            threshold=3, reset_timeout=60, clock=lambda: self.now
+        )
+        self.client = x_publisher.XClient(
+            base_url=self.server.base_url,
+            token="token",
+            max_retries=2,
+            breaker=self.breaker,
+            sleep=self.sleeps.append,
+        )
+        self.addCleanup(self.client.close)
+
+    def test_connections_are_reused(self):
+        for _ in range(3):
+            self.client.post_tweet("hello")
+
+        self.assertEqual(self.server.stats["posts"], 3)
+        self.assertEqual(self.server.stats["connections"], 1)
+
+    def test_unprocessed_requests_are_retried_with_backoff(self):
+        self.server.fail(503, times=2)
+
+        self.client.post_tweet("hello")
+
+        self.assertEqual(self.server.stats["requests"], 3)
+        self.assertEqual(len(self.sleeps), 2)
+        self.assertTrue(all(0 <= delay <= 8 for delay in self.sleeps))
+
+    def test_retry_after_is_honored(self):
+        self.server.fail(429, headers={"Retry-After": "2"})
+
+        self.client.post_tweet("hello")
+
+        self.assertEqual(self.sleeps, [2.0])
+
+    def test_long_retry_after_is_left_to_the_job_queue(self):
+        self.server.fail(429, headers={"Retry-After": "3600"})
+
+        with self.assertRaises(x_publisher.XPublishError):
+            self.client.post_tweet("hello")
+        self.assertEqual(self.sleeps, [])
+
+    def test_client_errors_are_not_retried(self):
+        self.server.fail(400)
+
+        with self.assertRaises(x_publisher.XPublishError) as caught:
+            self.client.post_tweet("hello")
+        self.assertEqual(self.server.stats["requests"], 1)
+        self.assertFalse(caught.exception.retryable)
+
+    def test_circuit_breaker_opens_and_recovers(self):
+        self.server.fail(503, times=3)
+
+        with self.assertRaises(x_publisher.XPublishError):
+            self.client.post_tweet("hello")
+        self.assertEqual(self.breaker.state, self.breaker.OPEN)
+
+        # while open X is not contacted at all
+        with self.assertRaises(x_publisher.CircuitOpenError):
+            self.client.post_tweet("hello")
+        self.assertEqual(self.server.stats["requests"], 3)
+
+        # after the reset timeout one trial request closes it again
+        self.now += 60
+        self.client.post_tweet("hello")
+        self.assertEqual(self.breaker.state, self.breaker.CLOSED)
+
+    def test_unsendable_trial_request_does_not_wedge_the_breaker(self):
+        self.server.fail(503, times=3)
+        with self.assertRaises(x_publisher.XPublishError):
+            self.client.post_tweet("hello")
+        self.now += 60
+
+        with patch.object(
+            self.client.session, "request",
+            side_effect=requests.exceptions.InvalidURL("bad url"),
+        ):
+            with self.assertRaises(x_publisher.XPublishError):
+                self.client.post_tweet("hello")
+        self.assertEqual(self.breaker.state, self.breaker.OPEN)
+
+        # the failed trial reopened the breaker, and the next one closes it
+        self.now += 60
+        self.client.post_tweet("hello")
+        self.assertEqual(self.breaker.state, self.breaker.CLOSED)
+
+
+@override_settings(
+    X_BEARER_TOKEN="token",
+    SOCIAL_POST_CAPACITY=3,
+    SOCIAL_POST_REFILL_SECONDS=60,
+    SOCIAL_COALESCE_MODE="digest",
+)
+class PostSchedulerTests(BaseAPITestCase):
+    """
+    Testing the rate-budgeted social post scheduler
+    """
+    def setUp(self):
+        self.server = XStubServer().start()
+        self.addCleanup(self.server.stop)
+        client = x_publisher.XClient(
+            base_url=self.server.base_url,
+            token="token",
+            max_retries=0,
+            sleep=lambda delay: None,
+        )
+        self.addCleanup(client.close)
+        patcher = patch.object(
+            x_publisher, "get_client", return_value=client
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.journalist = self.create_user("journalist", "journalist")
+
+    def approve(self, count):
+        for number in range(count):
+            article = Article.objects.create(
+                title=f"Article {number}",
+                content="...",
+                author=self.journalist,
+            )
+            article.approved = True
+            article.save()
+
+    def dispatch_jobs(self):
+        return Job.objects.filter(
+            name="articles.tasks.dispatch_social_posts",
+            status=Job.PENDING,
+        )
+
+    def test_approvals_are_persisted_and_dispatched_once(self):
+        self.approve(2)
+
+        self.assertEqual(
+            ScheduledPost.objects.filter(
+                status=ScheduledPost.PENDING
+            ).count(),
+            2,
+        )
+        # one dispatch job, held back to gather the burst
+        job = self.dispatch_jobs().get()
+        self.assertGreater(job.run_after, timezone.now())
+
+    def test_posts_within_budget_go_out_individually(self):
+        self.approve(2)
+
+        self.assertEqual(post_scheduler.dispatch(), 2)
+
+        self.assertEqual(self.server.stats["posts"], 2)
+        self.assertEqual(
+            set(ScheduledPost.objects.values_list("posted_as", flat=True)),
+            {ScheduledPost.SINGLE},
+        )
+
+    def test_burst_over_budget_is_coalesced_into_a_digest(self):
+        self.approve(5)
+
+        self.assertEqual(post_scheduler.dispatch(), 1)
+
+        self.assertEqual(self.server.stats["posts"], 1)
+        self.assertIn("5 new articles", self.server.posts[0])
+        self.assertEqual(
+            ScheduledPost.objects.filter(
+                status=ScheduledPost.SENT, posted_as=ScheduledPost.DIGEST
+            ).count(),
+            5,
+        )
+        self.assertAlmostEqual(
+            PostBudget.objects.get(account="default").tokens, 2, places=1
+        )
+
+    @override_settings(SOCIAL_COALESCE_MODE="thread")
+    def test_burst_over_budget_can_be_threaded(self):
+        self.approve(5)
+
+        self.assertEqual(post_scheduler.dispatch(), 2)
+
+        self.assertIn("in this thread", self.server.posts[0])
+        self.assertEqual(self.server.posts[1].count("• Article"), 5)
+        self.assertEqual(
+            ScheduledPost.objects.filter(
+                posted_as=ScheduledPost.THREAD
+            ).count(),
+            5,
+        )
+
+    def test_empty_budget_waits_for_a_refill(self):
+        PostBudget.objects.create(
+            account="default", tokens=0, updated_at=timezone.now()
+        )
+        self.approve(1)
+        self.dispatch_jobs().delete()
+
+        self.assertEqual(post_scheduler.dispatch(), 0)
+
+        self.assertEqual(self.server.stats["requests"], 0)
+        job = self.dispatch_jobs().get()
+        self.assertGreater(
+            job.run_after, timezone.now() + timedelta(seconds=50)
+        )
+
+    def test_failed_posts_stay_queued(self):
+        self.server.fail(503)
+        self.approve(1)
+        self.dispatch_jobs().delete()
+
+        self.assertEqual(post_scheduler.dispatch(), 0)
+
+        self.assertEqual(
+            ScheduledPost.objects.get().status, ScheduledPost.PENDING
+        )
+        self.assertTrue(self.dispatch_jobs().exists())
+
+    @override_settings(SOCIAL_POST_MAX_ATTEMPTS=3)
+    def test_failing_posts_back_off_then_fail(self):
+        self.server.fail(503, times=3)
+        self.approve(1)
+        delays = []
+        backoff = patch.object(
+            post_scheduler, "backoff",
+            side_effect=lambda attempts: delays.append(attempts) or 60,
+        )
+
+        with backoff:
+            for _ in range(3):
+                self.assertEqual(post_scheduler.dispatch(), 0)
+
+        post = ScheduledPost.objects.get()
+        self.assertEqual(post.status, ScheduledPost.FAILED)
+        self.assertEqual(post.attempts, 3)
+        self.assertIn("503", post.last_error)
+        self.assertEqual(delays, [1, 2])
+        # the budget was not spent on posts that never went out
+        self.assertAlmostEqual(
+            PostBudget.objects.get(account="default").tokens, 3, places=1
+        )
+
+    def test_rejected_post_fails_at_once_and_unblocks_the_queue(self):
+        self.server.fail(403)
+        self.approve(2)
+
+        self.assertEqual(post_scheduler.dispatch(), 0)
+        self.assertEqual(post_scheduler.dispatch(), 1)
+
+        first, second = ScheduledPost.objects.order_by("id")
+        self.assertEqual(first.status, ScheduledPost.FAILED)
+        self.assertEqual(first.attempts, 1)
+        self.assertEqual(second.status, ScheduledPost.SENT)
+
+    @override_settings(X_BEARER_TOKEN="")
+    def test_nothing_is_posted_without_a_token(self):
+        self.approve(1)
+
+        self.assertEqual(post_scheduler.dispatch(), 0)
+
+        self.assertEqual(self.server.stats["requests"], 0)
+        self.assertEqual(
+            ScheduledPost.objects.get().status, ScheduledPost.PENDING
+        )
+
+    @override_settings(SOCIAL_COALESCE_MODE="thread")
+    def test_thread_waits_until_it_can_pay_for_a_reply(self):
+        PostBudget.objects.create(
+            account="default", tokens=1.5, updated_at=timezone.now()
+        )
+        self.approve(2)
+        self.dispatch_jobs().delete()
+
+        self.assertEqual(post_scheduler.dispatch(), 0)
+
+        self.assertEqual(self.server.stats["requests"], 0)
+        job = self.dispatch_jobs().get()
+        self.assertGreater(
+            job.run_after, timezone.now() + timedelta(seconds=20)
+        )
+
+    def test_reserved_budget_is_not_spent_twice(self):
+        budget = post_scheduler.Budget.for_account("default")
+        self.approve(1)
+
+        # another dispatcher holds the whole budget while it publishes
+        self.assertEqual(
+            post_scheduler._reserve("default", budget, 3), (3, 0)
+        )
+        self.assertEqual(post_scheduler.dispatch(), 0)
+        self.assertEqual(self.server.stats["requests"], 0)
+
+        post_scheduler._refund("default", budget, 3)
+        self.assertEqual(post_scheduler.dispatch(), 1)
+
+    def test_queue_stats_endpoint(self):
+        self.approve(2)
+        staff = self.create_user("staff", "editor")
+        staff.is_staff = True
+        staff.save()
+        self.authenticate(staff)
+
+        response = self.client.get("/api/social/queue/")
+
+        self.assertEqual(response.status_code, 200)
+        stats = response.data["default"]
+        self.assertEqual(stats["pending"], 2)
+        self.assertEqual(stats["tokens"], 3)
+        self.assertEqual(stats["next_post_in_seconds"], 0)
+
+
+class PageCacheTests(BaseAPITestCase):
+    """
+    Testing the reader page cache
+    """
+    def setUp(self):
+        cache.clear()
+        self.journalist = self.create_user("journalist", "journalist")
+        self.article = Article.objects.create(
+            title="Cached", content="...", author=self.journalist,
+            approved=True,
+        )
+        self.detail = f"/articles/{self.article.pk}/"
+
+    def login(self, username):
+        self.create_user(username, "reader")
+        self.client.login(username=username, password="testpassword123")
+
+    def test_second_request_is_a_hit_with_per_user_navbar(self):
+        self.login("alice")
+        first = self.client.get(self.detail)
+        self.client.logout()
+        self.login("bob")
+        second = self.client.get(self.detail)
+
+        self.assertEqual(first["X-Page-Cache"], "MISS")
+        self.assertEqual(second["X-Page-Cache"], "HIT")
+        self.assertContains(second, "<strong>bob</strong>")
+        self.assertNotContains(second, "alice")
+        self.assertNotContains(second, page_cache.CSRF_PLACEHOLDER)
+        self.assertIn("private", second["Cache-Control"])
+        self.assertEqual(
+            page_cache.stats()["ReaderArticleDetailView"],
+            {"hits": 1, "misses": 1},
+        )
+
+    def test_csrf_token_from_a_cached_page_is_accepted(self):
+        self.login("alice")
+        self.client.get(self.detail)
+        client = Client(enforce_csrf_checks=True)
+        self.create_user("bob", "reader")
+        client.login(username="bob", password="testpassword123")
+
+        response = client.get(self.detail)
+        token = re.search(
+            rb'name="csrfmiddlewaretoken" value="([^"]+)"', response.content
+        ).group(1).decode()
+        subscribe = client.post(
+            f"/subscribe/journalist/{self.journalist.pk}/",
+            {"csrfmiddlewaretoken": token},
+        )
+
+        self.assertEqual(response["X-Page-Cache"], "HIT")
+        self.assertEqual(subscribe.status_code, 302)
+
+    def test_subscription_state_selects_the_page(self):
+        self.login("alice")
+        self.client.get(self.detail)
+        with self.captureOnCommitCallbacks(execute=True):
+            JournalistSubscription.objects.create(
+                reader=User.objects.get(username="alice"),
+                journalist=self.journalist,
+            )
+
+        response = self.client.get(self.detail)
+
+        self.assertEqual(response["X-Page-Cache"], "MISS")
+        self.assertContains(response, "You are subscribed")
+
+    def test_saving_an_article_invalidates_its_pages(self):
+        self.client.get(self.detail)
+        self.client.get("/articles/")
+
+        self.article.title = "Updated"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.article.save()
+
+        for url in (self.detail, "/articles/"):
+            response = self.client.get(url)
+            self.assertEqual(response["X-Page-Cache"], "MISS")
+            self.assertContains(response, "Updated")
+
+    def test_pages_are_invalidated_when_the_save_commits(self):
+        self.client.get(self.detail)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.article.title = "Updated"
+            self.article.save()
+            # a request racing the transaction must not re-cache old rows
+            # under a new version
+            response = self.client.get(self.detail)
+            self.assertEqual(response["X-Page-Cache"], "HIT")
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(self.client.get(self.detail)["X-Page-Cache"], "MISS")
+
+    def test_unrelated_draft_does_not_invalidate_the_list(self):
+        self.client.get("/articles/")
+        Article.objects.create(
+            title="Draft", content="...", author=self.journalist
+        )
+
+        response = self.client.get("/articles/")
+
+        self.assertEqual(response["X-Page-Cache"], "HIT")
+        self.assertIn("public", response["Cache-Control"])
+
+
+class ArticleCardCacheTests(BaseAPITestCase):
+    """
+    Testing the cached article cards
+    """
+    template = Template(
+        "{% load article_cards %}{% article_cards articles words=3 %}"
+    )
+
+    def setUp(self):
+        cache.clear()
+        self.journalist = self.create_user("journalist", "journalist")
+        self.articles = [
+            Article.objects.create(
+                title=f"Card {i}", content="one two three four five",
+                author=self.journalist, approved=True,
+            )
+            for i in range(3)
+        ]
+
+    def render(self):
+        return self.template.render(Context({"articles": self.articles}))
+
+    def test_cached_cards_are_fetched_in_one_round_trip(self):
+        first = self.render()
+        with patch.object(
+            cache, "get_many", wraps=cache.get_many
+        ) as get_many, patch(
+            "articles.templatetags.article_cards.render_to_string"
+        ) as render_to_string:
+            second = self.render()
+
+        self.assertEqual(first, second)
+        self.assertIn("one two three …", second)
+        self.assertEqual(get_many.call_count, 1)
+        render_to_string.assert_not_called()
+
+    def test_editing_an_article_renders_a_new_card(self):
+        self.render()
+        article = self.articles[0]
+        article.title = "Edited"
+        article.save()
+
+        with patch(
+            "articles.templatetags.article_cards.render_to_string",
+            wraps=render_to_string,
+        ) as rendered:
+            html = self.render()
+
+        self.assertIn("Edited", html)
+        self.assertEqual(rendered.call_count, 1)
+
+    def test_approval_changes_the_card_key(self):
+        article = Article.objects.create(
+            title="Pending", content="...", author=self.journalist
+        )
+        before = article_cards.card_key(article, {})
+
+        article.approved = True
+        article.save()
+
+        self.assertNotEqual(article_cards.card_key(article, {}), before)
+
+
+class ConditionalRequestTests(BaseAPITestCase):
+    '''
+    Test ETag, Last-Modified and If-Match handling in the article API.
+    '''
+    def setUp(self):
+        self.journalist = self.create_user('journalist', 'journalist')
+        self.article = Article.objects.create(
+            title='Polled', content='Polled content.',
+            author=self.journalist, approved=True,
+        )
+        self.url = f'/api/articles/{self.article.pk}/'
+        self.authenticate(self.journalist)
+
+    def test_unchanged_article_is_not_modified(self):
+        first = self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(
+                self.url, HTTP_IF_NONE_MATCH=first['ETag']
+            )
+        # the user for authentication and the version lookup
+        self.assertEqual(len(queries), 2)
+        by_date = self.client.get(
+            self.url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified']
+        )
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(by_date.status_code, 304)
+
+    def test_edit_changes_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.article.title = 'Edited'
+        self.article.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_is_revalidated_until_an_article_changes(self):
+        etag = self.client.get('/api/articles/')['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            unchanged = self.client.get(
+                '/api/articles/', HTTP_IF_NONE_MATCH=etag
+            )
+        # the user for authentication and the list version
+        self.assertEqual(len(queries), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            Article.objects.create(
+                title='Another', content='...', author=self.journalist,
+                approved=True,
+            )
+        changed = self.client.get('/api/articles/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(unchanged.status_code, 304)
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(len(changed.data['results']), 2)
+
+    def test_editing_a_draft_keeps_the_list_etag(self):
+        etag = self.client.get('/api/articles/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            draft = Article.objects.create(
+                title='Draft', content='...', author=self.journalist,
+            )
+            draft.title = 'Edited draft'
+            draft.save()
+
+        response = self.client.get('/api/articles/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_author_and_publisher_edits_change_the_list_etag(self):
+        publisher = Publisher.objects.create(name='Daily')
+        self.article.publisher = publisher
+        self.article.save()
+        etag = self.client.get('/api/articles/')['ETag']
+
+        # a login only writes last_login
+        self.journalist.save(update_fields=['last_login'])
+        self.assertEqual(self.client.get(
+            '/api/articles/', HTTP_IF_NONE_MATCH=etag
+        ).status_code, 304)
+
+        self.journalist.username = 'renamed'
+        self.journalist.save()
+        response = self.client.get('/api/articles/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        publisher.name = 'Weekly'
+        publisher.save()
+        response = self.client.get('/api/articles/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data['results'][0]['publisher']['name'], 'Weekly'
+        )
+
+    def test_list_etag_is_shared_by_every_process(self):
+        etag = self.client.get('/api/articles/')['ETag']
+
+        # another process has a cache of its own, but the same database
+        cache.clear()
+        self.assertEqual(self.client.get(
+            '/api/articles/', HTTP_IF_NONE_MATCH=etag
+        ).status_code, 304)
+
+        Article.objects.bulk_create([Article(
+            title='Imported', content='...', author=self.journalist,
+            approved=True,
+        )])
+        list_version.bump()
+        self.assertEqual(self.client.get(
+            '/api/articles/', HTTP_IF_NONE_MATCH=etag
+        ).status_code, 200)
+
+    def test_deleting_an_article_changes_the_list_etag(self):
+        etag = self.client.get('/api/articles/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.article.delete()
+
+        response = self.client.get('/api/articles/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
+
+    def test_update_requires_a_matching_if_match(self):
+        etag = self.client.get(self.url)['ETag']
+        Article.objects.filter(pk=self.article.pk).update(
+            updated_at=timezone.now()
+        )
+
+        stale = self.client.patch(
+            self.url, {'title': 'Lost'}, HTTP_IF_MATCH=etag
+        )
+        current = self.client.get(self.url)['ETag']
+        fresh = self.client.patch(
+            self.url, {'title': 'Kept'}, HTTP_IF_MATCH=current
+        )
+
+        self.assertEqual(stale.status_code, 412)
+        self.assertEqual(fresh.status_code, 200)
+        self.assertNotEqual(fresh['ETag'], current)
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.title, 'Kept')
+
+
+class ArticleDerivedFieldsTests(BaseAPITestCase):
+    '''
+    Test the excerpt, word count and reading time stored with articles.
+    '''
+    def setUp(self):
+        cache.clear()
+        self.journalist = self.create_user('journalist', 'journalist')
+        self.article = Article.objects.create(
+            title='Long read', content='word ' * 450,
+            author=self.journalist, approved=True,
+        )
+
+    def test_derived_fields_follow_the_content(self):
+        self.assertEqual(self.article.word_count, 450)
+        self.assertEqual(self.article.reading_time, 3)
+        self.assertEqual(self.article.excerpt, 'word ' * 40 + '…')
+
+        self.article.content = 'Short.'
+        self.article.save(update_fields=['content'])
+        self.article.refresh_from_db()
+
+        self.assertEqual(self.article.excerpt, 'Short.')
+        self.assertEqual(self.article.word_count, 1)
+        self.assertEqual(self.article.reading_time, 1)
+
+    def test_backfill_command(self):
+        Article.objects.update(excerpt='', word_count=0, reading_time=0)
+        out = StringIO()
+
+        call_command('backfill_article_fields', '--batch-size', '1',
+                     stdout=out)
+        self.article.refresh_from_db()
+
+        self.assertIn('Backfilled 1 articles.', out.getvalue())
+        self.assertEqual(self.article.word_count, 450)
+        self.assertEqual(self.article.reading_time, 3)
+
+    def test_lists_do_not_load_article_bodies(self):
+        self.client.login(username='journalist', password='testpassword123')
+        self.authenticate(self.journalist)
+        for url in ('/articles/', '/journalist/articles/', '/api/articles/'):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+                loaded = [
+                    query['sql'] for query in queries
+                    if '"articles_article"."content"' in query['sql']
+                ]
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(loaded, [], url)
+        # the excerpt stands in for the body
+        self.assertContains(response, 'word word')
+
+
+class ArticleExportTests(BaseAPITestCase):
+    '''
+    Test the streaming export of approved articles.
+    '''
+    def setUp(self):
+        self.journalist = self.create_user('journalist', 'journalist')
+        self.authenticate(self.journalist)
+        self.articles = [
+            Article.objects.create(
+                title=f'Export {number}', content=f'Body, "{number}"',
+                author=self.journalist, approved=True,
+            )
+            for number in range(5)
+        ]
+        Article.objects.create(
+            title='Draft', content='...', author=self.journalist
+        )
+
+    def read(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_jsonl_export_streams_every_approved_article(self):
+        # chunks smaller than the table exercise the keyset continuation
+        rows = list(export.approved_rows(chunk_size=2))
+        response = self.client.get('/api/articles/export/')
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [
+            json.loads(line) for line in self.read(response).splitlines()
+        ]
+        self.assertEqual(
+            [line['title'] for line in lines],
+            [f'Export {number}' for number in range(5)],
+        )
+        self.assertEqual([row['id'] for row in rows],
+                         [line['id'] for line in lines])
+        self.assertEqual(lines[0]['author_username'], 'journalist')
+
+    def test_csv_export_since_and_gzip(self):
+        since = timezone.now()
+        self.articles[1].title = 'Changed'
+        self.articles[1].save()
+
+        response = self.client.get('/api/articles/export/', {
+            'format': 'csv', 'since': since.isoformat(), 'gzip': '1',
+        })
+        rows = list(csv.DictReader(StringIO(
+            gzip.decompress(self.read(response)).decode()
+        )))
+
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertEqual([row['title'] for row in rows], ['Changed'])
+        self.assertEqual(rows[0]['content'], 'Body, "1"')
+
+    def test_invalid_parameters_are_rejected(self):
+        self.assertEqual(self.client.get(
+            '/api/articles/export/', {'format': 'xml'}
+        ).status_code, 400)
+        self.assertEqual(self.client.get(
+            '/api/articles/export/', {'since': 'yesterday'}
+        ).status_code, 400)
+
+    def test_export_command_writes_a_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'articles.jsonl')
+            call_command('export_articles', '--output', path,
+                         '--chunk-size', '2', stderr=StringIO())
+            with open(path) as output:
+                lines = output.read().splitlines()
+
+        self.assertEqual(len(lines), 5)
+
+
+class ArticleImportTests(BaseAPITestCase):
+    '''
+    Test the bulk article import command.
+    '''
+    def setUp(self):
+        self.journalist = self.create_user('journalist', 'journalist')
+        self.reader = self.create_user('reader', 'reader')
+        self.publisher = Publisher.objects.create(name='Daily')
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, 'archive.jsonl')
+        records = [
+            {'title': 'Archived 1', 'content': 'Old news one.',
+             'author_username': 'journalist',
+             'created_at': '2020-01-02T03:04:05+00:00'},
+            {'title': 'Archived 2', 'content': 'Old news two.',
+             'author_id': self.journalist.pk, 'approved': False},
+            {'title': 'By a reader', 'content': '...',
+             'author_username': 'reader'},
+            {'title': 'Not a member', 'content': '...',
+             'author_username': 'journalist', 'publisher_name': 'Daily'},
+            {'title': 'Archived 3', 'content': 'Old news three.',
+             'author_username': 'journalist'},
+        ]
+        with open(self.path, 'w') as archive:
+            for record in records:
+                archive.write(json.dumps(record) + '\n')
+
+    def run_import(self, *args):
+        out, err = StringIO(), StringIO()
+        call_command('import_articles', self.path, '--approved',
+                     '--batch-size', '2', *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_valid_records_are_imported_without_side_effects(self):
+        out, err = self.run_import()
+
+        self.assertIn('Imported 3 articles from 5 records (2 rejected)', out)
+        self.assertIn('rows/s', out)
+        self.assertIn('Record 3: unknown author', err)
+        self.assertIn('Record 4: author is not a member', err)
+        archived = Article.objects.get(title='Archived 1')
+        self.assertTrue(archived.approved)
+        self.assertEqual(archived.created_at.year, 2020)
+        self.assertEqual(archived.word_count, 3)
+        self.assertFalse(Article.objects.get(title='Archived 2').approved)
+        self.assertFalse(Job.objects.exists())
+        self.assertEqual(mail.outbox, [])
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    def test_import_resumes_from_the_checkpoint(self):
+        ImportCheckpoint.objects.create(
+            name=os.path.abspath(self.path),
+            records=4, imported=2, rejected=2,
+        )
+
+        out, _ = self.run_import()
+
+        self.assertIn('Resuming after record 4.', out)
+        self.assertEqual(
+            list(Article.objects.values_list('title', flat=True)),
+            ['Archived 3'],
+        )
+
+    def test_checkpoint_commits_with_its_batch(self):
+        save_checkpoint = ImportCheckpoint.objects.update_or_create
+        saved = []
+
+        def crash_on_third_batch(**kwargs):
+            if len(saved) == 2:
+                raise RuntimeError('killed')
+            saved.append(kwargs)
+            return save_checkpoint(**kwargs)
+
+        with patch.object(
+            ImportCheckpoint.objects, 'update_or_create',
+            side_effect=crash_on_third_batch,
+        ):
+            with self.assertRaises(RuntimeError):
+                self.run_import()
+        self.assertFalse(Article.objects.filter(title='Archived 3').exists())
+
+        out, _ = self.run_import()
+
+        self.assertIn('Resuming after record 4.', out)
+        self.assertEqual(
+            sorted(Article.objects.values_list('title', flat=True)),
+            ['Archived 1', 'Archived 2', 'Archived 3'],
+        )
+
+    def test_reindex_makes_imported_articles_searchable(self):
+        self.run_import('--reindex')
+
+        self.assertCountEqual(
+            [article.title for article in search.search_articles('news')],
+            ['Archived 1', 'Archived 3'],
+        )
+
+
+class SeedScaleTests(TestCase):
+    '''
+    Test the synthetic dataset generator.
+    '''
+    def seed(self, *args):
+        call_command(
+            'seed_scale', '--readers', '30', '--journalists', '6',
+            '--editors', '2', '--publishers', '3', '--articles', '80',
+            '--newsletters', '4', '--newsletter-articles', '5',
+            '--batch-size', '25', '--password', 'secret', *args,
+            stdout=StringIO(),
+        )
+
+    def snapshot(self):
+        return (
+            list(Article.objects.order_by('pk').values_list(
+                'title', 'author__username', 'publisher__name', 'approved',
+                'word_count', 'created_at',
+            )),
+            list(JournalistSubscription.objects.order_by(
+                'reader__username', 'journalist__username'
+            ).values_list('reader__username', 'journalist__username')),
+            list(Newsletter.objects.order_by('pk').values_list(
+                'title', 'author__username', 'articles__title'
+            )),
+        )
+
+    def test_seeds_users_content_and_subscriptions(self):
+        self.seed()
+
+        self.assertEqual(User.objects.filter(role='reader').count(), 30)
+        self.assertEqual(User.objects.filter(role='journalist').count(), 6)
+        self.assertEqual(User.objects.filter(role='editor').count(), 2)
+        self.assertEqual(Publisher.objects.count(), 3)
+        self.assertEqual(Newsletter.objects.count(), 4)
+        self.assertEqual(Article.objects.count(), 80)
+        self.assertTrue(JournalistSubscription.objects.exists())
+        reader = User.objects.get(username='seed-reader-0')
+        self.assertTrue(reader.check_password('secret'))
+
+        article = Article.objects.order_by('created_at').first()
+        self.assertLess(article.created_at, timezone.now() - timedelta(days=1))
+        self.assertEqual(article.updated_at, article.created_at)
+        self.assertEqual(
+            article.word_count, len(article.content.split())
+        )
+        # generated timestamps must not leak into normal saves
+        self.assertEqual(
+            Article._meta.get_field('created_at').auto_now_add, True
+        )
+        # authors are members of the publisher they write for
+        for author_id, publisher_id in Article.objects.exclude(
+            publisher=None
+        ).values_list('author_id', 'publisher_id'):
+            self.assertTrue(Publisher.objects.filter(
+                pk=publisher_id, journalists=author_id
+            ).exists())
+
+    def test_same_seed_gives_the_same_data(self):
+        self.seed()
+        first = self.snapshot()
+
+        # on another day, too
+        later = timezone.now() + timedelta(days=3, hours=5)
+        with patch.object(timezone, 'now', return_value=later):
+            self.seed('--clear')
+
+        self.assertEqual(self.snapshot(), first)
+
+    def test_history_ends_at_now(self):
+        self.seed('--now', '2024-06-01')
+
+        newest = Article.objects.order_by('-created_at').first().created_at
+        self.assertLessEqual(newest.isoformat(), '2024-06-01T00:00:00+00:00')
+        with self.assertRaises(CommandError):
+            self.seed('--clear', '--now', 'June')
+        self.assertEqual(Article.objects.count(), 80)
+
+    def test_refuses_to_seed_twice_without_clear(self):
+        self.seed()
+
+        with self.assertRaises(CommandError):
+            self.seed()
+
+
+class BenchTests(TestCase):
+    '''
+    Test the hot path benchmarks and the baseline comparison.
+    '''
+    def test_measures_time_queries_and_allocations(self):
+        author = User.objects.create_user(
+            username='bench-author', password='password', role='journalist'
+        )
+
+        def run():
+            Article.objects.create(
+                title='Bench', content='Bench.', author=author
+            )
+
+        def count():
+            list(Article.objects.all())
+            list(User.objects.all())
+
+        result = bench.measure(bench.Case(run), repeat=3, warmup=1)
+        self.assertEqual(
+            bench.measure(bench.Case(count), repeat=1)['queries'], 2
+        )
+        self.assertGreater(result['peak_kb'], 0)
+        self.assertLessEqual(result['min_ms'], result['median_ms'])
+        # every run is rolled back
+        self.assertFalse(Article.objects.exists())
+
+    def test_benchmarks_run_on_the_seeded_dataset(self):
+        data = bench.seed(subscribers=20)
+
+        with self.settings(SERVER_TIMING_SAMPLE_RATE=0):
+            for name in bench.names():
+                with self.subTest(name):
+                    case = bench._registry[name](data)
+                    result = bench.measure(case, repeat=1, warmup=0)
+                    self.assertGreater(result['queries'], 0)
+
+        # the fan-out mailed its subscribers, then was rolled back
+        self.assertEqual(
+            sum(len(message.bcc) for message in mail.outbox), 20
+        )
+        data.fan_out_article.refresh_from_db()
+        self.assertFalse(data.fan_out_article.approved)
+
+    def test_compare_flags_regressions(self):
+        baseline = {'results': {
+            'feed_query': {'min_ms': 10, 'queries': 2, 'peak_kb': 100},
+            'jwt_api': {'min_ms': 10, 'queries': 6, 'peak_kb': 100},
+        }}
+        report = {'results': {
+            'feed_query': {'min_ms': 11.5, 'queries': 2, 'peak_kb': 130},
+            'jwt_api': {'min_ms': 13, 'queries': 7, 'peak_kb': 100},
+            'form_init': {'min_ms': 50, 'queries': 3, 'peak_kb': 100},
+        }}
+
+        regressions = bench.compare(report, baseline, time_threshold=0.2)
+
+        self.assertEqual(len(regressions), 3)
+        self.assertTrue(regressions[0].startswith('feed_query: peak_kb'))
+        self.assertTrue(regressions[1].startswith('jwt_api: min_ms'))
+        self.assertEqual(regressions[2], 'jwt_api: queries 6 -> 7')
+        self.assertEqual(bench.compare(report, report), [])
+
+    def test_unreadable_baseline_is_an_error(self):
+        with self.assertRaises(CommandError):
+            call_command(
+                'bench', '--baseline', '/nonexistent/baseline.json',
+                stdout=StringIO(),
+            )
+
+
+class LoadTestTests(TransactionTestCase):
+    '''
+    Test the load test harness in-process. The journeys run in worker
+    threads, which only see committed data.
+    '''
+    def setUp(self):
+        for role in ('reader', 'journalist', 'editor'):
+            User.objects.create_user(
+                username=f'load-{role}', password='secret', role=role
+            )
+        journalist = User.objects.get(username='load-journalist')
+        Article.objects.create(
+            title='Published', content='Approved news.', author=journalist,
+            approved=True,
+        )
+        self.pending = Article.objects.create(
+            title='Pending', content='Pending news.', author=journalist,
+        )
+
+    def test_journeys_report_latency_per_endpoint(self):
+        fixtures = loadtest.Fixtures.load('secret', prefix='load-')
+        mix = dict.fromkeys(loadtest.JOURNEYS, 1)
+
+        report = loadtest.run(
+            fixtures, mix=mix, concurrency=1, iterations=8, seed=3
+        )
+
+        self.assertEqual(report['total']['errors'], 0)
+        self.assertEqual(
+            sum(journey['failed'] for journey in report['journeys'].values()),
+            0,
+        )
+        self.assertEqual(
+            sum(
+                journey['completed']
+                for journey in report['journeys'].values()
+            ),
+            8,
+        )
+        login = report['endpoints']['POST /login/']
+        self.assertLessEqual(login['p50_ms'], login['p99_ms'])
+        self.assertEqual(report['target'], 'in-process')
+        json.dumps(report)
+
+    def test_editor_journey_approves_a_pending_article(self):
+        fixtures = loadtest.Fixtures.load('secret', prefix='load-')
+
+        loadtest.run(fixtures, mix={'editor': 1}, concurrency=1,
+                     iterations=1)
+
+        self.pending.refresh_from_db()
+        self.assertTrue(self.pending.approved)
+
+    def test_failed_logins_fail_the_journey(self):
+        fixtures = loadtest.Fixtures.load('wrong', prefix='load-')
+
+        report = loadtest.run(fixtures, mix={'reader': 1}, concurrency=1,
+                              iterations=2)
+
+        self.assertEqual(report['journeys']['reader']['failed'], 2)
+
+    def test_missing_users_are_reported(self):
+        fixtures = loadtest.Fixtures.load('secret', prefix='nobody-')
+
+        with self.assertRaises(loadtest.LoadTestError):
+            loadtest.run(fixtures, mix={'journalist': 1})
+
+    def test_percentiles_use_the_nearest_rank(self):
+        values = list(range(1, 101))
+
+        self.assertEqual(stats.percentile(values, 50), 50)
+        self.assertEqual(stats.percentile(values, 99), 99)
+        self.assertEqual(stats.percentile([7], 95), 7)
+        self.assertIsNone(stats.percentile([], 50))
+
+
+class BulkReviewTests(BaseAPITestCase):
+    '''
+    Test bulk approval and rejection by editors.
+    '''
+    def setUp(self):
+        self.editor = self.create_user('editor', 'editor')
+        self.journalist = self.create_user('journalist', 'journalist')
+        own = Publisher.objects.create(name='Own')
+        own.editors.add(self.editor)
+        own.journalists.add(self.journalist)
+        other = Publisher.objects.create(name='Other')
+        self.articles = [
+            Article.objects.create(
+                title=title, content='...', author=self.journalist,
+                publisher=publisher,
+            )
+            for title, publisher in (
+                ('Own', own), ('Independent', None), ('Other', other),
+            )
+        ]
+        self.ids = [article.pk for article in self.articles]
+
+        follower = User.objects.create_user(
+            username='follower', email='follower@example.com',
+            password='pass', role='reader',
+        )
+        JournalistSubscription.objects.create(
+            reader=follower, journalist=self.journalist
+        )
+        newsletter_reader = User.objects.create_user(
+            username='newsletter', email='newsletter@example.com',
+            password='pass', role='reader',
+        )
+        newsletter = Newsletter.objects.create(
+            title='Weekly', description='...', author=self.journalist
+        )
+        newsletter.articles.add(self.articles[0])
+        NewsletterSubscription.objects.create(
+            reader=newsletter_reader, newsletter=newsletter
+        )
+        self.authenticate(self.editor)
+
+    def review(self, action, ids=None):
+        return self.client.post('/api/articles/review/', {
+            'action': action, 'articles': ids or self.ids,
+        }, format='json')
+
+    def test_bulk_approval_is_one_update_and_one_email_per_reader(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.review('approve')
+            updates = [
+                query for query in queries
+                if query['sql'].startswith('UPDATE "articles_article"')
+            ]
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['changed'], self.ids[:2])
+        self.assertEqual(len(updates), 1)
+        self.assertFalse(Article.objects.get(pk=self.ids[2]).approved)
+        self.assertEqual(Job.objects.filter(
+            name='articles.tasks.notify_subscribers_of_articles'
+        ).count(), 1)
+        self.assertEqual(ScheduledPost.objects.count(), 2)
+
+        queue.drain()
+
+        messages = {tuple(message.bcc): message for message in mail.outbox}
+        self.assertEqual(len(mail.outbox), 2)
+        combined = messages[('follower@example.com',)]
+        self.assertEqual(combined.subject, '2 New Articles Published')
+        self.assertIn('Independent', combined.body)
+        self.assertEqual(
+            messages[('newsletter@example.com',)].subject,
+            'New Article Published: Own',
+        )
+        self.assertEqual(
+            FeedItem.objects.filter(reader__username='follower').count(), 2
+        )
+        self.assertEqual(
+            [article.pk for article in search.search_articles('Own')],
+            [self.ids[0]],
+        )
+
+    def test_repeated_approval_changes_nothing(self):
+        self.review('approve')
+
+        response = self.review('approve')
+
+        self.assertEqual(response.data['changed'], [])
+        self.assertEqual(Job.objects.filter(
+            name='articles.tasks.notify_subscribers_of_articles'
+        ).count(), 1)
+
+    def test_bulk_rejection_unpublishes(self):
+        self.review('approve')
+        queue.drain()
+
+        response = self.review('reject', self.ids[:1])
+
+        self.assertEqual(response.data['changed'], self.ids[:1])
+        self.assertFalse(Article.objects.get(pk=self.ids[0]).approved)
+        self.assertFalse(
+            FeedItem.objects.filter(article_id=self.ids[0]).exists()
+        )
+        self.assertEqual(search.search_articles('Own'), [])
+
+    def test_cached_pages_are_dropped_when_the_review_commits(self):
+        list_version = page_cache.versions(page_cache.LIST_VERSION)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    editorial.bulk_review(self.editor, self.ids, 'approve')
+                    raise OperationalError('rolled back')
+            except OperationalError:
+                pass
+        self.assertEqual(
+            page_cache.versions(page_cache.LIST_VERSION), list_version
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.review('approve')
+        self.assertNotEqual(
+            page_cache.versions(page_cache.LIST_VERSION), list_version
+        )
+
+    def test_non_editors_cannot_bulk_review(self):
+        self.authenticate(self.journalist)
+
+        self.assertEqual(self.review('approve').status_code, 403)
+
+    def test_editor_list_form(self):
+        self.client.login(username='editor', password='testpassword123')
+
+        response = self.client.post('/editor/articles/review/', {
+            'action': 'approve', 'articles': self.ids,
+        }, follow=True)
+
+        self.assertContains(response, 'Approved 2 articles.')
+        self.assertEqual(
+            Article.objects.filter(approved=True).count(), 2
+        )
+
+
+class ArticleFastSerializerTests(BaseAPITestCase):
+    '''
+    Test that the values() fast path matches ArticleListSerializer.
+    '''
+    def setUp(self):
+        self.journalist = self.create_user('journalist', 'journalist')
+        publisher = Publisher.objects.create(
+            name='Daily', description='Daily news.'
+        )
+        for number in range(6):
+            Article.objects.create(
+                title=f'Article {number}', content='Body ' * number,
+                author=self.journalist, approved=True,
+                publisher=publisher if number % 2 else None,
+            )
+
+    def test_fast_path_matches_the_serializer(self):
+        articles = Article.objects.filter(approved=True)
+
+        expected = ArticleListSerializer(articles, many=True).data
+
+        self.assertEqual(
+            serialize_article_rows(article_values(articles)), expected
+        )
+
+    def test_api_list_uses_one_query_for_the_page(self):
+        self.authenticate(self.journalist)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/articles/')
+            # the user, the list version for the ETag and the page itself,
+            # with no per-row author or publisher lookups
+            self.assertEqual(len(queries), 3)
+
+        self.assertEqual(
+            response.json()['results'],
+            ArticleListSerializer(
+                Article.objects.filter(approved=True), many=True
+            ).data,
+        )
 
 
 class ArticleAccessTests(BaseAPITestCase):
@@ -175,7 +1691,638 @@ class SubscribedArticleTests(BaseAPITestCase):
 
     def test_reader_gets_only_subscribed_articles(self):
         response = self.client.get("/api/articles/subscribed/")
-        titles = [a["title"] for a in response.data]
+        titles = [a["title"] for a in response.data["results"]]
 
         self.assertIn("A1", titles)
         self.assertNotIn("A2", titles)
+
+
+@override_settings(SERVER_TIMING_SAMPLE_RATE=1, SERVER_TIMING_HEADER=True)
+class ServerTimingTests(BaseAPITestCase):
+    '''
+    Test the per-request Server-Timing instrumentation.
+    '''
+    def setUp(self):
+        self.journalist = self.create_user('journalist', 'journalist')
+        self.editor = self.create_user('editor', 'editor')
+        self.article = Article.objects.create(
+            title='Timed', content='Timed news.', author=self.journalist,
+            approved=True,
+        )
+
+    def metrics(self, response):
+        return {
+            part.split(';')[0]: part
+            for part in response['Server-Timing'].split(', ')
+        }
+
+    def test_page_reports_sql_templates_and_total(self):
+        self.client.force_login(self.journalist)
+
+        with self.assertLogs('news.timing', 'INFO') as logs:
+            response = self.client.get('/articles/')
+
+        metrics = self.metrics(response)
+        self.assertIn('sql', metrics)
+        self.assertIn('template', metrics)
+        self.assertIn('total', metrics)
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(line['path'], '/articles/')
+        self.assertEqual(line['status'], 200)
+        self.assertGreater(line['sql_count'], 0)
+        self.assertGreater(line['template_count'], 0)
+
+    def test_nested_measurements_count_once(self):
+        timings = timing.RequestTimings()
+        token = timing._current.set(timings)
+        try:
+            with timing.measure(timing.TEMPLATE):
+                with timing.measure(timing.TEMPLATE):
+                    pass
+            with timing.measure(timing.TEMPLATE):
+                pass
+        finally:
+            timing._current.reset(token)
+
+        self.assertEqual(timings.counts[timing.TEMPLATE], 2)
+
+    def test_signal_receivers_are_timed(self):
+        self.client.force_login(self.editor)
+        draft = Article.objects.create(
+            title='Draft', content='Draft news.', author=self.journalist
+        )
+
+        with self.assertLogs('news.timing', 'INFO') as logs:
+            self.client.post(
+                f'/editor/articles/{draft.pk}/review/',
+                {'title': 'Draft', 'content': 'Draft news.',
+                 'approved': 'on'},
+            )
+
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(line['status'], 302)
+        self.assertGreaterEqual(line['signals_count'], 4)
+
+    def test_unsampled_requests_are_not_measured(self):
+        self.client.force_login(self.journalist)
+
+        with override_settings(SERVER_TIMING_SAMPLE_RATE=0):
+            response = self.client.get('/articles/')
+
+        self.assertNotIn('Server-Timing', response)
+
+    def test_header_can_be_left_out(self):
+        self.client.force_login(self.journalist)
+
+        with override_settings(SERVER_TIMING_HEADER=False), \
+                self.assertLogs('news.timing', 'INFO'):
+            response = self.client.get('/articles/')
+
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(X_BEARER_TOKEN='token')
+    def test_scheduled_x_posts_are_timed(self):
+        server = XStubServer().start()
+        self.addCleanup(server.stop)
+        client = x_publisher.XClient(
+            base_url=server.base_url, token='token', max_retries=0,
+        )
+        self.addCleanup(client.close)
+        draft = Article.objects.create(
+            title='Draft', content='Draft news.', author=self.journalist,
+        )
+        draft.approved = True
+        draft.save()
+
+        timings = timing.RequestTimings()
+        token = timing._current.set(timings)
+        try:
+            with patch.object(x_publisher, 'get_client', return_value=client):
+                published = post_scheduler.dispatch()
+        finally:
+            timing._current.reset(token)
+
+        self.assertEqual(published, 1)
+        self.assertEqual(server.stats['posts'], 1)
+        self.assertEqual(timings.counts[timing.X], 1)
+
+
+class MetricsTests(BaseAPITestCase):
+    '''
+    Test the runtime metrics and the /metrics endpoint.
+    '''
+    def setUp(self):
+        metrics.registry.reset()
+        self.addCleanup(metrics.registry.reset)
+        cache.clear()
+        self.journalist = self.create_user('journalist', 'journalist')
+        self.reader = self.create_user('reader', 'reader')
+        self.article = Article.objects.create(
+            title='Measured', content='Measured news.',
+            author=self.journalist, approved=True,
+        )
+
+    def scrape(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        return response.content.decode()
+
+    def test_requests_are_recorded_by_view(self):
+        self.client.force_login(self.reader)
+        self.client.get('/articles/')
+
+        text = self.scrape()
+
+        self.assertIn(
+            'news_http_request_duration_seconds_count{view="approved-articles"'
+            ',method="GET",status="2xx"} 1',
+            text,
+        )
+        self.assertIn(
+            'news_http_request_duration_seconds_bucket'
+            '{view="approved-articles",method="GET",status="2xx",le="+Inf"}'
+            ' 1',
+            text,
+        )
+        self.assertRegex(
+            text, r'news_db_queries_total\{view="approved-articles"\} [1-9]'
+        )
+
+    def test_cache_hits_and_misses_are_counted(self):
+        self.client.force_login(self.reader)
+        self.client.get('/articles/')
+        self.client.get('/articles/')
+
+        text = self.scrape()
+
+        self.assertIn(
+            'news_cache_requests_total{cache="page",result="hit"} 1', text
+        )
+        self.assertIn(
+            'news_cache_requests_total{cache="page",result="miss"} 1', text
+        )
+        self.assertIn(
+            'news_cache_requests_total{cache="article_card",result="miss"} 1',
+            text,
+        )
+
+    def test_notifications_record_recipients_and_mail(self):
+        JournalistSubscription.objects.create(
+            reader=self.reader, journalist=self.journalist
+        )
+        self.reader.email = 'reader@example.com'
+        self.reader.save()
+
+        tasks.notify_subscribers(self.article.pk)
+
+        text = self.scrape()
+        self.assertIn(
+            'news_notification_recipients_bucket'
+            '{task="notify_subscribers",le="1"} 1',
+            text,
+        )
+        self.assertIn('news_send_mail_duration_seconds_count 1', text)
+        self.assertNotIn('news_send_mail_failures_total 1', text)
+
+    def test_failed_mail_is_counted(self):
+        with patch.object(
+            email_delivery, '_send_once', side_effect=OSError('down')
+        ), self.assertLogs('news.email', 'ERROR'):
+            email_delivery.deliver('Subject', 'Body', ['a@example.com'])
+
+        self.assertIn('news_send_mail_failures_total 1', self.scrape())
+
+    def test_only_allowed_addresses_can_scrape(self):
+        with self.assertLogs('django.request', 'WARNING'):
+            response = self.client.get('/metrics', REMOTE_ADDR='10.0.0.1')
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_processes_are_added_up_through_the_directory(self):
+        metrics.CACHE_REQUESTS.inc(cache='page', result='hit')
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(METRICS_DIR=directory):
+            metrics.registry.flush()
+            # another process with the same totals
+            own = os.path.join(directory, metrics.registry.filename)
+            with open(own) as source, \
+                    open(os.path.join(directory, 'other.json'), 'w') as other:
+                other.write(source.read())
+
+            text = metrics.registry.render()
+
+        self.assertIn(
+            'news_cache_requests_total{cache="page",result="hit"} 2', text
+        )
+
+    def test_histogram_buckets_are_cumulative(self):
+        for value in (0, 3, 7, 1000):
+            metrics.DB_QUERIES_PER_REQUEST.observe(value, view='v')
+
+        text = metrics.registry.render()
+
+        self.assertIn('news_db_queries_per_request_bucket{view="v",le="0"} 1',
+                      text)
+        self.assertIn('news_db_queries_per_request_bucket{view="v",le="5"} 2',
+                      text)
+        self.assertIn(
+            'news_db_queries_per_request_bucket{view="v",le="10"} 3', text
+        )
+        self.assertIn(
+            'news_db_queries_per_request_bucket{view="v",le="+Inf"} 4', text
+        )
+        self.assertIn('news_db_queries_per_request_sum{view="v"} 1010', text)
+        self.assertIn('news_db_queries_per_request_count{view="v"} 4', text)
+
+
+class ProfilingTests(BaseAPITestCase):
+    '''
+    Test on-demand request profiling and the profiles command.
+    '''
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings = override_settings(
+            PROFILE_DIR=self.directory,
+            PROFILE_RATE_LIMIT=(5, 3600),
+            PROFILE_SAMPLE_INTERVAL=0.001,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.staff = self.create_user('staff', 'editor')
+        self.staff.is_staff = True
+        self.staff.save()
+        self.reader = self.create_user('reader', 'reader')
+
+    def files(self):
+        return sorted(os.listdir(self.directory))
+
+    def profiles(self, *args):
+        out = StringIO()
+        call_command('profiles', *args, stdout=out)
+        return out.getvalue()
+
+    def test_staff_can_capture_a_cprofile(self):
+        self.client.force_login(self.staff)
+
+        response = self.client.get(
+            '/editor/articles/', headers={'X-Profile': 'cprofile'}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        name = response['X-Profile']
+        self.assertEqual(self.files(), [name + '.json', name + '.prof'])
+        listing = self.profiles()
+        self.assertIn('GET /editor/articles/', listing)
+        self.assertIn(name, listing)
+        summary = self.profiles(name[:20], '--limit', '5')
+        self.assertIn('(editor-articles)', summary)
+        self.assertIn('function calls', summary)
+
+    def test_sampling_writes_collapsed_stacks(self):
+        self.client.force_login(self.staff)
+
+        response = self.client.get('/editor/articles/?_profile=sample')
+
+        name = response['X-Profile']
+        self.assertEqual(self.files(), [name + '.folded', name + '.json'])
+        self.assertIn('samples', self.profiles(name))
+
+    def test_only_staff_are_profiled(self):
+        self.client.force_login(self.reader)
+
+        response = self.client.get(
+            '/articles/', headers={'X-Profile': 'cprofile'}
+        )
+
+        self.assertNotIn('X-Profile', response)
+        self.assertEqual(self.files(), [])
+
+    def test_captures_are_rate_limited(self):
+        self.client.force_login(self.staff)
+
+        with override_settings(PROFILE_RATE_LIMIT=(1, 3600)):
+            first = self.client.get('/articles/?_profile=1')
+            second = self.client.get('/articles/?_profile=1')
+
+        self.assertNotEqual(first['X-Profile'], 'rate-limited')
+        self.assertEqual(second['X-Profile'], 'rate-limited')
+        self.assertEqual(len(self.files()), 2)
+
+    def test_captures_can_be_deleted(self):
+        self.client.force_login(self.staff)
+        self.client.get('/articles/?_profile=cprofile')
+
+        self.assertIn(
+            'Deleted 1 captures.', self.profiles('--delete', '--all')
+        )
+        self.assertEqual(self.files(), [])
+
+    def test_folded_summary_counts_own_and_total_samples(self):
+        path = os.path.join(self.directory, 'stacks.folded')
+        with open(path, 'w') as target:
+            target.write('main;view;query 6\nmain;view;render 3\nmain 1\n')
+
+        summary = profiling.summarize_folded(path, limit=3)
+
+        self.assertEqual(summary, [
+            (6, 6, 'query'), (3, 3, 'render'), (1, 10, 'main'),
+        ])
+
+
+class SlowQueryLogTests(BaseAPITestCase):
+    '''
+    Test the slow query log and its report.
+    '''
+    def setUp(self):
+        cache.clear()
+        self.editor = self.create_user('editor', 'editor')
+        self.journalist = self.create_user('journalist', 'journalist')
+        Article.objects.create(
+            title='Draft', content='Draft news.', author=self.journalist
+        )
+
+    def entries(self, logs):
+        return [json.loads(record.getMessage()) for record in logs.records]
+
+    def test_slow_queries_are_logged_with_view_and_plan(self):
+        self.client.force_login(self.editor)
+
+        with override_settings(SLOW_QUERY_MS=0), \
+                self.assertLogs('news.slow_queries', 'INFO') as logs:
+            self.client.get('/editor/articles/')
+
+        entries = [
+            entry for entry in self.entries(logs)
+            if entry['view'] == 'editor-articles'
+            and 'articles_article' in entry['sql']
+        ]
+        self.assertTrue(entries)
+        entry = entries[0]
+        self.assertEqual(len(entry['fingerprint']), 12)
+        self.assertGreaterEqual(entry['duration_ms'], 0)
+        self.assertIsInstance(entry['params'], list)
+        self.assertTrue(entry['plan'])
+        self.assertNotIn('EXPLAIN', ' '.join(
+            other['sql'] for other in self.entries(logs)
+        ))
+
+    def test_parameters_of_writes_are_not_logged(self):
+        with override_settings(SLOW_QUERY_MS=0), \
+                self.assertLogs('news.slow_queries', 'INFO') as logs:
+            self.client.post('/login/', {
+                'username': 'editor', 'password': 'testpassword123',
+            })
+
+        writes = [
+            entry for entry in self.entries(logs)
+            if not slow_queries.is_select(entry['sql'])
+        ]
+        self.assertTrue(writes)
+        for entry in writes:
+            self.assertIsNone(entry['params'])
+
+    def test_fast_queries_are_not_logged(self):
+        self.client.force_login(self.editor)
+
+        with override_settings(SLOW_QUERY_MS=10 ** 6), \
+                patch.object(slow_queries, 'log_slow_query') as log:
+            self.client.get('/editor/articles/')
+
+        log.assert_not_called()
+
+    def test_fingerprints_ignore_values(self):
+        self.assertEqual(
+            slow_queries.fingerprint(
+                "SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'x''y'"
+            ),
+            slow_queries.fingerprint(
+                'SELECT * FROM t  WHERE id IN (%s, %s) AND name = %s'
+            ),
+        )
+        self.assertEqual(
+            slow_queries.fingerprint('SELECT * FROM t1 LIMIT 21'),
+            'SELECT * FROM t1 LIMIT ?',
+        )
+
+    def test_report_ranks_fingerprints_by_total_time(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'slow.log')
+        now = timezone.now().isoformat()
+
+        def entry(fingerprint, duration, view, full_scan=False):
+            return json.dumps({
+                'time': now, 'view': view, 'fingerprint': fingerprint,
+                'normalized': f'SELECT {fingerprint}', 'sql': 'SELECT 1',
+                'params': [], 'many': False, 'duration_ms': duration,
+                'plan': ['SCAN t'] if full_scan else ['SEARCH t'],
+                'full_scan': full_scan,
+            })
+
+        with open(path, 'w') as log:
+            log.write('\n'.join([
+                entry('aaa', 150, 'editor-articles', full_scan=True),
+                entry('aaa', 250, 'editor-articles', full_scan=True),
+                entry('bbb', 300, 'approved-articles'),
+                entry('ccc', 120, 'approved-articles'),
+                'not json',
+            ]) + '\n')
+
+        out = StringIO()
+        call_command('slow_queries', '--file', path, '--json', '--limit',
+                     '2', stdout=out)
+        report = json.loads(out.getvalue())
+
+        self.assertEqual([row['fingerprint'] for row in report],
+                         ['aaa', 'bbb'])
+        self.assertEqual(report[0]['count'], 2)
+        self.assertEqual(report[0]['total_ms'], 400)
+        self.assertEqual(report[0]['max_ms'], 250)
+        self.assertTrue(report[0]['full_scan'])
+        self.assertEqual(report[0]['views'], {'editor-articles': 2})
+
+        out = StringIO()
+        call_command('slow_queries', '--file', path, '--view',
+                     'approved-articles', '--plans', stdout=out)
+        self.assertIn('bbb', out.getvalue())
+        self.assertNotIn('aaa', out.getvalue())
+        self.assertIn('plan: SEARCH t', out.getvalue())
+
+
+class ArticlePaginationTests(BaseAPITestCase):
+    """Tests for the keyset pagination of article lists"""
+
+    def setUp(self):
+        self.reader = self.create_user("reader", "reader")
+        self.journalist = self.create_user("journalist", "journalist")
+        Article.objects.bulk_create([
+            Article(
+                title=f"Article {i}",
+                content="...",
+                author=self.journalist,
+                approved=True,
+            )
+            for i in range(25)
+        ])
+        # identical timestamps force the id tie-breaker to be used
+        Article.objects.update(created_at=timezone.now())
+
+    def test_api_pages_follow_next_and_previous_links(self):
+        self.authenticate(self.reader)
+
+        first = self.client.get("/api/articles/")
+        self.assertEqual(len(first.data["results"]), 20)
+        self.assertIsNone(first.data["previous"])
+
+        second = self.client.get(first.data["next"])
+        self.assertEqual(len(second.data["results"]), 5)
+        self.assertIsNone(second.data["next"])
+
+        seen = [a["id"] for a in first.data["results"]]
+        seen += [a["id"] for a in second.data["results"]]
+        self.assertEqual(
+            seen,
+            list(Article.objects.order_by("-created_at", "-id")
+                 .values_list("id", flat=True))
+        )
+
+        back = self.client.get(second.data["previous"])
+        self.assertEqual(back.data["results"], first.data["results"])
+
+    def test_api_rejects_invalid_cursor(self):
+        self.authenticate(self.reader)
+        response = self.client.get("/api/articles/?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, 404)
+
+    def test_reader_list_view_is_paginated(self):
+        response = self.client.get("/articles/")
+        self.assertEqual(len(response.context["articles"]), 20)
+        self.assertTrue(response.context["is_paginated"])
+
+        response = self.client.get("/articles/" + response.context["next_url"])
+        self.assertEqual(len(response.context["articles"]), 5)
+        self.assertIsNone(response.context["next_url"])
+
+
+    def test_editor_list_merges_publishers_in_order(self):
+        editor = self.create_user("editor", "editor")
+        edited = Publisher.objects.create(name="Edited")
+        edited.editors.add(editor)
+        other = Publisher.objects.create(name="Other")
+        Article.objects.bulk_create([
+            Article(title="Older", content="...", author=self.journalist)
+            for _ in range(10)
+        ])
+        articles = list(Article.objects.order_by("id"))
+        for number, article in enumerate(articles):
+            article.publisher = (edited, other, None)[number % 3]
+        Article.objects.bulk_update(articles, ["publisher"])
+        expected = list(
+            editorial.editor_articles(editor)
+            .order_by("-created_at", "-id").values_list("id", flat=True)
+        )
+        self.client.force_login(editor)
+
+        first = self.client.get("/editor/articles/")
+        second = self.client.get(
+            "/editor/articles/" + first.context["next_url"]
+        )
+        back = self.client.get(
+            "/editor/articles/" + second.context["previous_url"]
+        )
+
+        seen = [a.id for a in first.context["articles"]]
+        seen += [a.id for a in second.context["articles"]]
+        self.assertEqual(len(expected), 23)
+        self.assertEqual(seen, expected)
+        self.assertIsNone(second.context["next_url"])
+        self.assertEqual(
+            [a.id for a in back.context["articles"]], expected[:20]
+        )
+
+
+class QueryPlanTests(TestCase):
+    """Tests that the view queries are served by indexes"""
+
+    def test_no_view_query_does_a_full_table_scan(self):
+        out = StringIO()
+        call_command("explain_queries", "--fail-on-scan", stdout=out)
+        self.assertIn("No full table scans.", out.getvalue())
+
+    def test_temp_b_tree_sorts_are_flagged(self):
+        editor = User.objects.create_user(
+            username="editor", password="pass", role="editor"
+        )
+        Publisher.objects.create(name="Daily").editors.add(editor)
+        # a newsletter's articles are sorted after the join
+        Newsletter.objects.create(
+            title="Weekly", description="...", author=editor
+        )
+
+        with self.assertRaises(CommandError) as caught:
+            call_command(
+                "explain_queries", "--fail-on-sort", stdout=StringIO()
+            )
+
+        self.assertIn(
+            "SubscribedNewsletterArticleListView", str(caught.exception)
+        )
+        self.assertNotIn("EditorArticleListView", str(caught.exception))
+
+
+class ArticleSearchTests(BaseAPITestCase):
+    """Tests for the full-text article search"""
+
+    def setUp(self):
+        self.reader = self.create_user("reader", "reader")
+        self.journalist = self.create_user("journalist", "journalist")
+        self.article = Article.objects.create(
+            title="Harbour gale warning",
+            content="Storm surge flooded the <b>harbour</b> overnight.",
+            author=self.journalist,
+            approved=True,
+        )
+        self.pending = Article.objects.create(
+            title="Harbour draft",
+            content="Not yet approved.",
+            author=self.journalist,
+            approved=False,
+        )
+
+    def test_api_returns_ranked_highlighted_matches(self):
+        self.authenticate(self.reader)
+        response = self.client.get("/api/articles/search/", {"q": "harb"})
+        results = response.data["results"]
+
+        self.assertEqual([r["id"] for r in results], [self.article.id])
+        self.assertIn("<mark>harbour</mark>", results[0]["snippet"])
+        # article markup is escaped, only the highlight tags are html
+        self.assertIn("&lt;b&gt;", results[0]["snippet"])
+
+    def test_index_follows_edits_approval_and_deletes(self):
+        self.pending.approved = True
+        self.pending.save()
+        self.assertEqual(len(search.search_articles("draft")), 1)
+
+        self.article.title = "Coastal news"
+        self.article.save()
+        self.assertEqual(search.search_articles("gale"), [])
+
+        self.pending.delete()
+        self.assertEqual(search.search_articles("draft"), [])
+
+    def test_query_syntax_is_never_passed_through(self):
+        self.assertEqual(search.search_articles('" OR NEAR('), [])
+        self.assertEqual(search.search_articles(""), [])
+
+    def test_rebuild_restores_the_index(self):
+        call_command("rebuild_search_index", stdout=StringIO())
+        self.assertEqual(len(search.search_articles("surge")), 1)
+
+    def test_reader_search_page(self):
+        response = self.client.get("/articles/search/", {"q": "storm"})
+        self.assertContains(response, "<mark>Storm</mark>")
@@ -5,8 +5,10 @@ from .views import (
     JournalistArticleUpdateView, JournalistArticleListView,
     JournalistDeleteView, EditorArticleDeleteView,
     EditorArticleListView,
+    EditorArticleBulkReviewView,
     EditorArticleReviewView,
     ReaderArticleDetailView,
+    ArticleSearchView,
 )
 
 urlpatterns = [
@@ -18,6 +20,10 @@ urlpatterns = [
          ApprovedArticleListView.as_view(),
          name='approved-articles'
          ),
+    path('articles/search/',
+         ArticleSearchView.as_view(),
+         name='article-search'
+         ),
     path(
          'articles/<int:pk>/',
          ReaderArticleDetailView.as_view(),
@@ -42,6 +48,11 @@ urlpatterns = [
          EditorArticleListView.as_view(),
          name='editor-articles',
          ),
+    path(
+         'editor/articles/review/',
+         EditorArticleBulkReviewView.as_view(),
+         name='editor-article-bulk-review',
+         ),
     path(
          'editor/articles/<int:pk>/delete/',
          EditorArticleDeleteView.as_view(),
@@ -1,5 +1,7 @@
+from django.contrib import messages
 from django.shortcuts import redirect
 from django.urls import reverse_lazy
+from django.views import View
 from django.views.generic import (
     CreateView, ListView, UpdateView,
     DeleteView, DetailView
@@ -11,9 +13,14 @@ from users.mixins import (
     JournalistRequiredMixin,
     EditorRequiredMixin
 )
+from django.db import transaction
 from django.db.models import Q
 from publishers.models import Publisher
-from subscriptions.models import JournalistSubscription
+from subscriptions.services import subscription_sets
+from news_app.pagination import KeysetPaginationMixin
+from . import page_cache, search
+from .page_cache import PageCacheMixin
+from .services import editorial
 
 
 class ArticleCreateView(
@@ -49,8 +56,13 @@ class ArticleCreateView(
         return kwargs
 
 
-class ApprovedArticleListView(ListView):
-    ''' View for listing all approved articles for the readers.
+class ApprovedArticleListView(
+    PageCacheMixin,
+    KeysetPaginationMixin,
+    ListView
+):
+    ''' View for listing all approved articles for the readers. Rendered
+        pages are cached until an approved article changes.
 
         :model: Article
         :template_name: The template for rendering the list of articles.
@@ -64,18 +76,43 @@ class ApprovedArticleListView(ListView):
 
     def get_queryset(self):
         # Return only articles that are approved
-        return Article.objects.filter(approved=True)
+        return Article.objects.filter(approved=True).select_related(
+            'author'
+        ).defer('content')
+
+
+class ArticleSearchView(ListView):
+    ''' View for readers to full-text search the approved articles.
+
+        :template_name: The template for rendering the search results.
+        :context_object_name: The context variable name for the results.
+        :get_queryset: Returns the best matching approved articles for the
+            ``q`` parameter, each with a highlighted snippet.
+        :get_context_data: Adds the search text to the context.
+    '''
+    template_name = 'articles/reader_article_search.html'
+    context_object_name = 'articles'
+
+    def get_queryset(self):
+        return search.search_articles(self.request.GET.get('q', ''))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.request.GET.get('q', '')
+        return context
 
 
-class ReaderArticleDetailView(DetailView):
+class ReaderArticleDetailView(PageCacheMixin, DetailView):
     '''View for displaying the details of a specific article to readers.
+        Rendered pages are cached until the article changes.
 
         :model: Article
         :template_name: The template for rendering the article details.
         :context_object_name: The context variable name for the article.
         :get_queryset: Returns only approved articles.
-        :get_context_data: Adds subscription status to the context if the
-            user is a reader.
+        :get_cache_versions: Ties the cached page to the article.
+        :get_cache_variant: Keeps separate pages for readers who are and
+            are not subscribed to the author.
     '''
     model = Article
     template_name = 'articles/reader_article_detail.html'
@@ -85,22 +122,26 @@ class ReaderArticleDetailView(DetailView):
         # Return only approved articles
         return Article.objects.filter(approved=True)
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
+    def get_cache_versions(self):
+        return [page_cache.article_version(self.kwargs['pk'])]
 
-        if (self.request.user.is_authenticated and
-           self.request.user.role == 'reader'):
-            context['is_subscribed'] = JournalistSubscription.objects.filter(
-                reader=self.request.user,
-                journalist=self.object.author
-            ).exists()
+    def get_cache_variant(self):
+        if not self.is_reader():
+            return ''
+        subscribed = subscription_sets.for_reader(
+            self.request.user
+        ).follows_journalist(page_cache.article_author(self.kwargs['pk']))
+        return 'subscribed' if subscribed else 'unsubscribed'
 
-        return context
+    def is_reader(self):
+        return (self.request.user.is_authenticated and
+                self.request.user.role == 'reader')
 
 
 class JournalistArticleListView(
     LoginRequiredMixin,
     JournalistRequiredMixin,
+    KeysetPaginationMixin,
     ListView
 ):
     ''' A view that allows journalists the ability to view all
@@ -117,7 +158,9 @@ class JournalistArticleListView(
     context_object_name = 'articles'
 
     def get_queryset(self):
-        return Article.objects.filter(author=self.request.user)
+        return Article.objects.filter(
+            author=self.request.user
+        ).defer('content')
 
 
 class JournalistArticleUpdateView(
@@ -179,6 +222,7 @@ class JournalistDeleteView(
 class EditorArticleListView(
     LoginRequiredMixin,
     EditorRequiredMixin,
+    KeysetPaginationMixin,
     ListView
 ):
     '''A view to allow editors to view a list of articles.
@@ -195,13 +239,46 @@ class EditorArticleListView(
     context_object_name = 'articles'
 
     def get_queryset(self):
-        publishers = Publisher.objects.filter(editors=self.request.user)
-        return Article.objects.filter(
-            Q(publisher__in=publishers) |
-            Q(publisher__isnull=True)
+        return editorial.editor_articles(self.request.user).defer('content')
+
+    def get_keyset_paginator(self, queryset, page_size):
+        return editorial.EditorArticlePaginator(
+            self.request.user,
+            Article.objects.defer('content'),
+            page_size=page_size,
         )
 
 
+class EditorArticleBulkReviewView(
+    LoginRequiredMixin,
+    EditorRequiredMixin,
+    View
+):
+    '''A view to allow editors to approve or reject the articles selected
+        on the article list in one go.
+
+        :post: Approves or rejects the selected ``articles`` according to
+            ``action`` and reports how many changed.
+    '''
+    def post(self, request):
+        action = request.POST.get('action')
+        try:
+            article_ids = [
+                int(pk) for pk in request.POST.getlist('articles')
+            ][:editorial.MAX_BULK_REVIEW]
+        except ValueError:
+            article_ids = []
+
+        if action not in editorial.ACTIONS or not article_ids:
+            messages.error(request, 'Select articles and an action.')
+            return redirect('editor-articles')
+
+        changed = editorial.bulk_review(request.user, article_ids, action)
+        verb = 'Approved' if action == editorial.APPROVE else 'Rejected'
+        messages.success(request, f'{verb} {len(changed)} articles.')
+        return redirect('editor-articles')
+
+
 class EditorArticleDeleteView(
     LoginRequiredMixin,
     EditorRequiredMixin,
@@ -244,6 +321,8 @@ class EditorArticleReviewView(
         :get_form_kwargs: Passes the current user to the form for any
             user-specific logic.
         :form_valid: Sets the article as approved if the 'approved' button
+            was pressed and saves it together with the jobs that notify
+            subscribers.
     '''
     model = Article
     form_class = ArticleCreationForm
@@ -268,7 +347,9 @@ class EditorArticleReviewView(
         if 'approved' in self.request.POST:
             self.object.approved = True
 
-        self.object.save()
-        form.save_m2m()
+        # the approval and the notification jobs it queues commit together
+        with transaction.atomic():
+            self.object.save()
+            form.save_m2m()
 
         return redirect(self.success_url)
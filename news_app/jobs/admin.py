@@ -0,0 +1,40 @@
+from django.contrib import admin
+from django.utils import timezone
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        "name",
+        "status",
+        "attempts",
+        "run_after",
+        "created_at",
+        "finished_at",
+    )
+    list_filter = (
+        "status",
+        "name",
+    )
+    search_fields = (
+        "name",
+        "last_error",
+    )
+    readonly_fields = (
+        "locked_by",
+        "locked_at",
+        "created_at",
+        "finished_at",
+    )
+    actions = ["requeue"]
+
+    @admin.action(description="Requeue selected jobs")
+    def requeue(self, request, queryset):
+        updated = queryset.exclude(status=Job.RUNNING).update(
+            status=Job.PENDING,
+            attempts=0,
+            run_after=timezone.now(),
+            finished_at=None,
+        )
+        self.message_user(request, f"Requeued {updated} jobs.")
@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import JobStatusAPIView
+
+urlpatterns = [
+    path('jobs/status/', JobStatusAPIView.as_view()),
+]
@@ -0,0 +1,16 @@
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from jobs import queue
+
+
+class JobStatusAPIView(APIView):
+    '''
+    API view reporting job queue progress for staff: job counts by status
+    and task, the backlog of due jobs and its age, recent throughput and
+    the latest dead letters.
+    '''
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        return Response(queue.stats())
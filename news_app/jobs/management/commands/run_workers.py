@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    ''' Process the background job queue.
+
+        Jobs are claimed from the database and run on a pool of threads or
+        processes. Failed jobs are retried with exponential backoff and
+        moved to the dead letters after their last attempt. SIGTERM and
+        Ctrl-C stop claiming new jobs and wait for running ones.
+    '''
+    help = 'Run background job workers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=4,
+            help='Number of jobs run at the same time.',
+        )
+        parser.add_argument(
+            '--mode',
+            choices=('thread', 'process'),
+            default='thread',
+            help='Run jobs on a thread pool or a process pool.',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Seconds between queue checks when idle.',
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Exit when no due jobs are left.',
+        )
+        parser.add_argument(
+            '--max-jobs',
+            type=int,
+            help='Exit after running this many jobs.',
+        )
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency must be at least 1.')
+
+        worker = Worker(
+            concurrency=options['concurrency'],
+            mode=options['mode'],
+            poll_interval=options['poll_interval'],
+            burst=options['burst'],
+            max_jobs=options['max_jobs'],
+            log=self.stdout.write,
+        )
+        self.stdout.write(
+            f'Worker {worker.name} started with {worker.concurrency} '
+            f'{worker.mode} workers.'
+        )
+        worker.run()
+        self.stdout.write(self.style.SUCCESS(
+            f'Worker {worker.name} stopped after {worker.processed} jobs.'
+        ))
@@ -0,0 +1,60 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    ''' Model representing a unit of background work in the job queue.
+        fields:
+        - name: The registered task that handles the job.
+        - payload: JSON keyword arguments passed to the task.
+        - status: Where the job is in its lifecycle. Jobs that fail
+            max_attempts times are moved to ``dead`` (the dead letters).
+        - attempts: How many times a worker has started the job.
+        - max_attempts: Attempts allowed before the job is dead-lettered.
+        - run_after: The job is not claimed before this time (used for
+            retry backoff).
+        - last_error: The traceback of the most recent failure.
+        - locked_by: The worker currently running the job.
+        - locked_at: When the running worker claimed the job.
+        - created_at: DateTime indicating when the job was enqueued.
+        - finished_at: DateTime indicating when the job succeeded or died.
+    '''
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    DEAD = 'dead'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (DEAD, 'Dead'),
+    )
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ('run_after', 'id')
+        indexes = [
+            # the worker's claim query: due jobs, oldest first
+            models.Index(
+                fields=['status', 'run_after', 'id'],
+                name='job_claim_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk} ({self.status})'
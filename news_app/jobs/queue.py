@@ -0,0 +1,260 @@
+import logging
+import random
+import traceback
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger('news.jobs')
+
+# the most recent dead letters included in the queue stats
+DEAD_LETTER_SAMPLE = 10
+
+
+@dataclass(frozen=True)
+class Task:
+    name: str
+    func: object
+    max_attempts: int = None
+
+
+_registry = {}
+
+
+def task(name=None, max_attempts=None):
+    ''' Register a function as a background task.
+
+        The task is identified by ``name`` (default ``module.function``) and
+        called with the keyword arguments given to ``enqueue``, which must be
+        JSON serializable.
+    '''
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__name__}'
+        _registry[task_name] = Task(task_name, func, max_attempts)
+        func.task_name = task_name
+        return func
+    return decorator
+
+
+def get_task(name):
+    return _registry.get(name)
+
+
+def enqueue(task_ref, run_after=None, **payload):
+    ''' Add a job for a registered task to the queue.
+
+        The row is written on the current database connection, so a job
+        enqueued inside a transaction is only visible to workers once that
+        transaction commits, and disappears with it on rollback.
+
+        :task_ref: The task function or its registered name.
+        :run_after: Optional earliest time to run the job.
+        :return: The created Job.
+    '''
+    name = getattr(task_ref, 'task_name', task_ref)
+    registered = get_task(name)
+    if registered is None:
+        raise LookupError(f'No task registered as {name!r}.')
+    return Job.objects.create(
+        name=name,
+        payload=payload,
+        max_attempts=registered.max_attempts or settings.JOB_MAX_ATTEMPTS,
+        run_after=run_after or timezone.now(),
+    )
+
+
+def claim(worker, limit):
+    ''' Claim up to ``limit`` due jobs for ``worker``.
+
+        Candidates are flipped from pending to running with a single
+        conditional UPDATE, so when several workers race for the same rows
+        each job is claimed by exactly one of them.
+
+        :return: The ids of the claimed jobs.
+    '''
+    now = timezone.now()
+    release_expired(now)
+
+    candidates = Job.objects.filter(
+        status=Job.PENDING, run_after__lte=now
+    ).order_by('run_after', 'id').values('pk')[:limit]
+    claimed = Job.objects.filter(
+        pk__in=list(candidates.values_list('pk', flat=True)),
+        status=Job.PENDING,
+    ).update(
+        status=Job.RUNNING,
+        locked_by=worker,
+        locked_at=now,
+        attempts=F('attempts') + 1,
+    )
+    if not claimed:
+        return []
+    return list(
+        Job.objects.filter(
+            status=Job.RUNNING, locked_by=worker, locked_at=now
+        ).values_list('pk', flat=True)
+    )
+
+
+def renew(worker, job_ids):
+    ''' Extend the lease of the jobs ``worker`` is still running, so a job
+        that takes longer than JOB_LEASE_SECONDS is not handed out again.
+
+        :return: The number of leases renewed.
+    '''
+    return Job.objects.filter(
+        pk__in=list(job_ids), status=Job.RUNNING, locked_by=worker
+    ).update(locked_at=timezone.now())
+
+
+def release_expired(now=None):
+    ''' Return running jobs whose lease (JOB_LEASE_SECONDS) has expired to
+        the queue, e.g. after their worker was killed. Jobs that have used
+        all their attempts are dead-lettered instead.
+    '''
+    now = now or timezone.now()
+    expired = Job.objects.filter(
+        status=Job.RUNNING,
+        locked_at__lt=now - timedelta(seconds=settings.JOB_LEASE_SECONDS),
+    )
+    expired.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.DEAD,
+        last_error='Worker lease expired.',
+        locked_by='',
+        finished_at=now,
+    )
+    expired.update(status=Job.PENDING, locked_by='', run_after=now)
+
+
+def execute(job_id):
+    ''' Run a claimed job and record the outcome.
+
+        Failed jobs are retried with exponential backoff until they reach
+        max_attempts, then moved to the dead letters.
+
+        :return: True if the job succeeded.
+    '''
+    job = Job.objects.get(pk=job_id)
+    registered = get_task(job.name)
+    try:
+        if registered is None:
+            raise LookupError(f'No task registered as {job.name!r}.')
+        registered.func(**job.payload)
+    except Exception:
+        logger.exception('Job %s (%s) failed.', job.pk, job.name)
+        _record_failure(
+            job, traceback.format_exc(), retry=registered is not None
+        )
+        return False
+
+    Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+        status=Job.DONE,
+        locked_by='',
+        last_error='',
+        finished_at=timezone.now(),
+    )
+    return True
+
+
+def _record_failure(job, error, retry=True):
+    now = timezone.now()
+    if retry and job.attempts < job.max_attempts:
+        changes = {
+            'status': Job.PENDING,
+            'run_after': now + timedelta(seconds=backoff(job.attempts)),
+        }
+    else:
+        changes = {'status': Job.DEAD, 'finished_at': now}
+    Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+        locked_by='', last_error=error, **changes
+    )
+
+
+def backoff(attempts):
+    ''' Seconds to wait before retrying a job that has failed ``attempts``
+        times: exponential from JOB_RETRY_BASE_SECONDS, capped at
+        JOB_RETRY_MAX_SECONDS, with random jitter so that jobs which failed
+        together do not all retry together.
+    '''
+    delay = min(
+        settings.JOB_RETRY_MAX_SECONDS,
+        settings.JOB_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0),
+    )
+    return random.uniform(delay / 2, delay)
+
+
+def drain(worker='inline', limit=100):
+    ''' Run every due job in the current thread until none are left.
+
+        :return: The number of jobs run.
+    '''
+    total = 0
+    while job_ids := claim(worker, limit):
+        for job_id in job_ids:
+            execute(job_id)
+        total += len(job_ids)
+    return total
+
+
+def purge_finished(days=None):
+    ''' Delete successful jobs finished more than ``days`` (default
+        JOB_RETENTION_DAYS) ago. Dead letters are kept for inspection.
+    '''
+    days = settings.JOB_RETENTION_DAYS if days is None else days
+    deleted, _ = Job.objects.filter(
+        status=Job.DONE,
+        finished_at__lt=timezone.now() - timedelta(days=days),
+    ).delete()
+    return deleted
+
+
+def stats():
+    ''' Summarize the queue for the status endpoint and worker progress. '''
+    now = timezone.now()
+    counts = dict.fromkeys((status for status, _ in Job.STATUS_CHOICES), 0)
+    tasks = {}
+    rows = Job.objects.order_by().values('name', 'status').annotate(
+        total=Count('id')
+    )
+    for row in rows:
+        counts[row['status']] += row['total']
+        tasks.setdefault(row['name'], {})[row['status']] = row['total']
+
+    oldest_due = Job.objects.filter(
+        status=Job.PENDING, run_after__lte=now
+    ).aggregate(oldest=Min('run_after'))['oldest']
+
+    dead_letters = Job.objects.filter(status=Job.DEAD).order_by(
+        '-finished_at', '-id'
+    ).values(
+        'id', 'name', 'attempts', 'last_error', 'finished_at'
+    )[:DEAD_LETTER_SAMPLE]
+
+    return {
+        'counts': counts,
+        'tasks': tasks,
+        'due': Job.objects.filter(
+            status=Job.PENDING, run_after__lte=now
+        ).count(),
+        'oldest_due_seconds': (
+            (now - oldest_due).total_seconds() if oldest_due else 0
+        ),
+        'completed_last_minute': Job.objects.filter(
+            status=Job.DONE, finished_at__gte=now - timedelta(minutes=1)
+        ).count(),
+        # only the exception line of each traceback
+        'dead_letters': [
+            dict(job, last_error=_last_line(job['last_error']))
+            for job in dead_letters
+        ],
+    }
+
+
+def _last_line(text):
+    lines = text.strip().splitlines()
+    return lines[-1] if lines else ''
@@ -0,0 +1,160 @@
+import time
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+from articles.tests import BaseAPITestCase
+from jobs import queue
+from jobs.models import Job
+from jobs.worker import Worker
+
+calls = []
+
+
+@queue.task(name='tests.record')
+def record(value):
+    calls.append(value)
+
+
+@queue.task(name='tests.fail', max_attempts=3)
+def fail():
+    raise RuntimeError('boom')
+
+
+@queue.task(name='tests.slow')
+def slow(seconds):
+    leased = Job.objects.get(name='tests.slow').locked_at
+    time.sleep(seconds)
+    calls.append(Job.objects.get(name='tests.slow').locked_at > leased)
+
+
+class JobQueueTests(BaseAPITestCase):
+    """
+    Testing claiming, retries and dead letters
+    """
+    def setUp(self):
+        calls.clear()
+
+    def test_jobs_run_once(self):
+        queue.enqueue(record, value=1)
+        queue.enqueue('tests.record', value=2)
+
+        self.assertEqual(queue.drain(), 2)
+        self.assertEqual(queue.drain(), 0)
+
+        self.assertEqual(sorted(calls), [1, 2])
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 2)
+
+    def test_claimed_jobs_are_not_handed_out_twice(self):
+        queue.enqueue(record, value=1)
+
+        self.assertEqual(len(queue.claim('first', 10)), 1)
+        self.assertEqual(queue.claim('second', 10), [])
+
+    def test_unknown_task_is_rejected(self):
+        with self.assertRaises(LookupError):
+            queue.enqueue('tests.missing')
+
+    def test_failures_back_off_then_dead_letter(self):
+        job = queue.enqueue(fail)
+
+        queue.drain()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.PENDING)
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn('RuntimeError: boom', job.last_error)
+
+        for _ in range(2):
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            queue.drain()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DEAD)
+        self.assertEqual(job.attempts, 3)
+
+    @override_settings(JOB_RETRY_BASE_SECONDS=10, JOB_RETRY_MAX_SECONDS=60)
+    def test_backoff_grows_and_is_capped(self):
+        self.assertTrue(5 <= queue.backoff(1) <= 10)
+        self.assertTrue(20 <= queue.backoff(3) <= 40)
+        self.assertTrue(30 <= queue.backoff(10) <= 60)
+
+    def test_expired_lease_is_released(self):
+        queue.enqueue(record, value=1)
+        queue.claim('crashed', 10)
+        Job.objects.update(locked_at=timezone.now() - timedelta(days=1))
+
+        self.assertEqual(queue.drain(), 1)
+        self.assertEqual(calls, [1])
+
+    def test_renewed_lease_is_kept(self):
+        queue.enqueue(record, value=1)
+        job_ids = queue.claim('busy', 10)
+        Job.objects.update(locked_at=timezone.now() - timedelta(days=1))
+
+        self.assertEqual(queue.renew('other', job_ids), 0)
+        self.assertEqual(queue.renew('busy', job_ids), 1)
+
+        self.assertEqual(queue.claim('second', 10), [])
+        self.assertEqual(Job.objects.get().locked_by, 'busy')
+
+    def test_status_endpoint(self):
+        queue.enqueue(record, value=1)
+        queue.enqueue(fail)
+        Job.objects.filter(name='tests.fail').update(
+            status=Job.DEAD, last_error='Traceback...\nRuntimeError: boom'
+        )
+
+        self.authenticate(self.create_user('reader', 'reader'))
+        response = self.client.get('/api/jobs/status/')
+        self.assertEqual(response.status_code, 403)
+
+        staff = self.create_user('staff', 'editor')
+        staff.is_staff = True
+        staff.save()
+        self.authenticate(staff)
+        response = self.client.get('/api/jobs/status/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['counts']['pending'], 1)
+        self.assertEqual(response.data['due'], 1)
+        self.assertEqual(
+            response.data['dead_letters'][0]['last_error'],
+            'RuntimeError: boom',
+        )
+
+
+class RunWorkersCommandTests(TransactionTestCase):
+    """
+    Testing the worker command against committed jobs
+    """
+    def setUp(self):
+        calls.clear()
+
+    def test_burst_run_processes_queue_on_a_pool_thread(self):
+        for value in range(20):
+            queue.enqueue(record, value=value)
+
+        # a single pool thread: the in-memory test database takes table
+        # locks rather than waiting when two connections write at once
+        out = StringIO()
+        call_command(
+            'run_workers', '--burst', '--concurrency', '1', stdout=out
+        )
+
+        self.assertEqual(sorted(calls), list(range(20)))
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 20)
+        self.assertIn('stopped after 20 jobs', out.getvalue())
+
+    @override_settings(JOB_LEASE_RENEW_SECONDS=0)
+    def test_worker_renews_leases_of_running_jobs(self):
+        queue.enqueue(slow, seconds=0.3)
+
+        Worker(
+            concurrency=1, poll_interval=0.05, burst=True,
+            log=lambda line: None,
+        ).run()
+
+        self.assertEqual(calls, [True])
+        self.assertEqual(Job.objects.get().status, Job.DONE)
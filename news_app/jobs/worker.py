@@ -0,0 +1,180 @@
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+
+import django
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connections
+
+from . import queue
+
+# how often to report progress and purge old finished jobs (seconds)
+PROGRESS_INTERVAL = 10
+PURGE_INTERVAL = 3600
+
+
+def run_job(job_id):
+    ''' Run one job in a pool thread or process, with a fresh database
+        connection as Django does for each request.
+    '''
+    close_old_connections()
+    try:
+        return queue.execute(job_id)
+    finally:
+        close_old_connections()
+
+
+def _init_process():
+    # spawned processes start without Django configured
+    django.setup()
+
+
+class Worker:
+    ''' Claims due jobs and runs them on a thread or process pool, renewing
+        their leases every JOB_LEASE_RENEW_SECONDS while they run.
+
+        :concurrency: Number of jobs run at the same time.
+        :mode: ``thread`` or ``process``. Threads suit the I/O-bound tasks
+            (SMTP, HTTP); processes avoid the GIL for CPU-bound ones.
+        :poll_interval: Seconds to wait for new jobs when the queue is idle.
+        :burst: Exit once no due jobs are left instead of polling.
+        :max_jobs: Exit after running this many jobs.
+        :log: Callable receiving progress lines.
+    '''
+
+    def __init__(self, concurrency=4, mode='thread', poll_interval=1.0,
+                 burst=False, max_jobs=None, log=print):
+        self.concurrency = concurrency
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.burst = burst
+        self.max_jobs = max_jobs
+        self.log = log
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self.succeeded = 0
+        self.failed = 0
+        self.stopping = threading.Event()
+
+    @property
+    def processed(self):
+        return self.succeeded + self.failed
+
+    def stop(self, *args):
+        self.stopping.set()
+
+    def run(self):
+        self._install_signal_handlers()
+        executor = self._executor()
+        in_flight = {}
+        started = last_report = last_renew = time.monotonic()
+        last_purge = 0
+        try:
+            while not self.stopping.is_set():
+                if time.monotonic() - last_purge > PURGE_INTERVAL:
+                    queue.purge_finished()
+                    last_purge = time.monotonic()
+
+                free = self.concurrency - len(in_flight)
+                if self.max_jobs is not None:
+                    free = min(
+                        free, self.max_jobs - self.processed - len(in_flight)
+                    )
+                if free > 0:
+                    for job_id in self._claim(free):
+                        in_flight[executor.submit(run_job, job_id)] = job_id
+
+                if not in_flight:
+                    if self.burst or self._reached_max_jobs():
+                        break
+                    self.stopping.wait(self.poll_interval)
+                    continue
+
+                done, _ = wait(
+                    in_flight,
+                    timeout=self.poll_interval,
+                    return_when=FIRST_COMPLETED,
+                )
+                for future in done:
+                    self._record(future, in_flight.pop(future))
+
+                if (in_flight and time.monotonic() - last_renew
+                        > settings.JOB_LEASE_RENEW_SECONDS):
+                    self._renew(in_flight.values())
+                    last_renew = time.monotonic()
+
+                if time.monotonic() - last_report > PROGRESS_INTERVAL:
+                    self._report(started)
+                    last_report = time.monotonic()
+        finally:
+            # let running jobs finish so none is left holding a lease
+            for future in in_flight:
+                self._record(future, in_flight[future], block=True)
+            executor.shutdown(wait=True)
+        self._report(started)
+
+    def _claim(self, limit):
+        try:
+            return queue.claim(self.name, limit)
+        except DatabaseError as exc:
+            # e.g. SQLite's write lock held past its timeout; try again on
+            # the next poll rather than stopping the worker
+            self.log(f'Could not claim jobs: {exc}')
+            return []
+
+    def _renew(self, job_ids):
+        try:
+            queue.renew(self.name, job_ids)
+        except DatabaseError as exc:
+            # the lease is still good until JOB_LEASE_SECONDS; retry on the
+            # next renewal
+            self.log(f'Could not renew job leases: {exc}')
+
+    def _executor(self):
+        if self.mode == 'process':
+            # children must not inherit the parent's open connections
+            connections.close_all()
+            return ProcessPoolExecutor(
+                max_workers=self.concurrency, initializer=_init_process
+            )
+        return ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix='job-worker'
+        )
+
+    def _record(self, future, job_id, block=False):
+        try:
+            succeeded = future.result() if block else future.result(0)
+        except Exception as exc:
+            # the pool itself failed; the job's lease will expire and it
+            # will be picked up again
+            self.log(f'Job {job_id} was interrupted: {exc!r}')
+            succeeded = False
+        if succeeded:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+
+    def _reached_max_jobs(self):
+        return self.max_jobs is not None and self.processed >= self.max_jobs
+
+    def _report(self, started):
+        elapsed = max(time.monotonic() - started, 1e-9)
+        counts = queue.stats()['counts']
+        self.log(
+            f'{self.processed} jobs run ({self.succeeded} succeeded, '
+            f'{self.failed} failed) at {self.processed / elapsed:.1f}/s; '
+            f'{counts["pending"]} pending, {counts["dead"]} dead.'
+        )
+
+    def _install_signal_handlers(self):
+        if threading.current_thread() is not threading.main_thread():
+            return
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
@@ -0,0 +1,358 @@
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from io import StringIO
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from news_app.loadtest import git_commit
+
+User = get_user_model()
+
+PREFIX = 'bench'
+
+# metrics compared with the baseline: time and memory within a relative
+# threshold, queries exactly. The fastest run is the steadiest estimate of
+# the time, the others mostly add noise from the machine.
+TIME = 'min_ms'
+MEMORY = 'peak_kb'
+QUERIES = 'queries'
+
+
+@dataclass
+class Case:
+    ''' One benchmark: ``run`` is timed, ``before`` runs untimed before
+        every call, e.g. to empty a cache.
+    '''
+    run: object
+    before: object = None
+
+
+@dataclass
+class Dataset:
+    ''' The seeded objects the benchmarks act on. '''
+    reader: object
+    journalist: object
+    editor: object
+    fan_out_article: object
+    subscribers: int
+
+
+_registry = {}
+
+
+def benchmark(name):
+    ''' Register a factory that takes the Dataset and returns a Case. '''
+    def decorator(factory):
+        _registry[name] = factory
+        return factory
+    return decorator
+
+
+def names():
+    return list(_registry)
+
+
+def seed(scale=1, subscribers=1000):
+    ''' Seed a deterministic dataset with ``seed_scale`` plus a journalist
+        with ``subscribers`` readers and an article of theirs waiting for
+        approval.
+    '''
+    call_command(
+        'seed_scale',
+        '--prefix', PREFIX,
+        '--seed', '1',
+        '--readers', str(500 * scale),
+        '--journalists', str(20 * scale),
+        '--editors', '2',
+        '--publishers', '3',
+        '--articles', str(2000 * scale),
+        '--newsletters', str(10 * scale),
+        stdout=StringIO(),
+    )
+
+    password = make_password('password', salt=PREFIX)
+    author = User.objects.create(
+        username=f'{PREFIX}-fan-out-journalist', role='journalist',
+        password=password,
+    )
+    fans = User.objects.bulk_create(
+        User(
+            username=f'{PREFIX}-fan-{number}',
+            email=f'{PREFIX}-fan-{number}@example.com',
+            role='reader',
+            password=password,
+        )
+        for number in range(subscribers)
+    )
+    from articles.models import Article
+    from subscriptions.models import JournalistSubscription
+    from subscriptions.services import feed
+
+    JournalistSubscription.objects.bulk_create(
+        JournalistSubscription(reader=fan, journalist=author) for fan in fans
+    )
+    article = Article.objects.create(
+        title='Fan-out benchmark', content='Benchmark news. ' * 300,
+        author=author,
+    )
+
+    reader = User.objects.filter(
+        username__startswith=f'{PREFIX}-reader-'
+    ).annotate(
+        follows=Count('journalist_subscriptions')
+    ).order_by('-follows', 'pk').first()
+    # only the benchmarked feed: rebuilding every reader's would take
+    # minutes on a database that already holds other data
+    feed.rebuild_feed(reader.pk)
+    journalist = User.objects.filter(
+        username__startswith=f'{PREFIX}-journalist-'
+    ).annotate(count=Count('articles')).order_by('-count', 'pk').first()
+    editor = User.objects.filter(
+        username__startswith=f'{PREFIX}-editor-'
+    ).order_by('pk').first()
+    return Dataset(
+        reader=reader,
+        journalist=journalist,
+        editor=editor,
+        fan_out_article=article,
+        subscribers=subscribers,
+    )
+
+
+# the benchmarks
+
+@benchmark('feed_query')
+def feed_query(data):
+    from subscriptions.models import FeedItem
+    from subscriptions.services.feed import FeedPaginator
+
+    def run():
+        page = FeedPaginator(
+            data.reader, FeedItem.objects.filter(reader=data.reader)
+        ).paginate()
+        list(page.object_list)
+    return Case(run)
+
+
+@benchmark('article_list_render')
+def article_list_render(data):
+    client = Client()
+    client.force_login(data.reader)
+
+    def run():
+        response = client.get('/articles/')
+        assert response.status_code == 200, response.status_code
+    # measure a full render rather than a page cache hit
+    return Case(run, before=cache.clear)
+
+
+@benchmark('serializer_throughput')
+def serializer_throughput(data):
+    from articles.api.serializers import (
+        ArticleListSerializer,
+        article_values,
+        serialize_article_rows,
+    )
+    from articles.models import Article
+
+    def run():
+        articles = Article.objects.filter(approved=True)[:500]
+        serialize_article_rows(article_values(articles))
+        ArticleListSerializer(
+            articles.select_related('author', 'publisher').defer('content'),
+            many=True,
+        ).data
+    return Case(run)
+
+
+@benchmark('approval_fan_out')
+def approval_fan_out(data):
+    from articles import tasks
+    from subscriptions import tasks as subscription_tasks
+
+    article = data.fan_out_article
+
+    def run():
+        # the approval and the jobs it queues, run inline
+        article.refresh_from_db()
+        article.approved = True
+        article.save()
+        tasks.notify_subscribers(article.pk)
+        subscription_tasks.fan_out_article(article.pk)
+
+    def before():
+        mail.outbox = []
+    return Case(run, before=before)
+
+
+@benchmark('form_init')
+def form_init(data):
+    from articles.forms import ArticleCreationForm
+    from newsletters.forms import NewsletterForm
+
+    def run():
+        # rendering the choice fields runs their querysets
+        str(ArticleCreationForm(user=data.journalist)['publisher'])
+        str(NewsletterForm(user=data.journalist)['articles'])
+        str(NewsletterForm(user=data.editor)['articles'])
+    return Case(run)
+
+
+@benchmark('jwt_api')
+def jwt_api(data):
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    token = str(RefreshToken.for_user(data.reader).access_token)
+    client = Client(headers={'Authorization': f'Bearer {token}'})
+
+    def run():
+        for path in ('/api/articles/', '/api/articles/subscribed/'):
+            response = client.get(path)
+            assert response.status_code == 200, (path, response.status_code)
+    return Case(run)
+
+
+# running
+
+def _once(case, context=None):
+    if case.before:
+        case.before()
+    with transaction.atomic():
+        # every call starts from the same data
+        # CaptureQueriesContext has a length, so no ``or``
+        with nullcontext() if context is None else context:
+            started = time.perf_counter()
+            case.run()
+            elapsed = time.perf_counter() - started
+        transaction.set_rollback(True)
+    return elapsed
+
+
+@contextmanager
+def _traced(result):
+    tracemalloc.start()
+    try:
+        yield
+        current, peak = tracemalloc.get_traced_memory()
+        result['peak_kb'] = round(peak / 1024, 1)
+        result['retained_kb'] = round(current / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def measure(case, repeat=5, warmup=1):
+    ''' Time ``case`` ``repeat`` times after ``warmup`` calls, then count
+        its queries and trace its allocations in one more call each.
+    '''
+    for _ in range(warmup):
+        _once(case)
+    times = [_once(case) * 1000 for _ in range(repeat)]
+    queries = CaptureQueriesContext(connection)
+    _once(case, queries)
+    result = {
+        'median_ms': round(statistics.median(times), 3),
+        'min_ms': round(min(times), 3),
+        'max_ms': round(max(times), 3),
+        'queries': len(queries.captured_queries),
+    }
+    _once(case, _traced(result))
+    return result
+
+
+def run(selected=None, scale=1, subscribers=1000, repeat=5, warmup=1,
+        progress=None):
+    ''' Seed a throwaway test database, run the selected benchmarks (all
+        by default) against it and drop it. Returns the report.
+    '''
+    unknown = set(selected or ()) - set(_registry)
+    if unknown:
+        raise ValueError(f'Unknown benchmarks: {", ".join(sorted(unknown))}.')
+
+    results = {}
+    # the timings of the list pages and forms grow with the data, so they
+    # are only comparable over the same seeded dataset and nothing else
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False
+    )
+    try:
+        # no mail leaves, and no sampled timing or slow query logging
+        # lands in some runs only
+        with override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+            SERVER_TIMING_SAMPLE_RATE=0,
+            SLOW_QUERY_MS=None,
+        ):
+            data = seed(scale=scale, subscribers=subscribers)
+            for name, factory in _registry.items():
+                if selected and name not in selected:
+                    continue
+                results[name] = measure(factory(data), repeat, warmup)
+                if progress:
+                    progress(name, results[name])
+    finally:
+        cache.clear()
+        from articles.services import email_delivery
+        email_delivery.close_worker_connection()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    return {
+        'commit': git_commit(),
+        'created_at': timezone.now().isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'scale': scale,
+        'subscribers': subscribers,
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare(report, baseline, time_threshold=0.2, memory_threshold=0.2):
+    ''' Regressions of ``report`` against ``baseline``: benchmarks whose
+        fastest time or peak allocations grew by more than the thresholds,
+        or that run more queries.
+    '''
+    regressions = []
+    for name, result in report['results'].items():
+        before = baseline.get('results', {}).get(name)
+        if before is None:
+            continue
+        for metric, threshold in ((TIME, time_threshold),
+                                  (MEMORY, memory_threshold)):
+            old, new = before.get(metric), result.get(metric)
+            if old and new is not None and new > old * (1 + threshold):
+                regressions.append(
+                    f'{name}: {metric} {old} -> {new} '
+                    f'(+{(new / old - 1):.0%}, limit {threshold:.0%})'
+                )
+        old, new = before.get(QUERIES), result.get(QUERIES)
+        if old is not None and new is not None and new > old:
+            regressions.append(f'{name}: queries {old} -> {new}')
+    return regressions
+
+
+def load_baseline(path):
+    with open(path) as source:
+        return json.load(source)
+
+
+def save_baseline(report, path):
+    with open(path, 'w') as target:
+        json.dump(report, target, indent=2)
+        target.write('\n')
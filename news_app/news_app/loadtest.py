@@ -0,0 +1,439 @@
+import json
+import random
+import subprocess
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+
+from news_app.stats import percentile
+
+User = get_user_model()
+
+READER = 'reader'
+JOURNALIST = 'journalist'
+EDITOR = 'editor'
+API = 'api'
+JOURNEYS = (READER, JOURNALIST, EDITOR, API)
+
+DEFAULT_MIX = {READER: 70, JOURNALIST: 10, EDITOR: 5, API: 15}
+
+# users of each role and articles sampled for the journeys
+SAMPLE_SIZE = 1000
+
+# polls of the subscribed article API per API journey
+API_POLLS = 3
+
+LOAD_TEST_TITLE = 'Load test article'
+
+
+class LoadTestError(Exception):
+    '''Raised when a load test cannot start, e.g. for lack of users.'''
+
+
+def parse_mix(text):
+    ''' Parse ``reader=70,api=30`` into journey weights. '''
+    mix = {}
+    for part in filter(None, (part.strip() for part in text.split(','))):
+        name, _, weight = part.partition('=')
+        if name not in JOURNEYS:
+            raise ValueError(
+                f'Unknown journey {name!r}; choose from {", ".join(JOURNEYS)}.'
+            )
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise ValueError(f'Invalid weight for {name}: {weight!r}.')
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError('The journey mix needs a positive weight.')
+    return mix
+
+
+@dataclass
+class Fixtures:
+    ''' The accounts and articles the journeys act on, sampled once before
+        the run so that journeys do not query the database themselves.
+        Every sampled user must log in with the same password, as the ones
+        created by ``seed_scale`` do.
+    '''
+    password: str
+    readers: list = field(default_factory=list)
+    journalists: list = field(default_factory=list)
+    editors: list = field(default_factory=list)
+    # (article id, author id) of approved articles
+    articles: list = field(default_factory=list)
+    # editor username -> ids of articles waiting for their review
+    pending: dict = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, password, prefix='', sample_size=SAMPLE_SIZE):
+        from articles.models import Article
+        from articles.services import editorial
+
+        fixtures = cls(password=password)
+        users = User.objects.filter(username__startswith=prefix)
+        for role, target in (
+            (READER, fixtures.readers),
+            (JOURNALIST, fixtures.journalists),
+            (EDITOR, fixtures.editors),
+        ):
+            target.extend(users.filter(role=role).order_by('pk').values_list(
+                'username', flat=True
+            )[:sample_size])
+        fixtures.articles = list(Article.objects.filter(
+            approved=True
+        ).values_list('pk', 'author_id')[:sample_size])
+        for editor in users.filter(role=EDITOR).order_by('pk')[:50]:
+            fixtures.pending[editor.username] = list(
+                editorial.editor_articles(editor).filter(
+                    approved=False
+                ).values_list('pk', flat=True)[:sample_size]
+            )
+        return fixtures
+
+    def check(self, mix):
+        required = {
+            READER: ('readers', self.readers and self.articles),
+            JOURNALIST: ('journalists', self.journalists),
+            EDITOR: ('editors', self.editors),
+            API: ('readers', self.readers),
+        }
+        for journey in mix:
+            label, available = required[journey]
+            if not available:
+                raise LoadTestError(
+                    f'The {journey} journey needs {label}'
+                    f'{" and approved articles" if journey == READER else ""}'
+                    f'; run seed_scale first.'
+                )
+
+
+class Recorder:
+    ''' Collects the latency of every request by endpoint, across threads. '''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, endpoint, seconds, ok):
+        with self.lock:
+            self.latencies[endpoint].append(seconds)
+            if not ok:
+                self.errors[endpoint] += 1
+
+    def summary(self, elapsed):
+        ''' Requests per second and latency percentiles in milliseconds,
+            overall and by endpoint.
+        '''
+        endpoints = {
+            endpoint: _stats(latencies, self.errors[endpoint], elapsed)
+            for endpoint, latencies in sorted(self.latencies.items())
+        }
+        every = [
+            latency
+            for latencies in self.latencies.values()
+            for latency in latencies
+        ]
+        return {
+            'total': _stats(every, sum(self.errors.values()), elapsed),
+            'endpoints': endpoints,
+        }
+
+
+def _stats(latencies, errors, elapsed):
+    ordered = sorted(latencies)
+    return {
+        'requests': len(ordered),
+        'errors': errors,
+        'rps': round(len(ordered) / elapsed, 2) if elapsed else 0,
+        'mean_ms': _ms(sum(ordered) / len(ordered)) if ordered else None,
+        'p50_ms': _ms(percentile(ordered, 50)),
+        'p95_ms': _ms(percentile(ordered, 95)),
+        'p99_ms': _ms(percentile(ordered, 99)),
+        'max_ms': _ms(ordered[-1]) if ordered else None,
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+class InProcessClient:
+    ''' Sends requests straight to the Django handler with the test client:
+        no network or server overhead, just the application.
+    '''
+
+    def __init__(self):
+        from django.test import Client
+
+        self.client = Client()
+
+    def request(self, method, path, data=None, json_body=None, headers=None):
+        kwargs = {'headers': headers or {}}
+        if json_body is not None:
+            kwargs.update(data=json.dumps(json_body),
+                          content_type='application/json')
+        elif data is not None:
+            kwargs['data'] = data
+        response = getattr(self.client, method.lower())(path, **kwargs)
+        # drain streaming responses so that their cost is measured too
+        body = (
+            b''.join(response.streaming_content)
+            if response.streaming else response.content
+        )
+        return response.status_code, response, body
+
+
+class HTTPClient:
+    ''' Sends requests to a running server, like a browser would: cookies
+        are kept and form posts carry the CSRF token.
+    '''
+
+    def __init__(self, base_url):
+        import requests
+
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+
+    def request(self, method, path, data=None, json_body=None, headers=None):
+        headers = dict(headers or {})
+        if data is not None:
+            token = self.session.cookies.get('csrftoken')
+            if token:
+                data = {**data, 'csrfmiddlewaretoken': token}
+                headers.setdefault('X-CSRFToken', token)
+            headers.setdefault('Referer', self.base_url + path)
+        response = self.session.request(
+            method,
+            self.base_url + path,
+            data=data,
+            json=json_body,
+            headers=headers,
+            allow_redirects=False,
+        )
+        return response.status_code, response.headers, response.content
+
+
+class VirtualUser:
+    ''' One simulated user: a client with its own cookies and the helpers
+        the journeys are scripted with.
+    '''
+
+    def __init__(self, client, fixtures, recorder, rng):
+        self.client = client
+        self.fixtures = fixtures
+        self.recorder = recorder
+        self.rng = rng
+
+    def call(self, method, path, endpoint=None, **kwargs):
+        ''' Send a request and record its latency under ``endpoint``, a
+            route with its parameters left out. 4xx and 5xx answers count
+            as errors, except for an expected ``304``.
+        '''
+        started = time.perf_counter()
+        try:
+            status, headers, body = self.client.request(method, path, **kwargs)
+        except Exception:
+            self.recorder.record(
+                f'{method} {endpoint or path}',
+                time.perf_counter() - started,
+                False,
+            )
+            raise
+        self.recorder.record(
+            f'{method} {endpoint or path}',
+            time.perf_counter() - started,
+            status < 400,
+        )
+        return status, headers, body
+
+    def login(self, username):
+        self.call('GET', '/login/')
+        status, _, _ = self.call('POST', '/login/', data={
+            'username': username, 'password': self.fixtures.password,
+        })
+        # the form is shown again, with a 200, when the login fails
+        if status != 302:
+            raise LoadTestError(f'{username} could not log in.')
+
+
+def reader_journey(user):
+    ''' Log in, open the dashboard and the article list, read an article
+        and subscribe to its journalist.
+    '''
+    fixtures = user.fixtures
+    user.login(user.rng.choice(fixtures.readers))
+    user.call('GET', '/dashboard/reader/')
+    user.call('GET', '/articles/')
+    article_id, author_id = user.rng.choice(fixtures.articles)
+    user.call('GET', f'/articles/{article_id}/', '/articles/<id>/')
+    user.call(
+        'POST',
+        f'/subscribe/journalist/{author_id}/',
+        '/subscribe/journalist/<id>/',
+        data={},
+    )
+
+
+def journalist_journey(user):
+    ''' Log in, open the article form and submit a new article. '''
+    user.login(user.rng.choice(user.fixtures.journalists))
+    user.call('GET', '/dashboard/journalist/')
+    user.call('GET', '/articles/create/')
+    words = ' '.join(
+        user.rng.choice(('news', 'report', 'city', 'council', 'market'))
+        for _ in range(300)
+    )
+    user.call('POST', '/articles/create/', data={
+        'title': f'{LOAD_TEST_TITLE} {user.rng.randrange(10 ** 9)}',
+        'content': words,
+        'publisher': '',
+    })
+
+
+def editor_journey(user):
+    ''' Log in, open the review list and one pending article, and approve
+        it from the list. Editors with nothing left to review only browse.
+    '''
+    fixtures = user.fixtures
+    username = user.rng.choice(fixtures.editors)
+    user.login(username)
+    user.call('GET', '/editor/articles/')
+    pending = fixtures.pending.get(username)
+    if not pending:
+        return
+    try:
+        article_id = pending.pop()
+    except IndexError:
+        # another thread took the last one
+        return
+    user.call(
+        'GET',
+        f'/editor/articles/{article_id}/review/',
+        '/editor/articles/<id>/review/',
+    )
+    user.call('POST', '/editor/articles/review/', data={
+        'articles': [article_id], 'action': 'approve',
+    })
+
+
+def api_journey(user):
+    ''' Obtain a JWT and poll the subscribed articles and the article list,
+        revalidating the list with its ETag like a well-behaved client.
+    '''
+    fixtures = user.fixtures
+    _, _, body = user.call('POST', '/api/token/', json_body={
+        'username': user.rng.choice(fixtures.readers),
+        'password': fixtures.password,
+    })
+    try:
+        token = json.loads(body)['access']
+    except (KeyError, ValueError):
+        return
+    auth = {'Authorization': f'Bearer {token}'}
+    etag = None
+    for _ in range(API_POLLS):
+        user.call('GET', '/api/articles/subscribed/', headers=auth)
+        headers = dict(auth)
+        if etag:
+            headers['If-None-Match'] = etag
+        _, response_headers, _ = user.call(
+            'GET', '/api/articles/', headers=headers
+        )
+        etag = response_headers.get('ETag') or etag
+
+
+JOURNEY_FUNCTIONS = {
+    READER: reader_journey,
+    JOURNALIST: journalist_journey,
+    EDITOR: editor_journey,
+    API: api_journey,
+}
+
+
+def run(fixtures, mix=None, concurrency=4, duration=None, iterations=None,
+        base_url=None, seed=None):
+    ''' Run journeys from ``concurrency`` threads until ``duration`` seconds
+        have passed or each thread has run ``iterations`` journeys, and
+        return the report.
+
+        Journeys are picked by the weights in ``mix``. Requests go to the
+        server at ``base_url`` when given, otherwise to the application in
+        this process. Journeys change data: they create, approve and
+        subscribe, so run them against a seeded database, not production.
+    '''
+    mix = mix or DEFAULT_MIX
+    fixtures.check(mix)
+    if duration is None and iterations is None:
+        iterations = 10
+    recorder = Recorder()
+    journeys = defaultdict(int)
+    failures = defaultdict(int)
+    lock = threading.Lock()
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    deadline = None
+
+    def worker(number):
+        rng = random.Random(None if seed is None else seed + number)
+        completed = 0
+        try:
+            while True:
+                if iterations is not None and completed >= iterations:
+                    return
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return
+                client = (
+                    HTTPClient(base_url) if base_url else InProcessClient()
+                )
+                name = rng.choices(names, weights)[0]
+                user = VirtualUser(client, fixtures, recorder, rng)
+                try:
+                    JOURNEY_FUNCTIONS[name](user)
+                    failed = False
+                except Exception:
+                    failed = True
+                with lock:
+                    journeys[name] += 1
+                    if failed:
+                        failures[name] += 1
+                completed += 1
+        finally:
+            if not base_url:
+                connection.close()
+
+    started = time.perf_counter()
+    if duration is not None:
+        deadline = started + duration
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        'commit': git_commit(),
+        'target': base_url or 'in-process',
+        'concurrency': concurrency,
+        'duration_s': round(elapsed, 3),
+        'mix': mix,
+        'journeys': {
+            name: {'completed': journeys[name], 'failed': failures[name]}
+            for name in names
+        },
+        **recorder.summary(elapsed),
+    }
+
+
+def git_commit():
+    ''' The commit being tested, so that reports can be compared. '''
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
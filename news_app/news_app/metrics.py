@@ -0,0 +1,348 @@
+import atexit
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views import View
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# seconds, from a cached page to a slow search or export
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+RECIPIENT_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+
+COUNTER = 'counter'
+HISTOGRAM = 'histogram'
+
+
+class Metric:
+    def __init__(self, registry, name, documentation, labels):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(
+                f'{self.name} takes the labels {", ".join(self.labels)}.'
+            )
+        return tuple(str(labels[label]) for label in self.labels)
+
+
+class Counter(Metric):
+    ''' A total that only goes up, per combination of label values. '''
+    kind = COUNTER
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            samples = self.registry.samples[self.name]
+            samples[key] = samples.get(key, 0) + amount
+        self.registry.changed()
+
+
+class Histogram(Metric):
+    ''' Observations counted into buckets by upper bound, with their sum
+        and count, per combination of label values.
+    '''
+    kind = HISTOGRAM
+
+    def __init__(self, registry, name, documentation, labels, buckets):
+        super().__init__(registry, name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.registry.lock:
+            samples = self.registry.samples[self.name]
+            sample = samples.get(key)
+            if sample is None:
+                # one count per bucket plus +Inf, then the sum
+                sample = samples[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            sample[index] += 1
+            sample[-1] += value
+        self.registry.changed()
+
+    @contextmanager
+    def time(self, **labels):
+        ''' Observe the seconds spent in the block, even if it raises. '''
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+
+class Registry:
+    ''' Thread-safe metrics of this process, shared with the other server
+        and worker processes through METRICS_DIR.
+
+        Every process writes its own totals to a JSON file in METRICS_DIR at
+        most every METRICS_FLUSH_SECONDS and when it exits; the process
+        answering ``/metrics`` adds up its live totals and every other
+        file. Files of processes that have exited are kept so that their
+        counts still add up; empty the directory on deploy. Without
+        METRICS_DIR each process only reports its own metrics.
+    '''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self.samples = {}
+        self.filename = f'{os.getpid()}-{uuid.uuid4().hex[:8]}.json'
+        self.flushed = time.monotonic()
+        atexit.register(self.flush)
+
+    def counter(self, name, documentation, labels=()):
+        return self._register(Counter(self, name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(),
+                  buckets=LATENCY_BUCKETS):
+        return self._register(
+            Histogram(self, name, documentation, labels, buckets)
+        )
+
+    def _register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f'Metric {metric.name} is already registered.')
+        self.metrics[metric.name] = metric
+        self.samples[metric.name] = {}
+        return metric
+
+    def reset(self):
+        with self.lock:
+            for samples in self.samples.values():
+                samples.clear()
+
+    def snapshot(self):
+        ''' ``{name: [[label values, value], ...]}`` for JSON. '''
+        with self.lock:
+            return {
+                name: [
+                    [list(key), list(value) if isinstance(value, list)
+                     else value]
+                    for key, value in samples.items()
+                ]
+                for name, samples in self.samples.items()
+            }
+
+    # sharing between processes
+
+    def directory(self):
+        return getattr(settings, 'METRICS_DIR', None)
+
+    def changed(self):
+        interval = getattr(settings, 'METRICS_FLUSH_SECONDS', 5)
+        if self.directory() and time.monotonic() - self.flushed >= interval:
+            self.flush()
+
+    def flush(self):
+        ''' Write this process's totals to its file in METRICS_DIR. '''
+        directory = self.directory()
+        if not directory:
+            return
+        self.flushed = time.monotonic()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, self.filename)
+        temporary = f'{path}.{threading.get_ident()}.tmp'
+        with open(temporary, 'w') as target:
+            json.dump(self.snapshot(), target)
+        os.replace(temporary, path)
+
+    def collect(self):
+        ''' This process's snapshot merged with every other process's. '''
+        snapshots = [self.snapshot()]
+        directory = self.directory()
+        if directory:
+            for path in glob.glob(os.path.join(directory, '*.json')):
+                if os.path.basename(path) == self.filename:
+                    continue
+                try:
+                    with open(path) as source:
+                        snapshots.append(json.load(source))
+                except (OSError, ValueError):
+                    # being replaced or half written; it counts next time
+                    continue
+
+        merged = {name: {} for name in self.metrics}
+        for snapshot in snapshots:
+            for name, samples in snapshot.items():
+                if name not in merged:
+                    continue
+                for key, value in samples:
+                    key = tuple(key)
+                    current = merged[name].get(key)
+                    if current is None:
+                        merged[name][key] = (
+                            list(value) if isinstance(value, list) else value
+                        )
+                    elif isinstance(value, list):
+                        if len(value) != len(current):
+                            # buckets changed between releases
+                            continue
+                        merged[name][key] = [
+                            a + b for a, b in zip(current, value)
+                        ]
+                    else:
+                        merged[name][key] = current + value
+        return merged
+
+    def render(self):
+        ''' Every metric in the Prometheus text exposition format. '''
+        merged = self.collect()
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for key, value in sorted(merged[name].items()):
+                labels = list(zip(metric.labels, key))
+                if metric.kind == COUNTER:
+                    lines.append(f'{name}{_labels(labels)} {_number(value)}')
+                    continue
+                cumulative = 0
+                bounds = [*map(_number, metric.buckets), '+Inf']
+                for bound, count in zip(bounds, value[:-1]):
+                    cumulative += count
+                    lines.append(
+                        f'{name}_bucket{_labels(labels + [("le", bound)])} '
+                        f'{cumulative}'
+                    )
+                lines.append(f'{name}_sum{_labels(labels)} '
+                             f'{_number(value[-1])}')
+                lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(
+        f'{label}="{_escape(value)}"' for label, value in pairs
+    ) + '}'
+
+
+def _escape(value):
+    return (
+        str(value).replace('\\', '\\\\').replace('"', '\\"')
+        .replace('\n', '\\n')
+    )
+
+
+def _number(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+registry = Registry()
+
+REQUEST_DURATION = registry.histogram(
+    'news_http_request_duration_seconds',
+    'Time taken to answer a request, by view.',
+    ('view', 'method', 'status'),
+)
+DB_QUERIES = registry.counter(
+    'news_db_queries_total',
+    'Database queries run while answering requests, by view.',
+    ('view',),
+)
+DB_QUERIES_PER_REQUEST = registry.histogram(
+    'news_db_queries_per_request',
+    'Database queries run per request, by view.',
+    ('view',),
+    buckets=COUNT_BUCKETS,
+)
+NOTIFICATION_RECIPIENTS = registry.histogram(
+    'news_notification_recipients',
+    'Readers emailed per approval, by task.',
+    ('task',),
+    buckets=RECIPIENT_BUCKETS,
+)
+MAIL_DURATION = registry.histogram(
+    'news_send_mail_duration_seconds',
+    'Time taken to send one notification message.',
+)
+MAIL_FAILURES = registry.counter(
+    'news_send_mail_failures_total',
+    'Notification messages the mail server did not accept.',
+)
+X_POST_DURATION = registry.histogram(
+    'news_x_post_duration_seconds',
+    'Time taken to publish a post to X, retries included.',
+)
+X_POST_FAILURES = registry.counter(
+    'news_x_post_failures_total',
+    'Posts to X that failed after their retries.',
+)
+CACHE_REQUESTS = registry.counter(
+    'news_cache_requests_total',
+    'Cache lookups, by cache and result (hit or miss).',
+    ('cache', 'result'),
+)
+
+
+def record_cache(cache, hits=0, misses=0):
+    if hits:
+        CACHE_REQUESTS.inc(hits, cache=cache, result='hit')
+    if misses:
+        CACHE_REQUESTS.inc(misses, cache=cache, result='miss')
+
+
+class MetricsMiddleware:
+    ''' Record the latency and query count of every request by view. '''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        REQUEST_DURATION.observe(
+            elapsed,
+            view=view,
+            method=request.method,
+            status=f'{response.status_code // 100}xx',
+        )
+        DB_QUERIES_PER_REQUEST.observe(queries, view=view)
+        if queries:
+            DB_QUERIES.inc(queries, view=view)
+        return response
+
+
+class MetricsView(View):
+    ''' The metrics of every process in the Prometheus text format, for
+        scrapers at the addresses in METRICS_ALLOWED_IPS.
+    '''
+
+    def get(self, request):
+        allowed = getattr(settings, 'METRICS_ALLOWED_IPS', ())
+        if request.META.get('REMOTE_ADDR') not in allowed:
+            return HttpResponseForbidden()
+        return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,299 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass, field
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import Http404
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+DEFAULT_ORDERING = ('-created_at', '-id')
+
+
+class InvalidCursor(ValueError):
+    '''Raised when a cursor cannot be decoded for the paginated queryset.'''
+
+
+@dataclass
+class KeysetPage:
+    ''' A single page of results produced by the KeysetPaginator.
+
+        :object_list: The rows on this page, in display order.
+        :next_cursor: Opaque cursor for the following page, or None.
+        :previous_cursor: Opaque cursor for the preceding page, or None.
+    '''
+    object_list: list = field(default_factory=list)
+    next_cursor: str = None
+    previous_cursor: str = None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    ''' Seek-method paginator shared by the HTML list views and the API.
+
+        Instead of OFFSET, each page is selected with a range condition on
+        the ordering key (``created_at, id`` by default), so the database
+        walks the index from the cursor position and the cost of a page is
+        the same however deep the client has scrolled.
+
+        :queryset: The queryset (or ``values()`` queryset) to paginate.
+        :page_size: The number of rows per page.
+        :ordering: Field names forming a unique sort key. All fields must
+            share the same direction.
+    '''
+
+    def __init__(self, queryset, page_size=None, ordering=DEFAULT_ORDERING):
+        self.queryset = queryset
+        self.page_size = page_size or settings.KEYSET_PAGE_SIZE
+        self.ordering = tuple(ordering)
+        self.fields = [name.lstrip('-') for name in self.ordering]
+        self.descending = self.ordering[0].startswith('-')
+
+    # cursor encoding
+
+    def encode_cursor(self, row, reverse=False):
+        position = [self._serialize(self._value(row, name))
+                    for name in self.fields]
+        payload = json.dumps({'p': position, 'r': int(reverse)},
+                             separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            position = payload['p']
+            reverse = bool(payload.get('r'))
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise InvalidCursor('Invalid cursor.')
+
+        if not isinstance(position, list) or len(position) != len(self.fields):
+            raise InvalidCursor('Invalid cursor.')
+
+        model = self.queryset.model
+        try:
+            values = [
+                model._meta.get_field(self._model_field(name)).to_python(raw)
+                for name, raw in zip(self.fields, position)
+            ]
+        except Exception:
+            raise InvalidCursor('Invalid cursor.')
+        return values, reverse
+
+    # paging
+
+    def page_queryset(self, cursor=None):
+        ''' Return the sliced queryset that fetches one page (plus one row to
+            detect whether another page follows).
+        '''
+        reverse = False
+        queryset = self.queryset
+        if cursor:
+            values, reverse = self.decode_cursor(cursor)
+            queryset = queryset.filter(self._seek(values, reverse))
+
+        ordering = self._reversed_ordering() if reverse else self.ordering
+        return queryset.order_by(*ordering)[:self.page_size + 1], reverse
+
+    def paginate(self, cursor=None):
+        queryset, reverse = self.page_queryset(cursor)
+        return self.build_page(list(queryset), cursor, reverse)
+
+    def build_page(self, rows, cursor, reverse):
+        ''' Build a KeysetPage from rows fetched in query order, holding up
+            to one more row than the page size.
+        '''
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if reverse:
+            rows.reverse()
+
+        page = KeysetPage(object_list=rows)
+        if not rows:
+            return page
+
+        # moving backwards we always came from a following page, moving
+        # forwards from a cursor we always came from a preceding page
+        if has_more or reverse:
+            page.next_cursor = self.encode_cursor(rows[-1])
+        if (has_more and reverse) or (cursor and not reverse):
+            page.previous_cursor = self.encode_cursor(rows[0], reverse=True)
+        return page
+
+    # helpers
+
+    def _seek(self, values, reverse):
+        # rows strictly after the cursor in the requested direction, as a
+        # lexicographic comparison on the key:
+        # (a < x) OR (a = x AND b < y) ...
+        forwards = self.descending != reverse
+        lookup = 'lt' if forwards else 'gt'
+        clauses = []
+        for index, name in enumerate(self.fields):
+            conditions = {
+                prior: values[i] for i, prior in enumerate(self.fields[:index])
+            }
+            conditions[f'{name}__{lookup}'] = values[index]
+            clauses.append(Q(**conditions))
+
+        # the redundant bound on the leading column (a <= x) lets the
+        # database seek into the index instead of filtering a full walk
+        bound = Q(**{f'{self.fields[0]}__{lookup}e': values[0]})
+        return bound & reduce(or_, clauses)
+
+    def _reversed_ordering(self):
+        return tuple(
+            name[1:] if name.startswith('-') else f'-{name}'
+            for name in self.ordering
+        )
+
+    def _model_field(self, name):
+        # accept either a field name or its attname (e.g. ``author_id``)
+        for model_field in self.queryset.model._meta.concrete_fields:
+            if name in (model_field.name, model_field.attname):
+                return model_field.name
+        return name
+
+    @staticmethod
+    def _value(row, name):
+        if isinstance(row, dict):
+            return row[name]
+        return getattr(row, name)
+
+    @staticmethod
+    def _serialize(value):
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
+
+
+class KeysetPaginationMixin:
+    ''' Mixin for ListView subclasses that pages ``object_list`` with the
+        KeysetPaginator instead of loading the whole queryset.
+
+        :page_size: Number of rows per page (defaults to KEYSET_PAGE_SIZE).
+        :pagination_ordering: The unique sort key used for the cursor.
+        :cursor_query_param: The GET parameter carrying the cursor.
+    '''
+    page_size = None
+    pagination_ordering = DEFAULT_ORDERING
+    cursor_query_param = 'cursor'
+
+    def get_keyset_paginator(self, queryset, page_size):
+        ''' The paginator for ``queryset``; override to supply another
+            one with a ``paginate(cursor)`` method.
+        '''
+        return KeysetPaginator(
+            queryset, page_size=page_size, ordering=self.pagination_ordering
+        )
+
+    def get_context_data(self, **kwargs):
+        paginator = self.get_keyset_paginator(
+            self.object_list, self.page_size
+        )
+        try:
+            page = paginator.paginate(
+                self.request.GET.get(self.cursor_query_param)
+            )
+        except InvalidCursor:
+            raise Http404('Invalid cursor.')
+
+        context = super().get_context_data(
+            object_list=page.object_list, **kwargs
+        )
+        context['page'] = page
+        context['is_paginated'] = page.has_next or page.has_previous
+        context['next_url'] = self._cursor_url(page.next_cursor)
+        context['previous_url'] = self._cursor_url(page.previous_cursor)
+        return context
+
+    def _cursor_url(self, cursor):
+        if cursor is None:
+            return None
+        params = self.request.GET.copy()
+        params[self.cursor_query_param] = cursor
+        return f'?{params.urlencode()}'
+
+
+class KeysetCursorPagination(BasePagination):
+    ''' Django REST framework pagination class backed by KeysetPaginator.
+
+        Responses are shaped as ``{"next": url, "previous": url,
+        "results": [...]}`` with opaque ``cursor`` query parameters. Views
+        may define ``get_keyset_paginator(queryset, page_size)`` to supply
+        their own paginator.
+    '''
+    page_size = None
+    ordering = DEFAULT_ORDERING
+    cursor_query_param = 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.page_size or api_settings.PAGE_SIZE
+        if hasattr(view, 'get_keyset_paginator'):
+            paginator = view.get_keyset_paginator(queryset, page_size)
+        else:
+            paginator = KeysetPaginator(
+                queryset,
+                page_size=page_size,
+                ordering=getattr(view, 'pagination_ordering', self.ordering),
+            )
+        try:
+            self.page = paginator.paginate(
+                request.query_params.get(self.cursor_query_param)
+            )
+        except InvalidCursor:
+            raise NotFound('Invalid cursor.')
+        return self.page.object_list
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        return self._link(self.page.next_cursor)
+
+    def get_previous_link(self):
+        return self._link(self.page.previous_cursor)
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
@@ -0,0 +1,19 @@
+import re
+
+# a plan step that reads the whole table rather than an index
+FULL_SCAN = re.compile(r'\bSCAN (\w+)$')
+
+# a plan step that sorts every matching row before the first one can be
+# returned, which a keyset page should get from index order instead
+TEMP_SORT = re.compile(r'\bUSE TEMP B-TREE FOR .*ORDER BY')
+
+
+def step_detail(line):
+    ''' The description of a step in a line of ``QuerySet.explain()``,
+        without SQLite's leading id, parent and unused columns.
+    '''
+    return line.split(' ', 3)[-1]
+
+
+def has_full_scan(steps):
+    return any(FULL_SCAN.search(step) for step in steps)
@@ -0,0 +1,234 @@
+import cProfile
+import functools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+CPROFILE = 'cprofile'
+SAMPLE = 'sample'
+MODES = (CPROFILE, SAMPLE)
+
+HEADER = 'HTTP_X_PROFILE'
+QUERY_FLAG = '_profile'
+RATE_KEY = 'profiling:rate:{window}'
+
+# file suffixes: cProfile stats, collapsed stacks and the metadata
+PROF = '.prof'
+FOLDED = '.folded'
+META = '.json'
+
+
+class Sampler:
+    ''' A low-overhead statistical profiler for one thread.
+
+        A background thread records the target thread's stack every
+        ``interval`` seconds. The result is in the collapsed-stack format
+        (``outer;inner;leaf count`` per line) read by flamegraph.pl,
+        speedscope and similar tools.
+    '''
+
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f'{code.co_name} ({_short_path(code.co_filename)})'
+                )
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        return ''.join(
+            f'{stack} {count}\n'
+            for stack, count in self.stacks.most_common()
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def _short_path(filename):
+    # site-packages and project paths are long and the same everywhere
+    for marker in ('site-packages' + os.sep, str(settings.BASE_DIR) + os.sep):
+        index = filename.find(marker)
+        if index != -1:
+            return filename[index + len(marker):]
+    return filename
+
+
+def requested_mode(request):
+    mode = request.META.get(HEADER) or request.GET.get(QUERY_FLAG)
+    if not mode:
+        return None
+    mode = mode.strip().lower()
+    # a bare flag asks for the default mode
+    return mode if mode in MODES else CPROFILE
+
+
+def allow_capture():
+    ''' Take one capture from the PROFILE_RATE_LIMIT budget shared by all
+        processes through the cache.
+    '''
+    limit, period = settings.PROFILE_RATE_LIMIT
+    key = RATE_KEY.format(window=int(time.time() // period))
+    if cache.add(key, 1, period):
+        return limit >= 1
+    try:
+        return cache.incr(key) <= limit
+    except ValueError:
+        # expired between add and incr
+        return cache.add(key, 1, period)
+
+
+def capture_name(request, mode):
+    slug = re.sub(r'[^A-Za-z0-9]+', '-', request.path).strip('-') or 'root'
+    stamp = timezone.now().strftime('%Y%m%dT%H%M%S%f')
+    return f'{stamp}-{request.method.lower()}-{slug[:60]}-{mode}'
+
+
+class ProfilingMiddleware:
+    ''' Profile a single request when a staff user asks for it with an
+        ``X-Profile`` header or a ``_profile`` query flag, set to
+        ``cprofile`` (deterministic, the default) or ``sample``.
+
+        cProfile captures are written to PROFILE_DIR as ``.prof`` files
+        for pstats, snakeviz and the like; sampled captures as
+        ``.folded`` collapsed stacks for flame graphs. Each has a ``.json``
+        file describing the request, read by ``manage.py profiles``.
+        Captures are limited to PROFILE_RATE_LIMIT, ``(captures,
+        seconds)``, across all users, and profiling is off while
+        PROFILE_DIR is not set. The response names the capture in its
+        ``X-Profile`` header. Place the middleware after
+        AuthenticationMiddleware.
+    '''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = requested_mode(request)
+        directory = getattr(settings, 'PROFILE_DIR', None)
+        user = getattr(request, 'user', None)
+        if not mode or not directory or not (user and user.is_staff):
+            return self.get_response(request)
+        if not allow_capture():
+            response = self.get_response(request)
+            response['X-Profile'] = 'rate-limited'
+            return response
+
+        name = capture_name(request, mode)
+        started = time.perf_counter()
+        if mode == CPROFILE:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Python 3.12+ allows one cProfile per process at a time
+                response = self.get_response(request)
+                response['X-Profile'] = 'busy'
+                return response
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+            elapsed = time.perf_counter() - started
+            os.makedirs(directory, exist_ok=True)
+            profiler.dump_stats(os.path.join(directory, name + PROF))
+            extra = {'file': name + PROF}
+        else:
+            sampler = Sampler(settings.PROFILE_SAMPLE_INTERVAL).start()
+            try:
+                response = self.get_response(request)
+            finally:
+                sampler.stop()
+            elapsed = time.perf_counter() - started
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, name + FOLDED), 'w') as target:
+                target.write(sampler.collapsed())
+            extra = {'file': name + FOLDED, 'samples': sampler.samples}
+
+        match = request.resolver_match
+        with open(os.path.join(directory, name + META), 'w') as target:
+            json.dump({
+                'name': name,
+                'mode': mode,
+                'method': request.method,
+                'path': request.get_full_path(),
+                'view': match.view_name if match else None,
+                'user': user.get_username(),
+                'status': response.status_code,
+                'duration_ms': round(elapsed * 1000, 1),
+                'captured_at': timezone.now().isoformat(),
+                **extra,
+            }, target, indent=2)
+        response['X-Profile'] = name
+        return response
+
+
+def captures(directory=None):
+    ''' The metadata of every capture in PROFILE_DIR, newest first. '''
+    directory = directory or settings.PROFILE_DIR
+    if not directory or not os.path.isdir(directory):
+        return []
+    found = []
+    for filename in os.listdir(directory):
+        if not filename.endswith(META):
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as source:
+                found.append(json.load(source))
+        except (OSError, ValueError):
+            continue
+    return sorted(found, key=lambda meta: meta['name'], reverse=True)
+
+
+def summarize_folded(path, limit=20):
+    ''' ``(own, total, function)`` sample counts of the busiest functions
+        in a collapsed-stack file: own samples are where the function was
+        running, total ones include what it called.
+    '''
+    own = Counter()
+    total = Counter()
+    with open(path) as source:
+        for line in source:
+            stack, _, count = line.rstrip('\n').rpartition(' ')
+            if not stack:
+                continue
+            count = int(count)
+            frames = stack.split(';')
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+    return [
+        (own[frame], count, frame)
+        for frame, count in sorted(
+            total.items(), key=lambda item: (-own[item[0]], -item[1])
+        )[:limit]
+    ]
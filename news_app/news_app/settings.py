@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -48,14 +49,19 @@ INSTALLED_APPS = [
     'newsletters',
     'subscriptions',
     'articles.apps.ArticlesConfig',
+    'jobs',
 ]
 
 MIDDLEWARE = [
+    'news_app.metrics.MetricsMiddleware',
+    'news_app.timing.ServerTimingMiddleware',
+    'news_app.slow_queries.SlowQueryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'news_app.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -64,7 +70,7 @@ ROOT_URLCONF = 'news_app.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'news_app.timing.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -136,14 +142,99 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
     ),
+    "DEFAULT_PAGINATION_CLASS": "news_app.pagination.KeysetCursorPagination",
+    "PAGE_SIZE": 20,
 }
 
+# page size for the keyset paginated HTML list views
+KEYSET_PAGE_SIZE = 20
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
 }
 
 
+# reader feeds: journalists and newsletters with more subscribers than
+# FEED_FANOUT_LIMIT are merged into feeds at read time instead of being
+# copied into every subscriber's feed on approval
+FEED_FANOUT_LIMIT = 10000
+FEED_PULL_SOURCES_CACHE_SECONDS = 300
+FEED_MAX_ITEMS = 1000
+FEED_BACKFILL_LIMIT = 200
+
+# the ids a reader is subscribed to are cached for subscription checks and
+# feeds, dropped when they subscribe or unsubscribe
+SUBSCRIPTION_SET_CACHE_SECONDS = 60 * 60 * 24
+
+
+# background jobs: failed jobs are retried with exponential backoff from
+# JOB_RETRY_BASE_SECONDS up to JOB_RETRY_MAX_SECONDS, a running job whose
+# worker has not renewed its lease within JOB_LEASE_SECONDS is handed out
+# again (workers renew the leases of the jobs they are running every
+# JOB_LEASE_RENEW_SECONDS), and successful jobs are purged after
+# JOB_RETENTION_DAYS
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BASE_SECONDS = 30
+JOB_RETRY_MAX_SECONDS = 3600
+JOB_LEASE_SECONDS = 600
+JOB_LEASE_RENEW_SECONDS = 60
+JOB_RETENTION_DAYS = 7
+
+
+# reader pages are cached for PAGE_CACHE_SECONDS, and anonymous visitors'
+# browsers may reuse them for PAGE_CACHE_BROWSER_SECONDS. With several
+# server processes CACHES must point at a shared cache (e.g. Redis or
+# Memcached) so that invalidation reaches all of them
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+PAGE_CACHE_SECONDS = 600
+PAGE_CACHE_BROWSER_SECONDS = 60
+
+# rendered article cards are keyed on the article's updated_at, so an
+# edited article gets a new card at once and the old one just expires
+ARTICLE_CARD_CACHE_SECONDS = 60 * 60 * 24
+
+
+# SERVER_TIMING_SAMPLE_RATE of requests have their time in SQL, templates,
+# signal receivers and X posts measured and logged to news.timing; with
+# SERVER_TIMING_HEADER the totals are also sent in a Server-Timing header,
+# which browsers show in their developer tools
+SERVER_TIMING_SAMPLE_RATE = 0.01
+SERVER_TIMING_HEADER = DEBUG
+
+
+# runtime metrics are served at /metrics to METRICS_ALLOWED_IPS. With
+# several server or worker processes, point METRICS_DIR at a directory
+# they all can write: each saves its totals there every
+# METRICS_FLUSH_SECONDS and /metrics adds them up
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+METRICS_DIR = None
+METRICS_FLUSH_SECONDS = 5
+
+
+# staff can profile a request with an X-Profile: cprofile|sample header or
+# a ?_profile= flag. Captures are written to PROFILE_DIR (profiling is off
+# while it is None), at most PROFILE_RATE_LIMIT = (captures, seconds);
+# the sampler records the stack every PROFILE_SAMPLE_INTERVAL seconds
+PROFILE_DIR = None
+PROFILE_RATE_LIMIT = (10, 60 * 60)
+PROFILE_SAMPLE_INTERVAL = 0.005
+
+
+# queries of a request taking SLOW_QUERY_MS or longer are logged with
+# their view and query plan to SLOW_QUERY_LOG, rotated at
+# SLOW_QUERY_LOG_BYTES with SLOW_QUERY_LOG_BACKUPS old files kept, and
+# summarized by manage.py slow_queries. None turns the log off
+SLOW_QUERY_MS = 100
+SLOW_QUERY_LOG = BASE_DIR / 'slow_queries.log'
+SLOW_QUERY_LOG_BYTES = 10 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 5
+
+
 # enforce login redirects
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/dashboard/'
@@ -154,22 +245,70 @@ LOGOUT_REDIRECT_URL = '/login/'
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = 'news_app@example.com'
 
+# notification emails are sent as one Bcc message per EMAIL_CHUNK_SIZE
+# subscribers ('bcc') or as one message per subscriber ('individual')
+EMAIL_DELIVERY_MODE = 'bcc'
+EMAIL_CHUNK_SIZE = 50
+
 
 # X (Twitter) API Settings
 X_API_BASE_URL = 'https://api.twitter.com/2/'
-X_BEARER_TOKEN = 'REPLACE_WITH_ENV_VAR'
-# For Production, use environment variables:
-# import os
-# X_BEARER_TOKEN = os.getenv('X_BEARER_TOKEN')
+# read from the environment; while it is empty nothing is posted to X and
+# scheduled posts wait in the queue
+X_BEARER_TOKEN = os.getenv('X_BEARER_TOKEN', '')
+
+# the X client keeps up to X_POOL_SIZE connections open, retries requests
+# X did not process up to X_MAX_RETRIES times with jittered backoff between
+# X_BACKOFF_BASE and X_BACKOFF_MAX seconds (or the Retry-After it sends,
+# up to X_RETRY_AFTER_MAX), and stops calling X for X_BREAKER_RESET_SECONDS
+# after X_BREAKER_THRESHOLD consecutive failures
+X_POOL_SIZE = 10
+X_TIMEOUT = (3.05, 5)
+X_MAX_RETRIES = 3
+X_BACKOFF_BASE = 0.5
+X_BACKOFF_MAX = 8
+X_RETRY_AFTER_MAX = 30
+X_BREAKER_THRESHOLD = 5
+X_BREAKER_RESET_SECONDS = 60
+
+# outbound social posts: each account has a token bucket of
+# SOCIAL_POST_CAPACITY posts refilled at one post per
+# SOCIAL_POST_REFILL_SECONDS (override per account, along with its
+# 'token', in SOCIAL_ACCOUNTS). Approvals within SOCIAL_COALESCE_WINDOW
+# seconds are gathered, and a backlog larger than the budget goes out as a
+# 'digest' or a 'thread'. A post X keeps failing is retried with backoff
+# and marked failed after SOCIAL_POST_MAX_ATTEMPTS, or at once if X
+# rejects it outright (e.g. as a duplicate)
+SOCIAL_ACCOUNTS = {
+    'default': {},
+}
+SOCIAL_POST_CAPACITY = 10
+SOCIAL_POST_REFILL_SECONDS = 360
+SOCIAL_COALESCE_WINDOW = 30
+SOCIAL_COALESCE_MODE = 'digest'
+SOCIAL_POST_MAX_ATTEMPTS = 5
 
 # logging errors for when tweeting fails
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        'message': {
+            'format': '%(message)s',
+        },
+    },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
         },
+        'slow_queries': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': SLOW_QUERY_LOG,
+            'maxBytes': SLOW_QUERY_LOG_BYTES,
+            'backupCount': SLOW_QUERY_LOG_BACKUPS,
+            'formatter': 'message',
+            'delay': True,
+        },
     },
     'loggers': {
         'django': {
@@ -181,5 +320,25 @@ LOGGING = {
             'level': 'ERROR',
             'propagate': False,
             },
+        'news.email': {
+            'handlers': ['console'],
+            'level': 'ERROR',
+            'propagate': False,
+            },
+        'news.jobs': {
+            'handlers': ['console'],
+            'level': 'ERROR',
+            'propagate': False,
+            },
+        'news.timing': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+            },
+        'news.slow_queries': {
+            'handlers': ['slow_queries'],
+            'level': 'INFO',
+            'propagate': False,
+            },
         },
 }
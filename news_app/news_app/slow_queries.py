@@ -0,0 +1,164 @@
+import hashlib
+import json
+import logging
+import re
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from news_app.plans import has_full_scan
+
+logger = logging.getLogger('news.slow_queries')
+
+# longest parameter value kept in the log
+MAX_PARAM_LENGTH = 200
+
+_view = ContextVar('slow_query_view', default=None)
+_explaining = ContextVar('slow_query_explaining', default=False)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|\?')
+_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_SPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    ''' The SQL with literals and placeholders replaced by ``?`` and
+        ``IN`` lists collapsed, so that the same query with other values
+        groups together.
+    '''
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _LIST.sub('(...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def fingerprint_id(normalized):
+    return hashlib.md5(normalized.encode()).hexdigest()[:12]
+
+
+def is_select(sql):
+    return sql.lstrip().upper().startswith(('SELECT', 'WITH'))
+
+
+def explain(connection, sql, params):
+    ''' The query plan of a SELECT as a list of steps, or None. '''
+    if not is_select(sql):
+        return None
+    prefix = connection.ops.explain_query_prefix()
+    token = _explaining.set(True)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}', params)
+            rows = cursor.fetchall()
+    except Exception as exc:
+        return [f'EXPLAIN failed: {exc}']
+    finally:
+        _explaining.reset(token)
+    # SQLite answers (id, parent, notused, detail), others one column
+    return [str(row[-1]) for row in rows]
+
+
+def _json_params(params):
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        params = params.values()
+    values = []
+    for value in params:
+        if isinstance(value, (bytes, memoryview)):
+            value = f'<{len(value)} bytes>'
+        elif not isinstance(value, (int, float, bool, type(None))):
+            value = str(value)
+            if len(value) > MAX_PARAM_LENGTH:
+                value = value[:MAX_PARAM_LENGTH] + '…'
+        values.append(value)
+    return values
+
+
+def log_slow_query(connection, sql, params, many, duration):
+    normalized = fingerprint(sql)
+    plan = None if many else explain(connection, sql, params)
+    logger.info(json.dumps({
+        'time': timezone.now().isoformat(),
+        'view': _view.get(),
+        'fingerprint': fingerprint_id(normalized),
+        'normalized': normalized,
+        'sql': sql,
+        'params': _json_params(params) if is_select(sql) else None,
+        'many': many,
+        'duration_ms': round(duration * 1000, 2),
+        'plan': plan,
+        'full_scan': bool(plan) and has_full_scan(plan),
+    }))
+
+
+def _wrapper(execute, sql, params, many, context):
+    if _explaining.get():
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = time.perf_counter() - started
+    if duration * 1000 >= settings.SLOW_QUERY_MS:
+        try:
+            log_slow_query(context['connection'], sql, params, many, duration)
+        except Exception:
+            logger.exception('Could not log a slow query.')
+    return result
+
+
+class SlowQueryMiddleware:
+    ''' Log every query of a request that takes SLOW_QUERY_MS or longer to
+        the ``news.slow_queries`` logger as a JSON line, with the view that
+        ran it, a fingerprint grouping it with the same query for other
+        values, its parameters (for SELECTs only, as writes carry session
+        data and password hashes), duration and query plan. Settings route
+        the logger to the rotating SLOW_QUERY_LOG file read by
+        ``manage.py slow_queries``. A SLOW_QUERY_MS of None turns it off.
+    '''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if getattr(settings, 'SLOW_QUERY_MS', None) is None:
+            return self.get_response(request)
+        token = _view.set(None)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_wrapper))
+                return self.get_response(request)
+        finally:
+            _view.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        _view.set(match.view_name if match else view_func.__name__)
+
+
+def read_log(path):
+    ''' Yield the entries of a slow query log and its rotated backups,
+        oldest first.
+    '''
+    paths = []
+    for number in range(getattr(settings, 'SLOW_QUERY_LOG_BACKUPS', 0), 0, -1):
+        paths.append(f'{path}.{number}')
+    paths.append(str(path))
+    for current in paths:
+        try:
+            source = open(current)
+        except FileNotFoundError:
+            continue
+        with source:
+            for line in source:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
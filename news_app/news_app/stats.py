@@ -0,0 +1,9 @@
+import math
+
+
+def percentile(ordered, percent):
+    ''' The nearest-rank percentile of a sorted list. '''
+    if not ordered:
+        return None
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
@@ -0,0 +1,177 @@
+import functools
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger('news.timing')
+
+SQL = 'sql'
+TEMPLATE = 'template'
+SIGNALS = 'signals'
+X = 'x'
+# in the order they appear in the Server-Timing header
+METRICS = (SQL, TEMPLATE, SIGNALS, X)
+
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    ''' Time and call counts by metric for one request. Nested measurements
+        of the same metric, e.g. a template rendered from a template tag,
+        are counted once, as part of the outermost one. Different metrics
+        overlap: queries run by a signal receiver count towards both
+        ``sql`` and ``signals``.
+    '''
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.totals = dict.fromkeys(METRICS, 0.0)
+        self.counts = dict.fromkeys(METRICS, 0)
+        self.depth = dict.fromkeys(METRICS, 0)
+
+    def add(self, metric, seconds, count=1):
+        self.totals[metric] = self.totals.get(metric, 0.0) + seconds
+        self.counts[metric] = self.counts.get(metric, 0) + count
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def header(self, total=None):
+        ''' The ``Server-Timing`` header value, durations in milliseconds. '''
+        parts = [
+            f'{metric};dur={self.totals[metric] * 1000:.1f};'
+            f'desc="{self.counts[metric]}"'
+            for metric in METRICS
+            if self.counts[metric]
+        ]
+        parts.append(f'total;dur={(total or self.elapsed) * 1000:.1f}')
+        return ', '.join(parts)
+
+    def as_dict(self, total=None):
+        data = {'total_ms': round((total or self.elapsed) * 1000, 1)}
+        for metric in METRICS:
+            data[f'{metric}_ms'] = round(self.totals[metric] * 1000, 1)
+            data[f'{metric}_count'] = self.counts[metric]
+        return data
+
+
+def current():
+    ''' The timings of the request being handled, or None when it is not
+        sampled or there is no request.
+    '''
+    return _current.get()
+
+
+@contextmanager
+def measure(metric):
+    ''' Add the time spent in the block to ``metric`` of the current
+        request. Costs one lookup when the request is not sampled.
+    '''
+    timings = _current.get()
+    if timings is None or timings.depth.get(metric):
+        yield
+        return
+    timings.depth[metric] = 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.depth[metric] = 0
+        timings.add(metric, time.perf_counter() - started)
+
+
+def timed(metric):
+    ''' Decorator form of ``measure``. '''
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with measure(metric):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _sql_wrapper(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add(SQL, time.perf_counter() - started)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with measure(TEMPLATE):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    ''' The Django template backend, with rendering time counted towards
+        the request's ``template`` metric.
+    '''
+
+    def from_string(self, template_code):
+        return TimedTemplate(
+            super().from_string(template_code).template, self
+        )
+
+    def get_template(self, template_name):
+        return TimedTemplate(
+            super().get_template(template_name).template, self
+        )
+
+
+class ServerTimingMiddleware:
+    ''' Time SQL, template rendering, signal receivers and X posts for a
+        sample of requests, and report the totals in a ``Server-Timing``
+        header and a JSON log line on the ``news.timing`` logger.
+
+        ``SERVER_TIMING_SAMPLE_RATE`` is the share of requests that are
+        measured; the rest only pay for one random number.
+        ``SERVER_TIMING_HEADER`` controls whether sampled responses carry
+        the header, which shows anyone how long the server spends on
+        what. Place the middleware first so that the total includes the
+        other middleware.
+    '''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = getattr(settings, 'SERVER_TIMING_SAMPLE_RATE', 0)
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return self.get_response(request)
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(_sql_wrapper)
+                    )
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        total = timings.elapsed
+        if getattr(settings, 'SERVER_TIMING_HEADER', False):
+            response['Server-Timing'] = timings.header(total)
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            **timings.as_dict(total),
+        }))
+        return response
@@ -22,6 +22,7 @@ from rest_framework_simplejwt.views import (
 )
 from django.contrib.auth.views import LoginView, LogoutView
 from users.views import RegisterView, EntryPointView
+from news_app.metrics import MetricsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -42,4 +43,7 @@ urlpatterns = [
     path('', include('subscriptions.urls')),
     # API endpoints
     path("api/", include("articles.api.urls")),
+    path("api/", include("jobs.api.urls")),
+    # Prometheus scrape endpoint
+    path('metrics', MetricsView.as_view(), name='metrics'),
 ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-17 09:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0003_alter_article_options_and_more'),
+        ('newsletters', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='newsletter',
+            options={'ordering': ('-created_at', '-id')},
+        ),
+        migrations.AddIndex(
+            model_name='newsletter',
+            index=models.Index(fields=['-created_at', '-id'], name='newsletter_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='newsletter',
+            index=models.Index(fields=['author', '-created_at', '-id'], name='newsletter_author_created_idx'),
+        ),
+    ]
@@ -22,5 +22,18 @@ class Newsletter(models.Model):
     articles = models.ManyToManyField('articles.Article')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        ordering = ('-created_at', '-id')
+        indexes = [
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='newsletter_created_idx',
+            ),
+            models.Index(
+                fields=['author', '-created_at', '-id'],
+                name='newsletter_author_created_idx',
+            ),
+        ]
+
     def __str__(self):
         return self.title
@@ -8,12 +8,13 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from users.mixins import JournalistRequiredMixin, EditorRequiredMixin
 from .models import Newsletter
 from .forms import NewsletterForm
-from subscriptions.models import NewsletterSubscription
+from news_app.pagination import KeysetPaginationMixin
 
 
 class JournalistNewsletterListView(
     LoginRequiredMixin,
     JournalistRequiredMixin,
+    KeysetPaginationMixin,
     ListView
 ):
     ''' A view to allow Journalists to view newsletters
@@ -117,6 +118,7 @@ class JournalistNewsletterDeleteView(
 class EditorNewsletterListView(
     LoginRequiredMixin,
     EditorRequiredMixin,
+    KeysetPaginationMixin,
     ListView
 ):
     ''' A view to allow editors to view Newsletters.
@@ -210,6 +212,7 @@ class EditorNewsletterDeleteView(
 
 class ReaderNewsletterListView(
     LoginRequiredMixin,
+    KeysetPaginationMixin,
     ListView
 ):
     ''' A view to allow readers to view newsletters they are subscribed to.
@@ -233,20 +236,16 @@ class ReaderNewsletterDetailView(
 
         :model: Newsletter
         :template_name: The template to render the newsletter detail view.
-        :def get_context_data: Method to add additional context data,
-            including articles and subscription status.
+        :def get_context_data: Method to add the newsletter's approved
+            articles.
     '''
     model = Newsletter
     template_name = 'newsletters/reader_newsletter_detail.html'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['articles'] = self.object.articles.filter(approved=True)
-
-        if self.request.user.is_authenticated and self.request.user.role == 'reader':
-            context['is_subscribed'] = NewsletterSubscription.objects.filter(
-                reader=self.request.user,
-                newsletter=self.object
-            ).exists()
+        context['articles'] = self.object.articles.filter(
+            approved=True
+        ).select_related('author').defer('content')
 
         return context
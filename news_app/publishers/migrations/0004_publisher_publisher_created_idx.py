@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-17 09:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('publishers', '0003_publisher_created_at_publisher_description_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='publisher',
+            index=models.Index(fields=['-created_at', '-id'], name='publisher_created_idx'),
+        ),
+    ]
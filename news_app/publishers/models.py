@@ -32,5 +32,13 @@ class Publisher(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='publisher_created_idx',
+            ),
+        ]
+
     def __str__(self):
         return self.name
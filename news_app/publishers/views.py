@@ -5,6 +5,7 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from users.mixins import EditorRequiredMixin
 from .models import Publisher
 from .forms import PublisherForm
+from news_app.pagination import KeysetPaginationMixin
 
 
 class PublisherCreateView(
@@ -48,6 +49,7 @@ class PublisherUpdateView(
 class PublisherListView(
     LoginRequiredMixin,
     EditorRequiredMixin,
+    KeysetPaginationMixin,
     ListView
 ):
     ''' A view for editors to see a list of the publishers.
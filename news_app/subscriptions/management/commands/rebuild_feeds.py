@@ -0,0 +1,52 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from subscriptions.services import feed
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    ''' Backfill or trim the precomputed reader feeds.
+
+        By default every reader's feed is rebuilt from their current
+        subscriptions. ``--trim`` only drops entries beyond FEED_MAX_ITEMS.
+    '''
+    help = 'Rebuild or trim the precomputed reader feeds.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reader',
+            type=int,
+            action='append',
+            dest='readers',
+            help='Only process the reader with this id (repeatable).',
+        )
+        parser.add_argument(
+            '--trim',
+            action='store_true',
+            help='Only trim feeds to FEED_MAX_ITEMS instead of rebuilding.',
+        )
+
+    def handle(self, *args, **options):
+        readers = User.objects.filter(role='reader')
+        if options['readers']:
+            readers = readers.filter(pk__in=options['readers'])
+
+        processed = 0
+        trimmed = 0
+        for reader_id in readers.values_list('pk', flat=True).iterator():
+            if options['trim']:
+                trimmed += feed.trim_feed(reader_id)
+            else:
+                feed.rebuild_feed(reader_id)
+            processed += 1
+
+        if options['trim']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Trimmed {trimmed} entries from {processed} feeds.'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Rebuilt {processed} feeds.'
+            ))
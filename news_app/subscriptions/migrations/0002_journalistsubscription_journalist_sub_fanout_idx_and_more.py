@@ -0,0 +1,24 @@
+# Generated by Django 6.0.1 on 2026-10-17 09:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsletters', '0003_alter_newsletter_options_and_more'),
+        ('subscriptions', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='journalistsubscription',
+            index=models.Index(fields=['journalist', 'reader'], name='journalist_sub_fanout_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='newslettersubscription',
+            index=models.Index(fields=['newsletter', 'reader'], name='newsletter_sub_fanout_idx'),
+        ),
+    ]
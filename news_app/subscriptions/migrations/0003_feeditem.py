@@ -0,0 +1,30 @@
+# Generated by Django 6.0.1 on 2026-10-17 10:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0004_article_search_index'),
+        ('subscriptions', '0002_journalistsubscription_journalist_sub_fanout_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_items', to='articles.article')),
+                ('reader', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_items', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['reader', '-created_at', '-article'], name='feed_item_reader_idx')],
+                'constraints': [models.UniqueConstraint(fields=('reader', 'article'), name='feed_item_unique_article')],
+            },
+        ),
+    ]
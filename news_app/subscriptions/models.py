@@ -27,6 +27,13 @@ class JournalistSubscription(models.Model):
 
     class Meta:
         unique_together = ('reader', 'journalist')
+        indexes = [
+            # subscriber lookups when a journalist's article is approved
+            models.Index(
+                fields=['journalist', 'reader'],
+                name='journalist_sub_fanout_idx',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.reader} subscribed to {self.journalist}'
@@ -55,6 +62,54 @@ class NewsletterSubscription(models.Model):
 
     class Meta:
         unique_together = ('reader', 'newsletter')
+        indexes = [
+            # subscriber lookups when a newsletter article is approved
+            models.Index(
+                fields=['newsletter', 'reader'],
+                name='newsletter_sub_fanout_idx',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.reader} subscribed to {self.newsletter}'
+
+
+class FeedItem(models.Model):
+    ''' A precomputed entry in a reader's subscribed article feed.
+
+        Rows are written when an article is approved or added to a
+        newsletter (fan-out on write), so reading a feed is one range scan
+        of the reader's index instead of resolving every subscription.
+
+        :reader: ForeignKey to the User model representing the reader.
+        :article: ForeignKey to the approved Article in the feed.
+        :created_at: Copy of the article's created_at, the feed sort key.
+    '''
+    reader = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_items'
+    )
+    article = models.ForeignKey(
+        'articles.Article',
+        on_delete=models.CASCADE,
+        related_name='feed_items'
+    )
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['reader', 'article'],
+                name='feed_item_unique_article',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['reader', '-created_at', '-article'],
+                name='feed_item_reader_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.article} in feed of {self.reader}'
@@ -0,0 +1,360 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Exists, OuterRef, Q
+
+from articles.models import Article
+from news_app import metrics
+from news_app.pagination import KeysetPaginator
+from subscriptions.models import (
+    FeedItem,
+    JournalistSubscription,
+    NewsletterSubscription,
+)
+from subscriptions.services import subscription_sets
+
+FEED_ORDERING = ('-created_at', '-article_id')
+ARTICLE_ORDERING = ('-created_at', '-id')
+
+PULL_SOURCES_CACHE_KEY = 'feed:pull-sources'
+
+# rows per INSERT when fanning out to many readers
+BATCH_SIZE = 1000
+
+
+def pull_sources():
+    ''' Return the journalist ids and newsletter ids whose subscriber counts
+        exceed FEED_FANOUT_LIMIT. Their articles are not copied into every
+        reader's feed; they are pulled in when a feed is read.
+
+        The result is cached for FEED_PULL_SOURCES_CACHE_SECONDS.
+    '''
+    sources = cache.get(PULL_SOURCES_CACHE_KEY)
+    if sources is None:
+        metrics.record_cache('feed_pull_sources', misses=1)
+        limit = settings.FEED_FANOUT_LIMIT
+        authors = frozenset(
+            JournalistSubscription.objects.values('journalist')
+            .annotate(readers=Count('id'))
+            .filter(readers__gt=limit)
+            .values_list('journalist', flat=True)
+        )
+        newsletters = frozenset(
+            NewsletterSubscription.objects.values('newsletter')
+            .annotate(readers=Count('id'))
+            .filter(readers__gt=limit)
+            .values_list('newsletter', flat=True)
+        )
+        sources = (authors, newsletters)
+        cache.set(
+            PULL_SOURCES_CACHE_KEY,
+            sources,
+            settings.FEED_PULL_SOURCES_CACHE_SECONDS,
+        )
+    else:
+        metrics.record_cache('feed_pull_sources', hits=1)
+    return sources
+
+
+def _insert(rows):
+    ''' Insert (reader_id, article_id, created_at) rows in batches, skipping
+        entries already present.
+    '''
+    batch = []
+    for reader_id, article_id, created_at in rows:
+        batch.append(FeedItem(
+            reader_id=reader_id,
+            article_id=article_id,
+            created_at=created_at,
+        ))
+        if len(batch) >= BATCH_SIZE:
+            FeedItem.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        FeedItem.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def _batches(reader_ids, size=BATCH_SIZE):
+    batch = []
+    for reader_id in reader_ids:
+        batch.append(reader_id)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def fan_out_article(article):
+    ''' Push a newly approved article into the feeds of the readers
+        subscribed to its author or to a newsletter that includes it.
+    '''
+    if not article.approved:
+        return
+
+    pull_authors, pull_newsletters = pull_sources()
+    readers = NewsletterSubscription.objects.filter(
+        newsletter__articles=article
+    ).exclude(
+        newsletter_id__in=pull_newsletters
+    ).values_list('reader_id', flat=True)
+
+    if article.author_id not in pull_authors:
+        readers = readers.union(
+            JournalistSubscription.objects.filter(
+                journalist_id=article.author_id
+            ).values_list('reader_id', flat=True)
+        )
+
+    for reader_ids in _batches(readers.iterator()):
+        _insert(
+            (reader_id, article.pk, article.created_at)
+            for reader_id in reader_ids
+        )
+        trim_feeds(reader_ids)
+
+
+def fan_out_newsletter_articles(newsletter_id, article_ids):
+    ''' Push approved articles that were added to a newsletter into the
+        feeds of the newsletter's subscribers.
+    '''
+    if newsletter_id in pull_sources()[1]:
+        return
+
+    articles = list(
+        Article.objects.filter(pk__in=article_ids, approved=True)
+        .values_list('pk', 'created_at')
+    )
+    if not articles:
+        return
+
+    readers = NewsletterSubscription.objects.filter(
+        newsletter_id=newsletter_id
+    ).values_list('reader_id', flat=True)
+    for reader_ids in _batches(readers.iterator()):
+        _insert(
+            (reader_id, article_id, created_at)
+            for reader_id in reader_ids
+            for article_id, created_at in articles
+        )
+        trim_feeds(reader_ids)
+
+
+def remove_article(article_id):
+    '''Remove an article that is no longer approved from every feed.'''
+    FeedItem.objects.filter(article_id=article_id).delete()
+
+
+def remove_articles(article_ids):
+    '''Remove several articles that are no longer approved from every feed.'''
+    FeedItem.objects.filter(article_id__in=article_ids).delete()
+
+
+def _reachable(reader_id):
+    ''' Q matching the articles a reader still reaches through any of
+        their subscriptions.
+    '''
+    return (
+        Q(article__author__subscribed_readers__reader_id=reader_id) |
+        Q(article__newsletter__subscribed_readers__reader_id=reader_id)
+    )
+
+
+def remove_newsletter_articles(newsletter_id, article_ids):
+    ''' Remove articles taken out of a newsletter from its subscribers'
+        feeds, unless a reader still reaches them another way.
+    '''
+    readers = NewsletterSubscription.objects.filter(
+        newsletter_id=newsletter_id
+    ).values('reader_id')
+    # one DELETE for every subscriber, keeping the rows whose reader still
+    # follows the author or another newsletter with the article
+    still_reachable = Exists(JournalistSubscription.objects.filter(
+        reader_id=OuterRef('reader_id'),
+        journalist_id=OuterRef('article__author_id'),
+    )) | Exists(NewsletterSubscription.objects.filter(
+        reader_id=OuterRef('reader_id'),
+        newsletter__articles=OuterRef('article_id'),
+    ))
+    FeedItem.objects.filter(
+        reader_id__in=readers, article_id__in=article_ids
+    ).exclude(still_reachable).delete()
+
+
+def backfill_journalist(reader_id, journalist_id):
+    ''' Seed a reader's feed with a new journalist subscription's most
+        recent approved articles.
+    '''
+    if journalist_id in pull_sources()[0]:
+        return
+    articles = Article.objects.filter(
+        author_id=journalist_id, approved=True
+    ).values_list('pk', 'created_at')[:settings.FEED_BACKFILL_LIMIT]
+    _insert((reader_id, pk, created_at) for pk, created_at in articles)
+    trim_feed(reader_id)
+
+
+def backfill_newsletter(reader_id, newsletter_id):
+    ''' Seed a reader's feed with a new newsletter subscription's most
+        recent approved articles.
+    '''
+    if newsletter_id in pull_sources()[1]:
+        return
+    articles = Article.objects.filter(
+        newsletter__id=newsletter_id, approved=True
+    ).values_list('pk', 'created_at')[:settings.FEED_BACKFILL_LIMIT]
+    _insert((reader_id, pk, created_at) for pk, created_at in articles)
+    trim_feed(reader_id)
+
+
+def unfollow(reader_id, journalist_id=None, newsletter_id=None):
+    ''' Remove the articles of a cancelled subscription from a reader's
+        feed, keeping any the reader still reaches another way.
+    '''
+    items = FeedItem.objects.filter(reader_id=reader_id)
+    if journalist_id is not None:
+        items = items.filter(article__author_id=journalist_id)
+    if newsletter_id is not None:
+        items = items.filter(article__newsletter__id=newsletter_id)
+    FeedItem.objects.filter(
+        pk__in=items.exclude(_reachable(reader_id)).values('pk')
+    ).delete()
+
+
+def rebuild_feed(reader_id):
+    ''' Recompute a reader's feed from their current subscriptions, keeping
+        the newest FEED_MAX_ITEMS articles.
+    '''
+    pull_authors, pull_newsletters = pull_sources()
+    journalist_ids = JournalistSubscription.objects.filter(
+        reader_id=reader_id
+    ).exclude(
+        journalist_id__in=pull_authors
+    ).values('journalist_id')
+    newsletter_ids = NewsletterSubscription.objects.filter(
+        reader_id=reader_id
+    ).exclude(
+        newsletter_id__in=pull_newsletters
+    ).values('newsletter_id')
+
+    articles = Article.objects.filter(
+        Q(author_id__in=journalist_ids) |
+        Q(newsletter__id__in=newsletter_ids),
+        approved=True,
+    ).distinct().values_list('pk', 'created_at')[:settings.FEED_MAX_ITEMS]
+
+    FeedItem.objects.filter(reader_id=reader_id).delete()
+    _insert((reader_id, pk, created_at) for pk, created_at in articles)
+
+
+def trim_feed(reader_id, keep=None):
+    ''' Delete a reader's feed entries beyond the newest ``keep`` (default
+        FEED_MAX_ITEMS). Older articles remain reachable through the
+        journalist and newsletter article lists.
+    '''
+    keep = keep or settings.FEED_MAX_ITEMS
+    cutoff = FeedItem.objects.filter(
+        reader_id=reader_id
+    ).order_by(*FEED_ORDERING).values_list(
+        'created_at', 'article_id'
+    )[keep:keep + 1].first()
+    if cutoff is None:
+        return 0
+
+    created_at, article_id = cutoff
+    deleted, _ = FeedItem.objects.filter(
+        Q(created_at__lt=created_at) |
+        Q(created_at=created_at, article_id__lte=article_id),
+        reader_id=reader_id,
+    ).delete()
+    return deleted
+
+
+def trim_feeds(reader_ids, keep=None):
+    ''' Trim the feeds among ``reader_ids`` that hold more than ``keep``
+        (default FEED_MAX_ITEMS) entries, found with one query, so that
+        fan-outs do not grow active readers' feeds without bound.
+    '''
+    keep = keep or settings.FEED_MAX_ITEMS
+    over = FeedItem.objects.filter(
+        reader_id__in=reader_ids
+    ).values('reader_id').annotate(
+        items=Count('pk')
+    ).filter(items__gt=keep).values_list('reader_id', flat=True)
+    return sum(trim_feed(reader_id, keep) for reader_id in over)
+
+
+class FeedPaginator:
+    ''' Keyset paginator over a reader's feed.
+
+        Pushed articles come from the reader's FeedItem rows. Articles from
+        high-subscriber journalists and newsletters (see ``pull_sources``)
+        are pulled from the article table with the same cursor and merged
+        in, so the feed reads the same whichever way an article arrived.
+
+        :reader: The reader whose feed is paginated.
+        :items: The reader's FeedItem queryset.
+        :page_size: The number of articles per page.
+    '''
+
+    def __init__(self, reader, items, page_size=None):
+        self.reader = reader
+        self.items = KeysetPaginator(
+            items.select_related(
+                'article__author', 'article__publisher'
+            ).defer('article__content'),
+            page_size=page_size,
+            ordering=FEED_ORDERING,
+        )
+        self.page_size = self.items.page_size
+
+    def pulled_articles(self):
+        pull_authors, pull_newsletters = pull_sources()
+        if not pull_authors and not pull_newsletters:
+            return None
+
+        subscriptions = subscription_sets.for_reader(self.reader)
+        journalist_ids = [
+            journalist_id for journalist_id in subscriptions.journalist_ids
+            if journalist_id in pull_authors
+        ]
+        newsletter_ids = [
+            newsletter_id for newsletter_id in subscriptions.newsletter_ids
+            if newsletter_id in pull_newsletters
+        ]
+        if not journalist_ids and not newsletter_ids:
+            return None
+
+        return Article.objects.filter(
+            Q(author_id__in=journalist_ids) |
+            Q(newsletter__id__in=newsletter_ids),
+            approved=True,
+        ).distinct().select_related('author', 'publisher').defer('content')
+
+    def paginate(self, cursor=None):
+        items, reverse = self.items.page_queryset(cursor)
+        rows = [item.article for item in items]
+
+        pulled = self.pulled_articles()
+        articles = KeysetPaginator(
+            pulled if pulled is not None else Article.objects.none(),
+            page_size=self.page_size,
+            ordering=ARTICLE_ORDERING,
+        )
+        if pulled is not None:
+            queryset, _ = articles.page_queryset(cursor)
+            rows = self._merge(rows, list(queryset), reverse)
+
+        return articles.build_page(rows, cursor, reverse)
+
+    def _merge(self, pushed, pulled, reverse):
+        seen = set()
+        merged = []
+        for article in sorted(
+            pushed + pulled,
+            key=lambda article: (article.created_at, article.pk),
+            reverse=not reverse,
+        ):
+            if article.pk not in seen:
+                seen.add(article.pk)
+                merged.append(article)
+        return merged[:self.page_size + 1]
@@ -0,0 +1,82 @@
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from news_app import metrics
+from subscriptions.models import JournalistSubscription, NewsletterSubscription
+
+CACHE_KEY = 'subscriptions:set:{reader_id}'
+
+
+def _contains(ids, value):
+    index = bisect_left(ids, value)
+    return index < len(ids) and ids[index] == value
+
+
+class SubscriptionSet:
+    ''' The journalist and newsletter ids a reader is subscribed to, as
+        sorted arrays of ints. They pickle to a few bytes per id and are
+        searched by bisection, so a subscription check needs no query.
+    '''
+    __slots__ = ('journalist_ids', 'newsletter_ids')
+
+    def __init__(self, journalist_ids=(), newsletter_ids=()):
+        self.journalist_ids = array('q', sorted(journalist_ids))
+        self.newsletter_ids = array('q', sorted(newsletter_ids))
+
+    def follows_journalist(self, journalist_id):
+        return _contains(self.journalist_ids, journalist_id)
+
+    def follows_newsletter(self, newsletter_id):
+        return _contains(self.newsletter_ids, newsletter_id)
+
+    def __repr__(self):
+        return (
+            f'<SubscriptionSet journalists={list(self.journalist_ids)} '
+            f'newsletters={list(self.newsletter_ids)}>'
+        )
+
+
+EMPTY = SubscriptionSet()
+
+
+def for_reader(user):
+    ''' Return the SubscriptionSet of ``user``, empty for anonymous users.
+
+        It is read from the cache and loaded from the database on a miss.
+        The subscription signals drop it when a subscribe or unsubscribe
+        commits, and it expires after SUBSCRIPTION_SET_CACHE_SECONDS
+        in case rows were written without signals (e.g. ``bulk_create``).
+    '''
+    if not user.is_authenticated:
+        return EMPTY
+    key = CACHE_KEY.format(reader_id=user.pk)
+    subscriptions = cache.get(key)
+    if subscriptions is None:
+        metrics.record_cache('subscription_sets', misses=1)
+        subscriptions = SubscriptionSet(
+            JournalistSubscription.objects.filter(
+                reader_id=user.pk
+            ).values_list('journalist_id', flat=True),
+            NewsletterSubscription.objects.filter(
+                reader_id=user.pk
+            ).values_list('newsletter_id', flat=True),
+        )
+        cache.set(key, subscriptions, settings.SUBSCRIPTION_SET_CACHE_SECONDS)
+    else:
+        metrics.record_cache('subscription_sets', hits=1)
+    return subscriptions
+
+
+def invalidate(reader_id):
+    cache.delete(CACHE_KEY.format(reader_id=reader_id))
+
+
+def invalidate_on_commit(reader_id):
+    ''' ``invalidate`` once the current transaction commits, so that a
+        concurrent ``for_reader`` cannot cache the set from before it.
+    '''
+    transaction.on_commit(lambda: invalidate(reader_id))
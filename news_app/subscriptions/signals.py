@@ -0,0 +1,91 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from newsletters.models import Newsletter
+from .models import JournalistSubscription, NewsletterSubscription
+from subscriptions.services import feed, subscription_sets
+
+
+@receiver(post_save, sender=JournalistSubscription)
+def journalist_subscribed(sender, instance, created, **kwargs):
+    '''
+    Backfill the reader's feed with the journalist's recent articles
+    and drop their cached subscription set once the change commits.
+    '''
+    if created:
+        subscription_sets.invalidate_on_commit(instance.reader_id)
+        feed.backfill_journalist(instance.reader_id, instance.journalist_id)
+
+
+@receiver(post_delete, sender=JournalistSubscription)
+def journalist_unsubscribed(sender, instance, **kwargs):
+    '''
+    Remove the journalist's articles from the reader's feed
+    and drop their cached subscription set once the change commits.
+    '''
+    subscription_sets.invalidate_on_commit(instance.reader_id)
+    feed.unfollow(instance.reader_id, journalist_id=instance.journalist_id)
+
+
+@receiver(post_save, sender=NewsletterSubscription)
+def newsletter_subscribed(sender, instance, created, **kwargs):
+    '''
+    Backfill the reader's feed with the newsletter's recent articles
+    and drop their cached subscription set once the change commits.
+    '''
+    if created:
+        subscription_sets.invalidate_on_commit(instance.reader_id)
+        feed.backfill_newsletter(instance.reader_id, instance.newsletter_id)
+
+
+@receiver(post_delete, sender=NewsletterSubscription)
+def newsletter_unsubscribed(sender, instance, **kwargs):
+    '''
+    Remove the newsletter's articles from the reader's feed
+    and drop their cached subscription set once the change commits.
+    '''
+    subscription_sets.invalidate_on_commit(instance.reader_id)
+    feed.unfollow(instance.reader_id, newsletter_id=instance.newsletter_id)
+
+
+@receiver(m2m_changed, sender=Newsletter.articles.through)
+def newsletter_articles_changed(sender, instance, action, reverse, pk_set,
+                                **kwargs):
+    '''
+    Push articles added to a newsletter into its subscribers' feeds and
+    take removed ones out again.
+    '''
+    if action == 'pre_clear':
+        # the cleared ids are gone by post_clear, so remember them here
+        if reverse:
+            instance._cleared_newsletter_ids = set(
+                instance.newsletter_set.values_list('pk', flat=True)
+            )
+        else:
+            instance._cleared_article_ids = set(
+                instance.articles.values_list('pk', flat=True)
+            )
+        return
+
+    if action == 'post_clear':
+        action = 'post_remove'
+        pk_set = getattr(
+            instance,
+            '_cleared_newsletter_ids' if reverse else '_cleared_article_ids',
+            set(),
+        )
+
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+
+    # normalise to (newsletter_id, article_ids) whichever side changed
+    if reverse:
+        changes = [(newsletter_id, [instance.pk]) for newsletter_id in pk_set]
+    else:
+        changes = [(instance.pk, list(pk_set))]
+
+    for newsletter_id, article_ids in changes:
+        if action == 'post_add':
+            feed.fan_out_newsletter_articles(newsletter_id, article_ids)
+        else:
+            feed.remove_newsletter_articles(newsletter_id, article_ids)
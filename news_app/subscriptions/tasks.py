@@ -0,0 +1,24 @@
+from articles.models import Article
+from jobs.queue import task
+from subscriptions.services import feed
+
+
+@task()
+def fan_out_article(article_id):
+    '''
+    Push an approved article into its subscribers' feeds.
+    '''
+    article = Article.objects.filter(pk=article_id, approved=True).first()
+    if article is not None:
+        feed.fan_out_article(article)
+
+
+@task()
+def fan_out_articles(article_ids):
+    '''
+    Push a batch of approved articles into their subscribers' feeds.
+    '''
+    for article in Article.objects.filter(
+        pk__in=article_ids, approved=True
+    ).defer('content'):
+        feed.fan_out_article(article)
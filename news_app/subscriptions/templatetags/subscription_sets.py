@@ -0,0 +1,25 @@
+from django import template
+
+from subscriptions.services import subscription_sets
+
+register = template.Library()
+
+
+@register.filter
+def follows_journalist(user, journalist_id):
+    ''' Whether ``user`` is subscribed to the journalist, read from their
+        cached subscription set.
+
+        Usage::
+
+            {% if user|follows_journalist:article.author_id %}
+    '''
+    return subscription_sets.for_reader(user).follows_journalist(journalist_id)
+
+
+@register.filter
+def follows_newsletter(user, newsletter_id):
+    ''' Whether ``user`` is subscribed to the newsletter, read from their
+        cached subscription set.
+    '''
+    return subscription_sets.for_reader(user).follows_newsletter(newsletter_id)
@@ -1,3 +1,254 @@
-from django.test import TestCase
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from articles.models import Article
+from articles.tests import BaseAPITestCase
+from jobs import queue
+from newsletters.models import Newsletter
+from subscriptions.models import (
+    FeedItem,
+    JournalistSubscription,
+    NewsletterSubscription,
+)
+from subscriptions.services import feed, subscription_sets
 
-# Create your tests here.
+
+# the approvals below queue X posts; leave X unconfigured so draining the
+# queue never tries to reach the real API
+@override_settings(X_BEARER_TOKEN="")
+class ReaderFeedTests(BaseAPITestCase):
+    """Tests for the precomputed reader feed"""
+
+    def setUp(self):
+        cache.clear()
+        self.reader = self.create_user("reader", "reader")
+        self.journalist = self.create_user("journalist", "journalist")
+        self.other = self.create_user("other", "journalist")
+        self.newsletter = Newsletter.objects.create(
+            title="Weekly",
+            description="Desc",
+            author=self.other,
+        )
+        self.authenticate(self.reader)
+
+    def create_article(self, author, approved=False):
+        return Article.objects.create(
+            title="Article",
+            content="...",
+            author=author,
+            approved=approved,
+        )
+
+    def feed_ids(self):
+        # run the queued fan-out jobs as a worker would
+        queue.drain()
+        response = self.client.get("/api/articles/subscribed/")
+        return [a["id"] for a in response.data["results"]]
+
+    def test_approval_fans_out_to_subscribers(self):
+        JournalistSubscription.objects.create(
+            reader=self.reader, journalist=self.journalist
+        )
+        article = self.create_article(self.journalist)
+        self.assertEqual(self.feed_ids(), [])
+
+        article.approved = True
+        article.save()
+
+        self.assertEqual(self.feed_ids(), [article.id])
+
+    def test_newsletter_membership_updates_feed(self):
+        NewsletterSubscription.objects.create(
+            reader=self.reader, newsletter=self.newsletter
+        )
+        article = self.create_article(self.other, approved=True)
+
+        self.newsletter.articles.add(article)
+        self.assertEqual(self.feed_ids(), [article.id])
+
+        self.newsletter.articles.remove(article)
+        self.assertEqual(self.feed_ids(), [])
+
+    def test_newsletter_removal_is_one_delete_for_all_subscribers(self):
+        article = self.create_article(self.other, approved=True)
+        self.newsletter.articles.add(article)
+        others = [
+            self.create_user(f"subscriber{number}", "reader")
+            for number in range(5)
+        ]
+        for reader in [self.reader, *others]:
+            NewsletterSubscription.objects.create(
+                reader=reader, newsletter=self.newsletter
+            )
+        # still follows the author, so keeps the article
+        JournalistSubscription.objects.create(
+            reader=others[0], journalist=self.other
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            self.newsletter.articles.remove(article)
+
+        deletes = [
+            query for query in queries
+            if query["sql"].startswith('DELETE FROM "subscriptions_feeditem"')
+        ]
+        self.assertEqual(len(deletes), 1)
+        self.assertEqual(
+            list(FeedItem.objects.values_list("reader_id", flat=True)),
+            [others[0].id],
+        )
+
+    @override_settings(FEED_MAX_ITEMS=2)
+    def test_fan_out_trims_feeds(self):
+        JournalistSubscription.objects.create(
+            reader=self.reader, journalist=self.journalist
+        )
+        articles = [self.create_article(self.journalist) for _ in range(3)]
+        for article in articles:
+            article.approved = True
+            article.save()
+
+        self.assertEqual(
+            self.feed_ids(), [articles[2].id, articles[1].id]
+        )
+        self.assertEqual(FeedItem.objects.count(), 2)
+
+    def test_unsubscribe_keeps_articles_reachable_another_way(self):
+        shared = self.create_article(self.journalist, approved=True)
+        only_journalist = self.create_article(self.journalist, approved=True)
+        self.newsletter.articles.add(shared)
+        subscription = JournalistSubscription.objects.create(
+            reader=self.reader, journalist=self.journalist
+        )
+        NewsletterSubscription.objects.create(
+            reader=self.reader, newsletter=self.newsletter
+        )
+        self.assertEqual(self.feed_ids(), [only_journalist.id, shared.id])
+
+        subscription.delete()
+
+        self.assertEqual(self.feed_ids(), [shared.id])
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_high_subscriber_authors_are_pulled_at_read_time(self):
+        JournalistSubscription.objects.create(
+            reader=self.reader, journalist=self.journalist
+        )
+        cache.clear()
+        article = self.create_article(self.journalist)
+        article.approved = True
+        article.save()
+
+        self.assertEqual(self.feed_ids(), [article.id])
+        self.assertFalse(FeedItem.objects.exists())
+
+    def test_trim_keeps_newest_entries(self):
+        JournalistSubscription.objects.create(
+            reader=self.reader, journalist=self.journalist
+        )
+        articles = [
+            self.create_article(self.journalist, approved=True)
+            for _ in range(5)
+        ]
+
+        queue.drain()
+        self.assertEqual(feed.trim_feed(self.reader.id, keep=2), 3)
+        self.assertEqual(
+            self.feed_ids(), [articles[4].id, articles[3].id]
+        )
+
+
+class SubscriptionSetTests(BaseAPITestCase):
+    """Tests for the cached per-reader subscription sets"""
+
+    def setUp(self):
+        cache.clear()
+        self.reader = self.create_user("reader", "reader")
+        self.journalist = self.create_user("journalist", "journalist")
+        self.newsletter = Newsletter.objects.create(
+            title="Weekly",
+            description="Desc",
+            author=self.journalist,
+        )
+
+    def test_checks_need_no_queries_once_cached(self):
+        JournalistSubscription.objects.create(
+            reader=self.reader, journalist=self.journalist
+        )
+        subscription_sets.for_reader(self.reader)
+
+        with self.assertNumQueries(0):
+            subscriptions = subscription_sets.for_reader(self.reader)
+            self.assertTrue(
+                subscriptions.follows_journalist(self.journalist.pk)
+            )
+            self.assertFalse(subscriptions.follows_journalist(self.reader.pk))
+            self.assertFalse(
+                subscriptions.follows_newsletter(self.newsletter.pk)
+            )
+
+    def test_subscribing_and_unsubscribing_refresh_the_set(self):
+        self.assertFalse(subscription_sets.for_reader(
+            self.reader
+        ).follows_newsletter(self.newsletter.pk))
+        self.client.login(username="reader", password="testpassword123")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/subscribe/newsletter/{self.newsletter.pk}/")
+
+        self.assertTrue(subscription_sets.for_reader(
+            self.reader
+        ).follows_newsletter(self.newsletter.pk))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            NewsletterSubscription.objects.get(reader=self.reader).delete()
+
+        self.assertFalse(subscription_sets.for_reader(
+            self.reader
+        ).follows_newsletter(self.newsletter.pk))
+
+    def test_set_is_dropped_when_the_subscription_commits(self):
+        subscription_sets.for_reader(self.reader)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            JournalistSubscription.objects.create(
+                reader=self.reader, journalist=self.journalist
+            )
+            # until the commit the cached set stays as it was
+            self.assertFalse(subscription_sets.for_reader(
+                self.reader
+            ).follows_journalist(self.journalist.pk))
+        for callback in callbacks:
+            callback()
+
+        self.assertTrue(subscription_sets.for_reader(
+            self.reader
+        ).follows_journalist(self.journalist.pk))
+
+    def test_detail_pages_show_the_subscription_state(self):
+        article = Article.objects.create(
+            title="Article", content="...", author=self.journalist,
+            approved=True,
+        )
+        self.newsletter.articles.add(article)
+        self.client.login(username="reader", password="testpassword123")
+        pages = (
+            f"/articles/{article.pk}/",
+            f"/newsletters/{self.newsletter.pk}/",
+        )
+        for page in pages:
+            self.assertNotContains(self.client.get(page), "You are subscribed")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/subscribe/journalist/{self.journalist.pk}/")
+            self.client.post(f"/subscribe/newsletter/{self.newsletter.pk}/")
+
+        for page in pages:
+            self.assertContains(self.client.get(page), "You are subscribed")
+
+    def test_anonymous_users_have_no_subscriptions(self):
+        subscriptions = subscription_sets.for_reader(AnonymousUser())
+
+        self.assertFalse(subscriptions.follows_journalist(self.journalist.pk))
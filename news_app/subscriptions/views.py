@@ -7,6 +7,7 @@ from users.mixins import ReaderRequiredMixin
 from .models import JournalistSubscription, NewsletterSubscription
 from articles.models import Article
 from newsletters.models import Newsletter
+from news_app.pagination import KeysetPaginationMixin
 
 User = get_user_model()
 
@@ -42,6 +43,7 @@ class ReaderSubscriptionsView(
 class SubscribedJournalistArticleListView(
     LoginRequiredMixin,
     ReaderRequiredMixin,
+    KeysetPaginationMixin,
     ListView
 ):
     ''' View to display articles from journalists the reader is subscribed to.
@@ -65,7 +67,7 @@ class SubscribedJournalistArticleListView(
         return Article.objects.filter(
             author=journalist,
             approved=True
-        )
+        ).defer('content')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -78,6 +80,7 @@ class SubscribedJournalistArticleListView(
 class SubscribedNewsletterArticleListView(
     LoginRequiredMixin,
     ReaderRequiredMixin,
+    KeysetPaginationMixin,
     ListView
 ):
     ''' View to display articles from newsletters the reader is subscribed to.
@@ -99,7 +102,7 @@ class SubscribedNewsletterArticleListView(
         )
         return newsletter.articles.filter(
             approved=True
-        )
+        ).select_related('author').defer('content')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)